@@ -32,7 +32,7 @@ from .tools.report_selector_agent import ReportSelectorAgent
 from .tools.report_generator_agent import ReportGeneratorAgent
 
 # Core utils
-from .tools.llm_loader import load_llm
+from .tools.llm_loader import load_llm, OLLAMA_MODEL
 from .nlp_pipeline import clean_text
 from .generators.report_generator import render_html_report
 
@@ -40,7 +40,11 @@ from .generators.report_generator import render_html_report
 # ✅ UPDATED LangChain imports
 # -----------------------------
 from langchain_chroma import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
+from langchain_core.documents import Document
+
+from src.context_packer import pack_context
+from src.embedding_backend import SentenceEncoderEmbeddings
+from src.collection_registry import get_collection_registry
 
 load_dotenv()
 
@@ -83,13 +87,15 @@ class AgenticReportPipeline:
         # -----------------------------
         # Vector Store (READ ONLY – global)
         # -----------------------------
-        self.embedding = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-mpnet-base-v2"
+        # Model and physical collection follow embedding migrations (src/embedding_migration.py)
+        binding = get_collection_registry().resolve(
+            "./chroma", "ocr_notebooklm", "sentence-transformers/all-mpnet-base-v2"
         )
+        self.embedding = SentenceEncoderEmbeddings(binding.model)
 
         self.vectordb = Chroma(
             persist_directory="./chroma",
-            collection_name="ocr_notebooklm",
+            collection_name=binding.physical,
             embedding_function=self.embedding
         )
 
@@ -103,21 +109,29 @@ class AgenticReportPipeline:
     # ------------------------------------------------------------------
     # 🔥 Vector Retrieval (NotebookLM-style grounding)
     # ------------------------------------------------------------------
-    def _retrieve_context_from_vectors(self, query: str, k: int = 8) -> str:
+    def _retrieve_context_from_vectors(self, query: str, k: int = 8) -> list:
         try:
-            docs = self.vectordb.similarity_search(query, k=k)
-            return "\n\n".join(
-                f"[{d.metadata.get('fileName', 'OCR')}]\n{d.page_content}"
-                for d in docs
-            )
+            return self.vectordb.similarity_search(query, k=k)
         except Exception as e:
             print(f"⚠ Vector retrieval failed: {e}")
-            return ""
+            return []
 
     def _build_notebooklm_context(self, base_text: str, query: str) -> str:
-        vector_context = self._retrieve_context_from_vectors(query)
-        combined = f"{base_text}\n\n{vector_context}"
-        return clean_text(combined)[:12000]
+        # The uploaded document leads; retrieved chunks that repeat it are
+        # suppressed by the packer instead of eating the budget.
+        docs = [Document(page_content=clean_text(base_text))]
+        docs.extend(
+            Document(page_content=clean_text(d.page_content), metadata=d.metadata)
+            for d in self._retrieve_context_from_vectors(query)
+        )
+
+        return pack_context(
+            docs,
+            model=OLLAMA_MODEL,
+            formatter=lambda text, meta: (
+                f"[{meta.get('fileName', 'OCR')}]\n{text}" if meta else text
+            ),
+        )
 
     # ------------------------------------------------------------------
     # Helpers
@@ -179,17 +193,16 @@ class AgenticReportPipeline:
         # 🔥 NOTEBOOKLM MODE
         # ==============================================================
         if notebooklm_mode:
-            from src.vector_store import VectorStoreManager
+            from src.vector_store_pool import get_vector_store_pool
 
-            vector_manager = VectorStoreManager(doc_id)
-            vectordb = vector_manager.load_vector_store()
+            vector_pool = get_vector_store_pool()
             # vectordb.persist()
 
-            if vectordb is None:
-                vector_manager.create_vector_store(cleaned_text)
+            if vector_pool.load(doc_id) is None:
+                vector_pool.get(doc_id).create_vector_store(cleaned_text)
 
-            # Step 1: Summary
-            summary_output = self.summarizer.run(cleaned_text)
+            # Step 1: Summary (the full document, map-reduce when it is long)
+            summary_output = self.summarizer.run(cleaned_text, document=current_text)
 
             summary_payload = {
                 "overview": summary_output,
@@ -241,7 +254,7 @@ class AgenticReportPipeline:
 
         with concurrent.futures.ThreadPoolExecutor() as executor:
             futures = {
-                executor.submit(self.summarizer.run, cleaned_text): "summary",
+                executor.submit(self.summarizer.run, cleaned_text, current_text): "summary",
                 executor.submit(self.keyword_agent.run, short_text): "keywords",
                 executor.submit(self.decision_agent.run, cleaned_text): "decisions",
                 executor.submit(self.trend_agent.run, cleaned_text): "trends",
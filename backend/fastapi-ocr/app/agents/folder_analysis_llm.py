@@ -9,6 +9,7 @@ from pymongo import MongoClient
 from langchain.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from app.tools.llm_loader import load_llm
+from src.context_compressor import compress_for_agent, timed_llm_call
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("FolderAnalysisAgent")
@@ -16,8 +17,10 @@ logger = logging.getLogger("FolderAnalysisAgent")
 
 class FolderAnalysisAgent:
 
-    def __init__(self):
+    def __init__(self, compress: bool = None):
         self.llm = load_llm()
+        # None → opt-in via config.COMPRESSION_AGENTS ("folder_case")
+        self.compress = compress
 
         mongo_url = os.getenv("MONGO_URL")
         db_name = os.getenv("MONGO_DB_NAME", "authDB")
@@ -86,7 +89,16 @@ class FolderAnalysisAgent:
                 merged_text.append(text)
 
         combined = "\n".join(merged_text)
-        return combined[:12000]
+
+        # Opted in: the best sentences of every file instead of the first 12,000 characters
+        compressed = compress_for_agent(
+            "folder_case", combined, self.compress,
+            query="identity, custodial history, criminal charges, court proceedings, monitoring",
+            max_tokens=3000,
+        )
+        if compressed is not combined:
+            return compressed, True
+        return combined[:12000], False
 
     # --------------------------------------------------
     # STRUCTURED SIGNALS (PRESERVED)
@@ -186,13 +198,14 @@ class FolderAnalysisAgent:
 
         logger.info("Running NotebookLM-style combined case synthesis")
 
-        combined_context = self._build_combined_case_context(ocr_docs)
+        combined_context, compressed = self._build_combined_case_context(ocr_docs)
         case_signals = self._build_case_signals(ocr_docs)
 
-        final_summary = self.case_chain.invoke({
-            "combined_context": combined_context,
-            "signals": case_signals
-        })
+        with timed_llm_call("folder_case", compressed):
+            final_summary = self.case_chain.invoke({
+                "combined_context": combined_context,
+                "signals": case_signals
+            })
 
         entity_graph = self._build_entity_graph(ocr_docs)
 
@@ -2,20 +2,28 @@ import os
 from langchain_core.documents import Document
 
 from app.folder_analyzer.data_cleaner import clean_ocr_text, is_valid_ocr
-from app.folder_analyzer.embedding_engine import embed_text
-from src.vector_store import VectorStoreManager
-from app.folder_analyzer.metadata_store import load_files_with_ocr
+from src.chunk_offsets import pointer_metadata, register_text_resolver
+from src.vector_store_pool import get_vector_store_pool
+from app.folder_analyzer.metadata_store import load_files_with_ocr, load_ocr_texts
+
+
+def _resolve_ocr_files(file_ids):
+    """Pointer hydration: cleaned OCR text of each file, read from ocrrecords."""
+    return {file_id: clean_ocr_text(text) for file_id, text in load_ocr_texts(file_ids).items()}
+
+
+# Folder chunks point into ocrrecords instead of carrying a copy of the file text
+register_text_resolver("ocr_file", _resolve_ocr_files)
 
 
 def index_folder_to_vector_store(folder_id: str, user_id: str, context: str):
     db_name = os.getenv("MONGO_DB_NAME", "authDB")
-    store = VectorStoreManager(db_name).get_or_create_store()
+    manager = get_vector_store_pool().get(db_name)
 
     from app.folder_analyzer.metadata_store import load_files_with_ocr
     files = load_files_with_ocr(folder_id, user_id)
 
     documents = []
-    embeddings = []
 
     for f in files:
         raw_text = f.get("ocr_text", "")
@@ -26,8 +34,8 @@ def index_folder_to_vector_store(folder_id: str, user_id: str, context: str):
         if not is_valid_ocr(text):
             continue
 
-        embedding = embed_text(text)
-        if not embedding:
+        # Same minimum length embed_text() enforces; the store write does the embedding
+        if len(text.strip()) < 20:
             continue
 
         documents.append(
@@ -38,13 +46,13 @@ def index_folder_to_vector_store(folder_id: str, user_id: str, context: str):
                     "file_name": f.get("file_name"),
                     "folder_id": folder_id,
                     "user_id": user_id,
+                    **pointer_metadata(str(f.get("file_id")), 0, len(text), text, text_source="ocr_file"),
                 }
             )
         )
-        embeddings.append(embedding)
 
     if documents:
-        store.add_documents(documents, embeddings=embeddings)
+        manager.add_documents(documents)
 
 
 # def index_file_content(file_record: dict) -> Optional[dict]:
@@ -1,19 +1,19 @@
 import os
 from typing import List
-from sentence_transformers import SentenceTransformer
 
-_MODEL = None
+from src.embedding_backend import encode_texts, get_sentence_encoder
 
 
-def get_embedding_model() -> SentenceTransformer:
-    global _MODEL
-    if _MODEL is None:
-        model_name = os.getenv(
-            "EMBEDDING_MODEL",
-            "sentence-transformers/all-MiniLM-L6-v2"
-        )
-        _MODEL = SentenceTransformer(model_name)
-    return _MODEL
+def _model_name() -> str:
+    return os.getenv(
+        "EMBEDDING_MODEL",
+        "sentence-transformers/all-MiniLM-L6-v2"
+    )
+
+
+def get_embedding_model():
+    # PyTorch or ONNX Runtime, per EMBEDDING_BACKEND (cached per model)
+    return get_sentence_encoder(_model_name())
 
 
 def embed_text(text: str) -> List[float]:
@@ -24,10 +24,7 @@ def embed_text(text: str) -> List[float]:
     if len(text) < 20:
         return []
 
-    model = get_embedding_model()
-    embedding = model.encode(
-        text,
-        normalize_embeddings=True
-    )
+    # Shared micro-batcher: concurrent files/requests share forward passes
+    embedding = encode_texts([text], _model_name(), normalize=True)[0]
 
     return embedding.tolist()
@@ -1,4 +1,5 @@
-import requests
+from src.llm_clients import ollama_generate
+from src.ollama_residency import get_ollama_residency
 
 def ask_folder_ai(context, question):
     prompt = f"""
@@ -12,10 +13,5 @@ Question: {question}
 Give analytical answer with reasoning.
 """
 
-    res = requests.post("http://localhost:11434/api/generate", json={
-        "model": "llama3",
-        "prompt": prompt,
-        "stream": False
-    })
-
-    return res.json()["response"]
+    # Pooled keep-alive session with timeouts (was a bare requests.post per question)
+    return ollama_generate(prompt, model="llama3", keep_alive=get_ollama_residency().keep_alive("llama3"))
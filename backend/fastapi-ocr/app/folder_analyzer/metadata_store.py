@@ -97,6 +97,22 @@ def load_files_with_ocr(folder_id: str, user_id: str) -> List[Dict]:
     return enriched_files
 
 
+def load_ocr_texts(file_ids: List[str]) -> Dict[str, str]:
+    """
+    Raw extractedText of OCR records by fileId (one query)
+    """
+
+    oids = [ObjectId(i) for i in file_ids if ObjectId.is_valid(i)]
+    if not oids:
+        return {}
+
+    records = ocr_collection.find(
+        {"fileId": {"$in": oids}},
+        {"fileId": 1, "extractedText": 1}
+    )
+    return {str(r["fileId"]): r.get("extractedText") or "" for r in records}
+
+
 # -------------------------------------------------
 # OCR UPSERT (OPTIONAL FALLBACK OCR SAVE)
 # -------------------------------------------------
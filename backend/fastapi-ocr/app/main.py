@@ -1,17 +1,15 @@
 import os
 import sys
-import subprocess
 import traceback
 import re
 import json
 import time
 import threading
 import queue
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import asyncio
 
-import requests
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from fastapi.concurrency import run_in_threadpool
@@ -31,12 +29,20 @@ if BASE_DIR not in sys.path:
 try:
     import config
     from src import transcript_fetcher
-    from src import vector_store
+    from src.vector_store_pool import get_vector_store_pool, get_active_context_cache
     from src import rag_chain
     from src import utils
+    from src.embedding_backend import embedding_stats
+    from src.llm_clients import llm_client_stats
+    from src.ollama_residency import get_ollama_residency, start_ollama_residency
+    from src.bulk_ingestion import start_bulk_ingestion, get_bulk_job
     from .ocr_utils import extract_text_from_file, collection as mongo_ocr_col
     from .agent_orchestrator import AgenticReportPipeline
-    from .rag_engine import chat_with_video
+    from .rag_engine import chat_with_video, generate_case_reports_async, get_vector_retention
+    from src.vector_retention import start_retention_worker
+    from src.folder_vector_store import warm_load_folder_vector_store
+    from src.query_expansion import EXPANSION_MODES, get_query_expander, rebuild_vocabulary
+    from src.context_compressor import compression_report
     from .nlp_pipeline import perform_ner
 except ImportError as e:
     print(f"❌ Startup Import Error: {e}")
@@ -73,22 +79,15 @@ app.add_middleware(
 # ============================================================
 # UTILS
 # ============================================================
-def start_ollama_server():
-    try:
-        requests.get("http://localhost:11434/api/tags", timeout=2)
-        print("✔ Ollama server already running.")
-    except Exception:
-        print("⧗ Starting Ollama server...")
-        subprocess.Popen(
-            ["ollama", "serve"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            shell=True
-        )
-
 @app.on_event("startup")
 async def startup_event():
-    start_ollama_server()
+    # Start `ollama serve` if needed, pull + preload models, probe residency (background)
+    start_ollama_residency()
+    # Periodic TTL expiry + duplicate compaction of the vector stores
+    start_retention_worker(get_vector_retention())
+    # Load the persisted folder index in the background instead of rebuilding it
+    if config.FOLDER_VECTOR_WARM_LOAD:
+        warm_load_folder_vector_store()
 
 def clean_ai_response(text: str) -> str:
     if not text:
@@ -98,6 +97,28 @@ def clean_ai_response(text: str) -> str:
 def stream(event: str, data):
     STREAM_QUEUE.put({"event": event, "data": data})
 
+def ensure_transcript_indexed(manager, url_or_id: str, force: bool = False) -> bool:
+    """
+    Fetch and index a video transcript unless it is already indexed.
+
+    Follow-up chat turns on the same video skip the fetch, split, embedding
+    and persist entirely; a forced re-ingest only embeds changed chunks.
+
+    Returns:
+        True if ingestion ran, False if the video was already indexed
+    """
+    variant = transcript_fetcher.transcript_variant()
+    if not force and manager.is_indexed(variant):
+        print(f"⏭ Transcript already indexed: {manager.safe_video_id}")
+        return False
+
+    fetcher = transcript_fetcher.TranscriptFetcher()
+    transcript = fetcher.fetch_transcript(url_or_id)
+    if not transcript:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    manager.create_vector_store(transcript, variant=variant)
+    return True
+
 # ============================================================
 # MODELS (EXISTING)
 # ============================================================
@@ -105,6 +126,7 @@ class ChatRequest(BaseModel):
     user_id: str
     query: str
     link: Optional[str] = None
+    expansion: Optional[str] = None  # "llm", "prf", "neighbors", "aliases", "local" or None (off)
 
 class ChatResponse(BaseModel):
     answer: str
@@ -113,6 +135,12 @@ class ChatResponse(BaseModel):
 class IngestRequest(BaseModel):
     user_id: str
     url: str
+    force: bool = False
+
+class BulkIngestRequest(BaseModel):
+    user_id: str
+    urls: List[str]
+    force: bool = False
 
 class ReportRequest(BaseModel):
     user_id: str
@@ -125,11 +153,29 @@ class ReportRequest(BaseModel):
 # NEW MODELS (FOLDER AI)
 # ============================================================
 
+class CaseReportBatchRequest(BaseModel):
+    user_id: str
+    report_types: List[str]  # CASE_REPORT_PROMPTS keys, e.g. "fir_case_analysis", "gang_network"
+    k: int = 4
+
 class FolderAnalyzeRequest(BaseModel):
     folder_id: str
     user_id: str
     folder_path: str
 
+class VectorDeleteRequest(BaseModel):
+    field: str  # "video_id", "source" or "folder_id"
+    value: str
+    user_id: str
+
+class RetentionPolicyRequest(BaseModel):
+    context_id: str  # Chroma context (video/document id) or RAG user id
+    ttl_days: Optional[float] = None  # None = back to the default
+
+class EntityAliasRequest(BaseModel):
+    canonical: str
+    aliases: List[str]
+
 # class FolderQuestionRequest(BaseModel):
 #     analysis_id: str
 #     question: str
@@ -140,44 +186,51 @@ class FolderAnalyzeRequest(BaseModel):
 def chat_worker(payload: ChatRequest) -> dict:
     if not payload.query:
         raise HTTPException(status_code=400, detail="Query is required")
+    if payload.expansion and payload.expansion.lower() not in EXPANSION_MODES:
+        raise HTTPException(status_code=400, detail=f"expansion must be one of {EXPANSION_MODES}")
 
     active_context_id = None
 
     if payload.link:
         active_context_id = utils.extract_video_id(payload.link)
+        get_active_context_cache().invalidate(payload.user_id)
     else:
-        last_record = mongo_ocr_col.find_one(
-            {"userId": payload.user_id},
-            sort=[("createdAt", -1)]
-        )
-        if last_record:
-            active_context_id = (
+        def latest_record_context():
+            last_record = mongo_ocr_col.find_one(
+                {"userId": payload.user_id},
+                sort=[("createdAt", -1)]
+            )
+            if not last_record:
+                return None
+            return (
                 utils.extract_video_id(last_record.get("originalFilename", ""))
                 or payload.user_id
             )
 
+        active_context_id = get_active_context_cache().get_or_load(
+            payload.user_id, latest_record_context
+        )
+
     context_id = active_context_id or payload.user_id
     print(f"💬 Chat | Context: {context_id}")
 
-    manager = vector_store.VectorStoreManager(context_id)
+    pool = get_vector_store_pool()
 
     if payload.link and active_context_id:
-        fetcher = transcript_fetcher.TranscriptFetcher()
-        transcript = fetcher.fetch_transcript(payload.link)
-        if not transcript:
-            raise HTTPException(status_code=404, detail="Transcript not found")
-        manager.create_vector_store(transcript)
-
-    if not manager.load_vector_store():
-        manager = vector_store.VectorStoreManager(payload.user_id)
-        if not manager.load_vector_store():
-            raise HTTPException(
-                status_code=404,
-                detail="No active context found. Provide a link first."
-            )
+        ensure_transcript_indexed(pool.get(context_id), payload.link)
+
+    retriever = pool.get_retriever(context_id) or pool.get_retriever(payload.user_id)
+    if retriever is None:
+        raise HTTPException(
+            status_code=404,
+            detail="No active context found. Provide a link first."
+        )
 
-    retriever = manager.get_retriever()
-    rag = rag_chain.RAGChain(retriever)
+    rag = rag_chain.RAGChain(
+        retriever,
+        use_multi_query=bool(payload.expansion),
+        expansion_mode=payload.expansion,
+    )
     raw_answer = rag.query(payload.query)
 
     return {"answer": clean_ai_response(raw_answer)}
@@ -323,23 +376,110 @@ async def agentic_report(req: ReportRequest):
         media_type="text/event-stream"
     )
 
+@app.post("/case-reports")
+async def case_reports(req: CaseReportBatchRequest):
+    # One retrieval pass shared by all report types; result["timing"] compares against sequential calls
+    if not req.report_types:
+        raise HTTPException(status_code=400, detail="report_types is required")
+    return await generate_case_reports_async(req.report_types, req.user_id, req.k)
+
 @app.post("/ingest")
 async def ingest_link(req: IngestRequest):
     video_id = utils.extract_video_id(req.url)
-    fetcher = transcript_fetcher.TranscriptFetcher()
-    transcript_text = fetcher.fetch_transcript(video_id)
 
-    manager = vector_store.VectorStoreManager(video_id)
-    manager.create_vector_store(transcript_text)
+    manager = get_vector_store_pool().get(video_id)
+    ingested = ensure_transcript_indexed(manager, video_id, force=req.force)
+    get_active_context_cache().invalidate(req.user_id)
+
+    return {"success": True, "video_id": video_id, "already_indexed": not ingested}
 
-    return {"success": True, "video_id": video_id}
+@app.post("/ingest/bulk")
+async def ingest_bulk(req: BulkIngestRequest):
+    if not req.urls:
+        raise HTTPException(status_code=400, detail="urls is required")
+    job = start_bulk_ingestion(req.user_id, req.urls, force=req.force)
+    get_active_context_cache().invalidate(req.user_id)
+    return job.to_dict()
+
+@app.get("/ingest/bulk/{job_id}")
+async def ingest_bulk_status(job_id: str):
+    job = get_bulk_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 @app.post("/ocr")
-async def ocr_endpoint(file: UploadFile = File(...)):
+async def ocr_endpoint(file: UploadFile = File(...), user_id: Optional[str] = Form(None)):
     file_body = await file.read()
     text = extract_text_from_file(file_body, file.filename)
+    if user_id:
+        # The upload becomes the user's latest record, i.e. their chat context
+        get_active_context_cache().invalidate(user_id)
     return {"success": True, "filename": file.filename, "text": text}
 
+@app.get("/embedding/stats")
+async def embedding_stats_endpoint():
+    # Micro-batcher histograms + embedding cache hit rate / size
+    return embedding_stats()
+
+@app.get("/llm/stats")
+async def llm_stats_endpoint():
+    # Shared LLM clients + per-backend request counts / latency histograms
+    return llm_client_stats()
+
+@app.get("/llm/residency")
+async def llm_residency_endpoint():
+    # Loaded / pinned Ollama models, keep_alive and cold-start counts
+    return get_ollama_residency().stats()
+
+@app.get("/vector_store/stats")
+async def vector_store_stats_endpoint():
+    # Warm VectorStoreManager pool size / hit rate
+    return get_vector_store_pool().stats()
+
+@app.get("/vector_store/report")
+async def vector_store_report():
+    return await run_in_threadpool(get_vector_retention().report)
+
+@app.post("/vector_store/delete")
+async def vector_store_delete(req: VectorDeleteRequest):
+    try:
+        deleted = await run_in_threadpool(
+            get_vector_retention().delete_by, req.field, req.value, req.user_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "deleted": deleted}
+
+@app.post("/vector_store/retention")
+async def vector_store_retention(req: RetentionPolicyRequest):
+    ttl_seconds = req.ttl_days * 86400 if req.ttl_days is not None else None
+    get_vector_retention().policies.set_ttl(req.context_id, ttl_seconds)
+    return {"success": True, "context_id": req.context_id, "ttl_days": req.ttl_days}
+
+@app.post("/vector_store/maintenance")
+async def vector_store_maintenance(background_tasks: BackgroundTasks):
+    background_tasks.add_task(get_vector_retention().run_maintenance)
+    return {"success": True, "status": "scheduled"}
+
+@app.get("/compression/report")
+async def compression_stats():
+    return compression_report()
+
+@app.get("/query_expansion/stats")
+async def query_expansion_stats():
+    return get_query_expander().stats()
+
+@app.post("/query_expansion/aliases")
+async def query_expansion_aliases(req: EntityAliasRequest):
+    get_query_expander().aliases.add(req.canonical, req.aliases)
+    return {"success": True, "canonical": req.canonical, "aliases": req.aliases}
+
+@app.post("/query_expansion/vocabulary")
+async def query_expansion_vocabulary(background_tasks: BackgroundTasks):
+    background_tasks.add_task(rebuild_vocabulary)
+    return {"success": True, "status": "scheduled"}
+
 # ============================================================
 # NEW FOLDER AI ENDPOINTS
 # ============================================================
@@ -372,6 +512,7 @@ async def analyze_folder(req: FolderAnalyzeRequest):
         user_id=req.user_id,
         folder_path=req.folder_path
     )
+    get_active_context_cache().invalidate(req.user_id)
 
     return {
         "status": "COMPLETED",
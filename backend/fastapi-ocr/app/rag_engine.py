@@ -1,24 +1,64 @@
 # app/rag_engine.py
 
 import os
+import time
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from pymongo import MongoClient
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pymongo import MongoClient, ReplaceOne
 from dotenv import load_dotenv
 
 # ---------------- EXISTING IMPORTS ----------------
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_mongodb import MongoDBAtlasVectorSearch
 
 # ---------------- RAG CHAIN IMPORTS ----------------
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 # ---------------- NEW (SAFE) IMPORT ----------------
 from langchain.callbacks.base import BaseCallbackHandler
 
+import config
+
+# ---------------- CONTEXT PACKING ----------------
+from src.context_packer import pack_context
+
+# ---------------- SHARED LLM CLIENTS ----------------
+from src.llm_clients import get_llm
+
+# ---------------- EMBEDDING BACKEND (torch / onnx) ----------------
+from src.embedding_backend import SentenceEncoderEmbeddings
+
+# ---------------- LOCAL VECTOR BACKEND ----------------
+from src.local_vector_store import LocalVectorStore
+
+# ---------------- INCREMENTAL RE-INDEXING ----------------
+from src.chunk_manifest import get_chunk_manifest
+
+# ---------------- OFFSET-BASED CHUNKS ----------------
+from src.chunk_offsets import (
+    get_source_text_store,
+    hydrate_documents,
+    offset_documents,
+    register_text_resolver,
+    storage_text,
+    versioned_record_id,
+)
+
+# ---------------- QUERY EXPANSION (LLM / LLM-FREE) ----------------
+from src.query_expansion import resolve_mode, retrieve_expanded
+
+# ---------------- VECTOR RETENTION / COMPACTION ----------------
+from src.vector_retention import VectorRetention
+
+# ---------------- LEXICAL (BM25) INDEX ----------------
+from src.lexical_index import (
+    get_lexical_index,
+    is_identifier_query,
+    reciprocal_rank_fusion,
+)
+
 # ---------------- REPORT GENERATION IMPORTS ----------------
 try:
     from .generators.report_generator import render_html_report
@@ -46,6 +86,12 @@ MONGO_URL = os.getenv("MONGO_URL")
 DB_NAME = os.getenv("MONGO_DB_NAME")
 COLLECTION_NAME = "vector_store"
 INDEX_NAME = "universal_index"
+# Full source texts behind Atlas pointer chunks (shared by every replica)
+SOURCE_TEXT_COLLECTION_NAME = "rag_source_texts"
+
+# "atlas" → MongoDB Atlas Vector Search, "local" → on-disk IVF index
+VECTOR_BACKEND = config.VECTOR_BACKEND
+LOCAL_VECTOR_DIRECTORY = config.LOCAL_VECTOR_DIRECTORY
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
@@ -64,10 +110,27 @@ CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 100))
 RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", 4))
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", 0.4))
 LLM_MAX_NEW_TOKENS = int(os.getenv("LLM_MAX_NEW_TOKENS", 512))
+CONTEXT_TOKEN_BUDGET = config.CONTEXT_TOKEN_BUDGET
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+# Concurrent LLM calls / PDF renders of one generate_case_reports batch
+CASE_REPORT_MAX_PARALLEL = int(os.getenv("CASE_REPORT_MAX_PARALLEL", 2))
+CASE_REPORT_RENDER_PARALLEL = int(os.getenv("CASE_REPORT_RENDER_PARALLEL", 4))
+REPORTS_URL_PREFIX = "/static/reports/"
 
 client = MongoClient(MONGO_URL)
 db = client[DB_NAME]
 vector_collection = db[COLLECTION_NAME]
+source_text_collection = db[SOURCE_TEXT_COLLECTION_NAME]
+
+def _resolve_rag_texts(record_ids):
+    """Pointer hydration: source texts of Atlas chunks, read from the shared collection."""
+    return {
+        d["_id"]: d["text"]
+        for d in source_text_collection.find({"_id": {"$in": list(record_ids)}}, {"text": 1})
+    }
+
+# Atlas chunks point into Mongo, so any replica can hydrate them (the local store is per host)
+register_text_resolver("rag_text", _resolve_rag_texts)
 
 # =========================================================
 # EMBEDDINGS & VECTOR STORE (UNCHANGED)
@@ -75,11 +138,24 @@ vector_collection = db[COLLECTION_NAME]
 def _get_embedding_model():
     if OPENAI_API_KEY and OpenAIEmbeddings:
         return OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-    return HuggingFaceEmbeddings(model_name=HUGGINGFACE_EMBEDDING_MODEL)
+    return SentenceEncoderEmbeddings(HUGGINGFACE_EMBEDDING_MODEL)
 
 embedding_model = _get_embedding_model()
 
+_local_vector_store = None
+_local_vector_store_lock = threading.Lock()
+
 def get_vector_store():
+    global _local_vector_store
+    if VECTOR_BACKEND == "local":
+        with _local_vector_store_lock:
+            if _local_vector_store is None:
+                _local_vector_store = LocalVectorStore(
+                    embedding=embedding_model,
+                    directory=LOCAL_VECTOR_DIRECTORY,
+                )
+        return _local_vector_store
+
     return MongoDBAtlasVectorSearch(
         collection=vector_collection,
         embedding=embedding_model,
@@ -87,28 +163,56 @@ def get_vector_store():
         relevance_score_fn="cosine",
     )
 
+_vector_retention = None
+_vector_retention_lock = threading.Lock()
+
+def get_vector_retention():
+    """Retention/compaction over the Chroma shards and this module's RAG store."""
+    global _vector_retention
+    if _vector_retention is None:
+        local = VECTOR_BACKEND == "local"
+        rag_store = get_vector_store() if local else None
+        with _vector_retention_lock:
+            if _vector_retention is None:
+                _vector_retention = VectorRetention(
+                    rag_backend=VECTOR_BACKEND,
+                    rag_collection=None if local else vector_collection,
+                    rag_texts=None if local else source_text_collection,
+                    rag_store=rag_store,
+                )
+    return _vector_retention
+
 # =========================================================
 # LLM INITIALIZATION (EXTENDED FOR STREAMING)
 # =========================================================
 def _initialize_llm(callbacks=None):
+    # Shared pooled client per model/params; callbacks are bound to this request only
     if OPENAI_API_KEY and ChatOpenAI:
-        return ChatOpenAI(
-            openai_api_key=OPENAI_API_KEY,
-            model_name="gpt-4o-mini",
+        return get_llm(
+            "openai",
+            "gpt-4o-mini",
+            callbacks=callbacks,
             temperature=LLM_TEMPERATURE,
-            streaming=bool(callbacks),
-            callbacks=callbacks
+            streaming=bool(callbacks)
         )
 
-    endpoint = HuggingFaceEndpoint(
-        repo_id=HUGGINGFACE_LLM_MODEL,
-        huggingfacehub_api_token=HUGGINGFACE_API_TOKEN,
+    return get_llm(
+        "huggingface",
+        HUGGINGFACE_LLM_MODEL,
+        callbacks=callbacks,
         temperature=LLM_TEMPERATURE,
         max_new_tokens=LLM_MAX_NEW_TOKENS,
         streaming=bool(callbacks)
     )
 
-    return ChatHuggingFace(llm=endpoint, callbacks=callbacks)
+def _target_model_name():
+    """Model whose tokenizer bounds the prompt context."""
+    if OPENAI_API_KEY and ChatOpenAI:
+        return "gpt-4o-mini"
+    return HUGGINGFACE_LLM_MODEL
+
+def _pack_docs(docs, max_tokens=CONTEXT_TOKEN_BUDGET):
+    return pack_context(docs, max_tokens=max_tokens, model=_target_model_name())
 
 # =========================================================
 # INTERNAL RETRIEVAL (UNCHANGED)
@@ -118,7 +222,7 @@ def _fetch_docs(query, user_id, source=None, k=RETRIEVAL_K, strict_source=True):
     filter_query = {"user_id": {"$eq": user_id}}
     if strict_source and source:
         filter_query["source"] = {"$eq": source}
-    return store.similarity_search(query, k=k, pre_filter=filter_query)
+    return hydrate_documents(store.similarity_search(query, k=k, pre_filter=filter_query))
 
 # =========================================================
 # 🔥 NEW: STREAMING CALLBACK
@@ -143,7 +247,7 @@ def generate_long_form_answer(
     """
     Streaming-friendly RAG generation for reports / canvas UI.
     """
-    docs = _fetch_docs(
+    docs = _fetch_docs_hybrid(
         query=query,
         user_id=user_id,
         source=None,
@@ -154,7 +258,7 @@ def generate_long_form_answer(
     if not docs:
         return "No relevant information found."
 
-    context = "\n\n".join(d.page_content for d in docs)
+    context = _pack_docs(docs)
 
     callbacks = []
     if stream_callback:
@@ -185,6 +289,38 @@ Report:
 # =========================================================
 # 4. STORAGE
 # =========================================================
+def _add_pointer_documents(store, docs, ids):
+    """Embed chunks from their text but store them with empty text (pointer metadata only)."""
+    embeddings = embedding_model.embed_documents([d.page_content for d in docs])
+    if VECTOR_BACKEND == "local":
+        store.add_embeddings(
+            texts=[storage_text(d) for d in docs],
+            embeddings=embeddings,
+            metadatas=[dict(d.metadata) for d in docs],
+            ids=ids,
+        )
+        return
+
+    # Same document shape MongoDBAtlasVectorSearch writes (text, embedding, flat metadata)
+    vector_collection.bulk_write([
+        ReplaceOne(
+            {"_id": doc_id},
+            {"text": storage_text(d), "embedding": list(vector), **d.metadata},
+            upsert=True,
+        )
+        for doc_id, d, vector in zip(ids, docs, embeddings)
+    ], ordered=False)
+
+def _prune_source_versions(store, user_id, source):
+    """Drop stored versions of a source's text that no chunk points into any more."""
+    conditions = {"user_id": user_id, "source": source}
+    if VECTOR_BACKEND == "local":
+        live = store.distinct("record_id", pre_filter={f: {"$eq": v} for f, v in conditions.items()})
+        get_source_text_store().delete_prefix(f"rag/{user_id}/{source}@", keep=live)
+    else:
+        live = [r for r in vector_collection.distinct("record_id", conditions) if r is not None]
+        source_text_collection.delete_many({**conditions, "_id": {"$nin": live}})
+
 def store_embeddings(text_content, metadata):
     if not text_content or len(text_content.strip()) < 10:
         return None
@@ -195,10 +331,64 @@ def store_embeddings(text_content, metadata):
         separators=["\n\n", "\n", ".", " ", ""]
     )
 
-    docs = splitter.create_documents([text_content], metadatas=[metadata])
     store = get_vector_store()
-    store.add_documents(docs)
-    print(f"✔ RAG: Stored {len(docs)} chunks for source: {metadata.get('source', 'unknown')}")
+    user_id = metadata.get("user_id")
+    source = metadata.get("source")
+
+    pointers = config.OFFSET_CHUNKS and user_id is not None and source is not None
+    if pointers:
+        # The source text is stored once; chunks only keep their span of it
+        record_id = versioned_record_id(f"rag/{user_id}/{source}", text_content)
+        if VECTOR_BACKEND == "local":
+            get_source_text_store().put(record_id, text_content)
+            text_source = "text_store"
+        else:
+            source_text_collection.replace_one(
+                {"_id": record_id},
+                {"text": text_content, "user_id": user_id, "source": source},
+                upsert=True,
+            )
+            text_source = "rag_text"
+        docs = offset_documents(splitter, text_content, metadata, record_id, text_source)
+    else:
+        docs = splitter.create_documents([text_content], metadatas=[metadata])
+
+    if user_id is None or source is None:
+        store.add_documents(docs)
+        print(f"✔ RAG: Stored {len(docs)} chunks for source: {source or 'unknown'}")
+        removed_ids, new_docs = [], docs
+    else:
+        # Diff against the source's chunks: embed/insert only new ones
+        manifest = get_chunk_manifest()
+        namespace = f"{VECTOR_BACKEND}:{user_id}"
+        with manifest.source_lock(namespace, source):
+            existing = None
+            if VECTOR_BACKEND != "local":
+                # Atlas is shared by every replica; this host's manifest may not have seen their writes
+                existing = {str(i) for i in vector_collection.distinct("_id", {"user_id": user_id, "source": source})}
+            diff = manifest.diff(namespace, source, docs, id_prefix=f"{user_id}/", existing=existing)
+            if diff.removed_ids:
+                store.delete(ids=diff.removed_ids, pre_filter={"user_id": {"$eq": user_id}})
+            if diff.new_documents:
+                if pointers:
+                    _add_pointer_documents(store, diff.new_documents, diff.new_ids)
+                else:
+                    store.add_documents(diff.new_documents, ids=diff.new_ids)
+            manifest.commit(diff)
+            if pointers and diff.removed_ids:
+                # Unchanged chunks keep pointing into older versions; drop only unreferenced ones
+                _prune_source_versions(store, user_id, source)
+        print(f"✔ RAG: Indexed source {source} ({diff.summary()} chunks)")
+        removed_ids, new_docs = diff.removed_ids, diff.new_documents
+
+    if user_id:
+        try:
+            index = get_lexical_index(user_id)
+            if removed_ids:
+                index.delete_chunks(removed_ids)
+            index.add_documents(new_docs)
+        except Exception as e:
+            print(f"⚠ Lexical index update failed: {e}")
     return True
 
 async def store_embeddings_async(text_content, metadata):
@@ -217,7 +407,40 @@ def _fetch_docs(query, user_id, source=None, k=RETRIEVAL_K, strict_source=True):
     if strict_source and source:
         filter_query["source"] = {"$eq": source}
 
-    return store.similarity_search(query, k=k, pre_filter=filter_query)
+    return hydrate_documents(store.similarity_search(query, k=k, pre_filter=filter_query))
+
+def _fetch_lexical_docs(query, user_id, source=None, k=RETRIEVAL_K, strict_source=True):
+    """BM25 lookup over the user's lexical index (no embedding call)."""
+    try:
+        index = get_lexical_index(user_id)
+        return index.search(query, k=k, source=source if strict_source else None)
+    except Exception as e:
+        print(f"⚠ Lexical search failed: {e}")
+        return []
+
+def _fetch_docs_hybrid(query, user_id, source=None, k=RETRIEVAL_K, strict_source=True):
+    """
+    Hybrid retrieval: identifier-style queries (FIR numbers, sections,
+    account numbers, quoted names) are answered from the lexical index alone;
+    everything else fuses vector and BM25 rankings with RRF.
+    """
+    if not HYBRID_RETRIEVAL:
+        return _fetch_docs(query, user_id, source, k, strict_source)
+
+    if is_identifier_query(query):
+        lexical_docs = _fetch_lexical_docs(query, user_id, source, k, strict_source)
+        if lexical_docs:
+            return lexical_docs
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        vector_future = executor.submit(_fetch_docs, query, user_id, source, k, strict_source)
+        lexical_future = executor.submit(_fetch_lexical_docs, query, user_id, source, k, strict_source)
+        vector_docs = vector_future.result()
+        lexical_docs = lexical_future.result()
+
+    if not lexical_docs:
+        return vector_docs
+    return reciprocal_rank_fusion([vector_docs, lexical_docs], k=k)
 
 def generate_multi_queries(original_question, llm):
     instruction = (
@@ -249,25 +472,23 @@ def chat_with_video(
     answer_style: str = "auto",
     use_multi_query: bool = False,
     k: int = RETRIEVAL_K,
+    expansion_mode: str = None,
 ):
     llm = _initialize_llm()
+    mode = resolve_mode(expansion_mode, use_multi_query)
 
     final_docs = []
-    queries = [question]
-    
-    if use_multi_query:
-        queries = generate_multi_queries(question, llm)
-
     seen_contents = set()
 
     def fetch_strict(q):
-        return _fetch_docs(q, user_id, source=video_url, k=k, strict_source=True)
+        return _fetch_docs_hybrid(q, user_id, source=video_url, k=k, strict_source=True)
 
     def fetch_relaxed(q):
-        return _fetch_docs(q, user_id, source=None, k=k, strict_source=False)
+        return _fetch_docs_hybrid(q, user_id, source=None, k=k, strict_source=False)
 
-    with ThreadPoolExecutor() as executor:
-        strict_results = list(executor.map(fetch_strict, queries))
+    queries, strict_results = retrieve_expanded(
+        question, fetch_strict, mode, llm_expand=lambda q: generate_multi_queries(q, llm)
+    )
 
     for docs in strict_results:
         for doc in docs:
@@ -289,7 +510,7 @@ def chat_with_video(
     if not final_docs:
         return "I don't have enough information to answer that."
 
-    context = "\n\n".join(d.page_content for d in final_docs)
+    context = _pack_docs(final_docs)
 
     prompt_text = f"""
             You are a helpful assistant. Answer ONLY based on the context.
@@ -309,18 +530,25 @@ def chat_with_video(
     return chain.invoke({"context": context, "question": question})
 
 
-def generate_rag_report(topic: str, user_id: str, report_format: str = "detailed", k: int = 4):
+def generate_rag_report(
+    topic: str,
+    user_id: str,
+    report_format: str = "detailed",
+    k: int = 4,
+    expansion_mode: str = None,
+):
     llm = _initialize_llm()
-    queries = generate_multi_queries(topic, llm)
-    
+    mode = resolve_mode(expansion_mode)
+
     final_docs = []
     seen_contents = set()
 
     def fetch_global(q):
-        return _fetch_docs(q, user_id, source=None, k=k, strict_source=False)
+        return _fetch_docs_hybrid(q, user_id, source=None, k=k, strict_source=False)
 
-    with ThreadPoolExecutor() as executor:
-        results = list(executor.map(fetch_global, queries))
+    _, results = retrieve_expanded(
+        topic, fetch_global, mode, llm_expand=lambda q: generate_multi_queries(q, llm)
+    )
 
     for docs in results:
         for doc in docs:
@@ -331,7 +559,7 @@ def generate_rag_report(topic: str, user_id: str, report_format: str = "detailed
     if not final_docs:
         return "Insufficient data found in your knowledge base."
 
-    context = "\n\n".join(d.page_content for d in final_docs)
+    context = _pack_docs(final_docs)
 
     prompt_text = f"""
     You are an expert AI Analyst. 
@@ -455,6 +683,46 @@ CASE_REPORT_PROMPTS = {
     """
 }
 
+def _normalize_report_type(report_type: str) -> str:
+    """"Gang Network" -> "gang_network" (also what the report file is named after)."""
+    return report_type.strip().lower().replace(" ", "_")
+
+def _select_case_prompt(report_type: str) -> str:
+    """CASE_REPORT_PROMPTS entry whose key appears in report_type (default: FIR analysis)."""
+    normalized_type = _normalize_report_type(report_type)
+    for key in CASE_REPORT_PROMPTS:
+        if key in normalized_type:
+            return CASE_REPORT_PROMPTS[key]
+    return CASE_REPORT_PROMPTS.get("fir_case_analysis")
+
+def _write_case_report(report_type: str, user_id: str, report_text: str):
+    """Render one case report to PDF and build the API result."""
+    # Data structure matches what render_html_report expects (from agent_orchestrator usage)
+    clean_report_type = report_type.strip()
+
+    data = {
+        "title": clean_report_type.replace("_", " ").title(),
+        "executive_summary": "Automated Law Enforcement Analysis generated from Vector Knowledge Base.",
+        "report": report_text,
+        "final_report_text": report_text # Added for consistency with AgenticReportPipeline
+    }
+
+    saved_file_path = render_html_report(
+        data=data,
+        report_type=clean_report_type,
+        user_id=str(user_id)
+    )
+
+    if saved_file_path and os.path.exists(saved_file_path):
+        filename = os.path.basename(saved_file_path)
+        return {
+            "success": True,
+            "report_text": report_text,
+            "download_link": f"{REPORTS_URL_PREFIX}{filename}"
+        }
+
+    return {"success": False, "report_text": report_text, "error": "File generation failed"}
+
 def generate_case_report(
     report_type: str,
     user_id: str,
@@ -468,7 +736,7 @@ def generate_case_report(
     # Reuse existing retrieval function
     # Search broadly using the report type name to gather relevant case files
     search_term = report_type.replace("_", " ")
-    docs = _fetch_docs(
+    docs = _fetch_docs_hybrid(
         query=search_term,
         user_id=user_id,
         source=None,
@@ -479,21 +747,10 @@ def generate_case_report(
     if not docs:
         return "No sufficient data found in the knowledge base to generate this report."
 
-    context = "\n\n".join(d.page_content for d in docs)
-
-    # Select Prompt based on report type
-    # Normalize report_type string
-    normalized_type = report_type.lower().replace(" ", "_")
-    
-    # Fallback mechanisms for prompt selection
-    selected_prompt = CASE_REPORT_PROMPTS.get("fir_case_analysis") # Default
-    for key in CASE_REPORT_PROMPTS:
-        if key in normalized_type:
-            selected_prompt = CASE_REPORT_PROMPTS[key]
-            break
+    context = _pack_docs(docs)
 
     prompt = PromptTemplate(
-        template=selected_prompt,
+        template=_select_case_prompt(report_type),
         input_variables=["context"]
     )
 
@@ -503,41 +760,150 @@ def generate_case_report(
     chain = prompt | llm | StrOutputParser()
     report_text = chain.invoke({"context": context})
 
-    # Prepare data for PDF generation
-    # FIX: Ensure data structure matches what render_html_report likely expects (from agent_orchestrator usage)
-    clean_report_type = report_type.strip()
-    
-    data = {
-        "title": clean_report_type.replace("_", " ").title(),
-        "executive_summary": "Automated Law Enforcement Analysis generated from Vector Knowledge Base.",
-        "report": report_text,
-        "final_report_text": report_text # Added for consistency with AgenticReportPipeline
-    }
+    return _write_case_report(report_type, user_id, report_text)
 
-    # Pass the REPORTS_DIR explicitly
-    # FIX: Removed 'folder_path' to match render_html_report signature
-    saved_file_path = render_html_report(
-        data=data,
-        report_type=clean_report_type,
-        user_id=str(user_id)
-        # folder_path=REPORTS_DIR # <-- REMOVED TO FIX ERROR
-    )
+def generate_case_reports(
+    report_types: list,
+    user_id: str,
+    k: int = 4,
+    max_parallel: int = None
+):
+    """
+    Generates several case reports for one user from a single retrieval pass.
+
+    The per-type searches run once, concurrently, and their union (in
+    rank order, interleaved so every type keeps its best hits) is packed
+    into one context shared by all reports. Reports are generated on one
+    LLM client, at most max_parallel at a time, and each PDF is rendered
+    as soon as its text is ready.
+
+    Args:
+        report_types: CASE_REPORT_PROMPTS types (types equal after normalization are generated once)
+        user_id: Owner of the knowledge base
+        k: Documents retrieved per report type
+        max_parallel: Concurrent LLM calls (default: CASE_REPORT_MAX_PARALLEL)
+
+    Returns:
+        {"success", "reports": {report_type: generate_case_report result}, "timing"}
+        "timing" puts the batch wall time next to the summed per-report stage
+        times. Those stages were measured while running concurrently (queue
+        waits included), so the sum is an upper-bound estimate of
+        back-to-back generate_case_report calls, not a measured baseline.
+    """
+    t0 = time.perf_counter()
+    unique_types = {}
+    for report_type in report_types:
+        if report_type and report_type.strip():
+            unique_types.setdefault(_normalize_report_type(report_type), report_type)
+    report_types = list(unique_types.values())
+    if not report_types:
+        return {"success": False, "reports": {}, "error": "No report types given"}
 
-    # 5. Construct URL
-    if saved_file_path and os.path.exists(saved_file_path):
-        filename = os.path.basename(saved_file_path)
+    llm = _initialize_llm()
+
+    def fetch(report_type):
+        started = time.perf_counter()
+        docs = _fetch_docs_hybrid(
+            query=report_type.replace("_", " "),
+            user_id=user_id,
+            source=None,
+            k=k,
+            strict_source=False
+        )
+        return docs, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=len(report_types)) as executor:
+        fetched = list(executor.map(fetch, report_types))
+    retrieval_seconds = time.perf_counter() - t0
+
+    final_docs = []
+    seen_contents = set()
+    for rank in range(max((len(docs) for docs, _ in fetched), default=0)):
+        for docs, _ in fetched:
+            if rank < len(docs) and docs[rank].page_content not in seen_contents:
+                seen_contents.add(docs[rank].page_content)
+                final_docs.append(docs[rank])
+
+    if not final_docs:
         return {
-            "success": True,
-            "report_text": report_text,
-            "download_link": f"{REPORTS_URL_PREFIX}{filename}"
+            "success": False,
+            "reports": {},
+            "error": "No sufficient data found in the knowledge base to generate these reports."
         }
-    
-    return {"success": False, "report_text": report_text, "error": "File generation failed"}
+
+    started = time.perf_counter()
+    context = _pack_docs(final_docs)
+    pack_seconds = time.perf_counter() - started
+
+    def generate(report_type):
+        started = time.perf_counter()
+        prompt = PromptTemplate(template=_select_case_prompt(report_type), input_variables=["context"])
+        print(f"👮‍♂️ Generating Law Enforcement Report: {report_type}")
+        report_text = (prompt | llm | StrOutputParser()).invoke({"context": context})
+        return report_text, time.perf_counter() - started
+
+    def render(report_type, report_text):
+        started = time.perf_counter()
+        result = _write_case_report(report_type, user_id, report_text)
+        return result, time.perf_counter() - started
+
+    reports, stage_seconds = {}, {}
+    max_parallel = max(1, max_parallel or CASE_REPORT_MAX_PARALLEL)
+    with ThreadPoolExecutor(max_workers=min(max_parallel, len(report_types))) as llm_pool, \
+            ThreadPoolExecutor(max_workers=CASE_REPORT_RENDER_PARALLEL) as render_pool:
+        generations = {llm_pool.submit(generate, t): t for t in report_types}
+        renders = {}
+        for future in as_completed(generations):
+            report_type = generations[future]
+            try:
+                report_text, generate_seconds = future.result()
+            except Exception as e:
+                print(f"❌ Case report {report_type} failed: {e}")
+                reports[report_type] = {"success": False, "error": str(e)}
+                continue
+            stage_seconds[report_type] = generate_seconds
+            renders[render_pool.submit(render, report_type, report_text)] = report_type
+
+        for future in as_completed(renders):
+            report_type = renders[future]
+            try:
+                reports[report_type], render_seconds = future.result()
+                stage_seconds[report_type] += render_seconds
+            except Exception as e:
+                print(f"❌ Case report {report_type} failed to render: {e}")
+                reports[report_type] = {"success": False, "error": str(e)}
+
+    wall_seconds = time.perf_counter() - t0
+    # Stage times include waits for the LLM / render pools: an upper bound
+    summed_stage_seconds = (
+        sum(seconds for _, seconds in fetched)
+        + pack_seconds * len(report_types)
+        + sum(stage_seconds.values())
+    )
+    print(f"✔ {len(report_types)} case reports in {wall_seconds:.1f}s "
+          f"(summed stages {summed_stage_seconds:.1f}s, {len(final_docs)} shared docs)")
+
+    return {
+        "success": any(r.get("success") for r in reports.values()),
+        "reports": {t: reports[t] for t in report_types},
+        "timing": {
+            "retrieval_seconds": round(retrieval_seconds, 3),
+            "wall_seconds": round(wall_seconds, 3),
+            "summed_stage_seconds_upper_bound": round(summed_stage_seconds, 3),
+            "speedup_upper_bound": round(summed_stage_seconds / wall_seconds, 2) if wall_seconds else None,
+            "shared_documents": len(final_docs),
+        }
+    }
 
 async def generate_case_report_async(report_type: str, user_id: str, k: int = 4):
     loop = asyncio.get_running_loop()
     return await loop.run_in_executor(None, generate_case_report, report_type, user_id, k)
 
+async def generate_case_reports_async(report_types: list, user_id: str, k: int = 4):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, generate_case_reports, report_types, user_id, k)
+
+
     
 # import os
 # import asyncio
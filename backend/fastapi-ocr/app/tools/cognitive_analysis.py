@@ -1,10 +1,13 @@
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from .llm_loader import load_llm
+from src.context_compressor import compress_for_agent, timed_llm_call
 
 class CognitiveAnalysisAgent:
-    def __init__(self):
+    def __init__(self, compress: bool = None):
         self.llm = load_llm()
+        # None → opt-in via config.COMPRESSION_AGENTS ("cognitive")
+        self.compress = compress
 
     def run(self, text_sample: str):
         """
@@ -42,8 +45,12 @@ class CognitiveAnalysisAgent:
                 input_variables=["text"]
             )
 
+            # Unbiased (centroid/TextRank) selection: tone and intent span the whole text
+            prompt_text = compress_for_agent("cognitive", text_sample, self.compress)
+
             chain = prompt | self.llm | StrOutputParser()
-            result = chain.invoke({"text": text_sample})
+            with timed_llm_call("cognitive", prompt_text is not text_sample):
+                result = chain.invoke({"text": prompt_text})
             return result
 
         except Exception as e:
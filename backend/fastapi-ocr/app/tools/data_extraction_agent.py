@@ -1,12 +1,21 @@
 from .llm_loader import load_llm
+from src.context_compressor import compress_for_agent, timed_llm_call
 import json
 import re
 
 class DataExtractionAgent:
-    def __init__(self):
+    def __init__(self, compress: bool = None):
         self.llm = load_llm()
+        # None → opt-in via config.COMPRESSION_AGENTS ("data_extraction")
+        self.compress = compress
 
     def run(self, text: str, focus: str = "General") -> dict:
+        # Opted in: sentences about the focus from the whole text instead of its first 5,000 characters
+        compressed = compress_for_agent(
+            "data_extraction", text, self.compress, query=f"{focus} numbers amounts counts dates"
+        )
+        sample = compressed if compressed is not text else text[:5000]
+
         prompt = f"""
         You are a Data Analyst.
         Extract numerical data from the text below relevant to: "{focus}".
@@ -20,11 +29,12 @@ class DataExtractionAgent:
         }}
         
         Text:
-        {text[:5000]}
+        {sample}
         """
         
         try:
-            response = self.llm.invoke(prompt)
+            with timed_llm_call("data_extraction", compressed is not text):
+                response = self.llm.invoke(prompt)
             # Clean response (remove markdown ```json ... ```)
             content = response.content if hasattr(response, 'content') else str(response)
             cleaned = re.sub(r"```json|```", "", content).strip()
@@ -1,12 +1,18 @@
 from .llm_loader import load_llm
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from src.context_compressor import compress_for_agent, timed_llm_call
 
 class DecisionAgent:
-    def __init__(self):
+    def __init__(self, compress: bool = None):
         self.llm = load_llm()
+        # None → opt-in via config.COMPRESSION_AGENTS ("decision")
+        self.compress = compress
 
     def run(self, text: str) -> str:
+        prompt_text = compress_for_agent(
+            "decision", text, self.compress, query="actions, deadlines, obligations, risks and decisions required"
+        )
         template = """
         Based on the document text below, recommend 3 actionable next steps or decisions.
         Format as a bulleted list.
@@ -21,6 +27,7 @@ class DecisionAgent:
         chain = prompt | self.llm | StrOutputParser()
         
         try:
-            return chain.invoke({"text": text})
+            with timed_llm_call("decision", prompt_text is not text):
+                return chain.invoke({"text": prompt_text})
         except:
             return "No specific decisions generated."
\ No newline at end of file
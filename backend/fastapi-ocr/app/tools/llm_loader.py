@@ -1,47 +1,22 @@
 # app/tools/llm_loader.py
-import subprocess
-import time
-import requests
 from typing import Optional, List
 
-from langchain_ollama import ChatOllama
-from langchain_core.callbacks import CallbackManager
+import config
+from src.llm_clients import get_llm
+from src.ollama_residency import get_ollama_residency
 
 OLLAMA_MODEL = "llama3"
 
 _cached_llm = None
 
 
-def is_ollama_running():
-    try:
-        requests.get("http://localhost:11434", timeout=1)
-        return True
-    except Exception:
-        return False
-
-
-def check_and_pull_model(model_name: str):
-    try:
-        result = subprocess.run(
-            ["ollama", "list"],
-            capture_output=True,
-            text=True
-        )
-        if model_name not in result.stdout:
-            print(f"⬇ Pulling Ollama model: {model_name}")
-            subprocess.run(["ollama", "pull", model_name], check=True)
-    except Exception as e:
-        print(f"⚠ Ollama model check failed: {e}")
-
-
 def _load_hf_fallback():
     # ⚠ Keep fallback SIMPLE — no structured output
-    from langchain_huggingface import ChatHuggingFace
-
     print("🔁 Falling back to HuggingFace LLM")
 
-    return ChatHuggingFace(
-        repo_id="meta-llama/Meta-Llama-3.1-8B-Instruct",
+    return get_llm(
+        "huggingface",
+        "meta-llama/Meta-Llama-3.1-8B-Instruct",
         temperature=0.2,
         max_new_tokens=2048,
         streaming=False
@@ -54,22 +29,29 @@ def load_llm(
 ):
     """
     streaming=False → cached singleton
-    streaming=True  → fresh instance with callbacks
+    streaming=True  → shared streaming client, callbacks bound per call
+
+    Starting `ollama serve`, pulling and preloading the model happen in the
+    residency manager's background thread (src/ollama_residency.py), never here.
     """
     global _cached_llm
 
-    callback_manager = CallbackManager(callbacks or [])
+    residency = get_ollama_residency()
+    residency.start()
+    keep_alive = residency.keep_alive(OLLAMA_MODEL)
 
     # ---------- STREAMING ----------
     if streaming:
         try:
-            return ChatOllama(
-                base_url="http://localhost:11434",
-                model=OLLAMA_MODEL,
+            return get_llm(
+                "ollama",
+                OLLAMA_MODEL,
+                callbacks=callbacks,
                 temperature=0.2,
                 streaming=True,
+                keep_alive=keep_alive,
+                num_ctx=config.LLM_CONTEXT_TOKENS,
                 think=False,                 # 🔥 critical
-                callback_manager=callback_manager,
                 tools=None                  # 🔥 disable tool calling
             )
         except Exception:
@@ -79,27 +61,22 @@ def load_llm(
     if _cached_llm:
         return _cached_llm
 
+    if residency.unreachable():
+        # Not cached: Ollama is tried again once it is back
+        print("❌ Ollama server unreachable")
+        return _load_hf_fallback()
+
     print("⚙ Initializing LLM...")
 
     try:
-        if not is_ollama_running():
-            print("⏳ Starting Ollama server...")
-            subprocess.Popen(
-                ["ollama", "serve"],
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
-            )
-            time.sleep(3)
-
-        check_and_pull_model(OLLAMA_MODEL)
-
-        _cached_llm = ChatOllama(
-            base_url="http://localhost:11434",
-            model=OLLAMA_MODEL,
+        _cached_llm = get_llm(
+            "ollama",
+            OLLAMA_MODEL,
             temperature=0.2,
             streaming=False,
+            keep_alive=keep_alive,
+            num_ctx=config.LLM_CONTEXT_TOKENS,
             think=False,                 # 🔥 critical
-            callback_manager=callback_manager,
             tools=None                  # 🔥 disable tool calling
         )
 
@@ -111,7 +88,6 @@ def load_llm(
         _cached_llm = _load_hf_fallback()
         return _cached_llm
 
-
 # # app/tools/llm_loader.py
 # import subprocess
 # import time
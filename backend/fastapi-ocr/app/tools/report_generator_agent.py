@@ -1,7 +1,8 @@
 from typing import Dict
 from datetime import datetime
-from .llm_loader import load_llm
-from src.vector_store import VectorStoreManager
+from .llm_loader import load_llm, OLLAMA_MODEL
+from src.vector_store_pool import get_vector_store_pool
+from src.context_packer import pack_context
 from app.generators.report_generator import render_html_report
 
 
@@ -21,19 +22,17 @@ class ReportGeneratorAgent:
         section_description: str
     ) -> str:
 
-        manager = VectorStoreManager(context_id)
+        retriever = get_vector_store_pool().get_retriever(context_id)
 
-        if not manager.load_vector_store():
+        if retriever is None:
             raise RuntimeError("Vector store not found for report generation")
 
-        retriever = manager.get_retriever()
-
         # ✅ New LangChain-safe retrieval
         docs = retriever.invoke(
             f"{section_title}: {section_description}"
         )
 
-        context = "\n\n".join(d.page_content for d in docs)
+        context = pack_context(docs, model=OLLAMA_MODEL)
 
         prompt = f"""
 You are writing a factual report section.
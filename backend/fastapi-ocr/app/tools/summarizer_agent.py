@@ -1,30 +1,197 @@
+import re
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
 from .llm_loader import load_llm
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+import config
+from src.context_compressor import compress_for_agent, split_sentences, timed_llm_call
+from src.context_packer import count_tokens, truncate_to_tokens
+from src.summary_cache import get_summary_cache
+
+# Bump when MAP_TEMPLATE changes so cached chunk summaries are not reused
+MAP_PROMPT_VERSION = "v1"
+
+MAP_TEMPLATE = """
+You are an expert analyst. The text below is one part of a longer document.
+Summarize it, keeping names, dates, amounts, identifiers and events.
+
+TEXT:
+{text}
+
+PART SUMMARY (2-3 sentences):
+"""
+
+MERGE_TEMPLATE = """
+You are an expert analyst. The notes below summarize consecutive parts of one document, in order.
+Merge them into one summary that keeps every key fact.
+
+NOTES:
+{text}
+
+MERGED SUMMARY:
+"""
+
+# Blank lines and OCR page breaks
+_PARAGRAPH_RE = re.compile(r"\n\s*\n|\f")
+
+def _is_anchor(sentence: str, every: int) -> bool:
+    """Content-defined chunk boundary: depends on the sentence only, not on its position."""
+    digest = hashlib.blake2b(sentence.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % every == 0
+
+def chunk_document(text: str, max_tokens: int, model: str = None) -> list:
+    """
+    Split text into chunks of whole sentences, each at most max_tokens.
+
+    Once a chunk holds a quarter of the budget it ends at the next paragraph
+    or page break, or at an anchor sentence picked by its hash. Boundaries
+    follow the content rather than a running token count, so an edit only
+    changes the chunks around it and the rest still hit the summary cache.
+    """
+    min_tokens = max_tokens // 4
+    anchor_every = max(2, max_tokens // 100)
+    chunks, current, used = [], [], 0
+
+    def close():
+        nonlocal current, used
+        if current:
+            chunks.append("\n".join(current))
+        current, used = [], 0
+
+    for paragraph in _PARAGRAPH_RE.split(text):
+        for sentence in split_sentences(paragraph):
+            cost = count_tokens(sentence, model) + 1
+            while cost > max_tokens:
+                # One sentence over the budget (e.g. a table dump): cut it
+                head = truncate_to_tokens(sentence, max_tokens, model)
+                close()
+                chunks.append(head)
+                sentence = sentence[len(head):].strip()
+                cost = count_tokens(sentence, model) + 1 if sentence else 0
+            if not sentence:
+                continue
+            if used + cost > max_tokens:
+                close()
+            current.append(sentence)
+            used += cost
+            if used >= min_tokens and _is_anchor(sentence, anchor_every):
+                close()
+        if used >= min_tokens:
+            close()
+    close()
+    return chunks
+
 class SummarizerAgent:
-    def __init__(self):
+    def __init__(self, compress: bool = None):
         self.llm = load_llm()
+        # None → opt-in via config.COMPRESSION_AGENTS ("summarizer")
+        self.compress = compress
+
+    def _chain(self, template: str):
+        return PromptTemplate.from_template(template) | self.llm | StrOutputParser()
+
+    def run(self, text: str, document: str = None, mode: str = None) -> str:
+        """
+        text → single prompt (as before)
+        document → the full source; summarized map-reduce when it does not fit one prompt
+        mode → "auto" | "single" | "map_reduce" (default: config.SUMMARY_MODE)
+        """
+        if not text and not document: return "No text provided for summary."
+
+        mode = mode or config.SUMMARY_MODE
+        source = document or text
+        if mode == "map_reduce" or (mode == "auto" and count_tokens(source) > config.SUMMARY_CHUNK_TOKENS):
+            return self.run_map_reduce(source)
 
-    def run(self, text: str) -> str:
-        if not text: return "No text provided for summary."
+        prompt_text = compress_for_agent("summarizer", text, self.compress, query="key facts and main points")
 
         # Template defines the strict output format
         template = """
         You are an expert analyst. Summarize the following text efficiently.
-        
+
         TEXT:
         {text}
-        
+
         SUMMARY (3-4 sentences):
         """
-        
+
         prompt = PromptTemplate.from_template(template)
-        
+
         # PIPE SYNTAX: Prompt -> LLM -> String Cleaner
         chain = prompt | self.llm | StrOutputParser()
-        
+
+        try:
+            with timed_llm_call("summarizer", prompt_text is not text):
+                return chain.invoke({"text": prompt_text})
+        except Exception as e:
+            return f"Summary Error: {str(e)}"
+
+    # ------------------------------------------------------------------
+    # MAP-REDUCE (long documents)
+    # ------------------------------------------------------------------
+    def _map(self, chunks: list) -> list:
+        """Chunk summaries in document order; cached chunks skip the LLM."""
+        cache = get_summary_cache()
+        cache_key = f"{getattr(self.llm, 'model', None) or type(self.llm).__name__}|{MAP_PROMPT_VERSION}"
+        summaries = cache.get_many(cache_key, chunks) if cache else {}
+        missing = list(dict.fromkeys(c for c in chunks if c not in summaries))
+
+        chain = self._chain(MAP_TEMPLATE)
+
+        def summarize(chunk):
+            try:
+                return chunk, chain.invoke({"text": chunk}).strip()
+            except Exception as e:
+                print(f"⚠ Chunk summary failed: {e}")
+                return chunk, None
+
+        if missing:
+            # Bounded: the LLM server only runs a few generations at once
+            with ThreadPoolExecutor(max_workers=config.SUMMARY_MAX_PARALLEL) as executor:
+                for chunk, summary in executor.map(summarize, missing):
+                    if summary:
+                        summaries[chunk] = summary
+                        if cache:
+                            cache.put(cache_key, chunk, summary)
+
+        print(f"⧗ Summary map: {len(chunks)} chunks, {len(chunks) - len(missing)} cached")
+        return [summaries[c] for c in chunks if c in summaries]
+
+    def _reduce(self, partials: list) -> list:
+        """Merge partial summaries group-wise until they fit one prompt."""
+        chain = self._chain(MERGE_TEMPLATE)
+        while len(partials) > 1 and count_tokens("\n".join(partials)) > config.SUMMARY_CHUNK_TOKENS:
+            groups = chunk_document("\n".join(partials), config.SUMMARY_CHUNK_TOKENS)
+            if len(groups) >= len(partials):
+                break  # partials too long to group; the final prompt truncates
+            with ThreadPoolExecutor(max_workers=config.SUMMARY_MAX_PARALLEL) as executor:
+                partials = list(executor.map(lambda g: chain.invoke({"text": g}).strip(), groups))
+        return partials
+
+    def run_map_reduce(self, document: str) -> str:
+        t0 = time.perf_counter()
+        chunks = chunk_document(document, config.SUMMARY_CHUNK_TOKENS)
         try:
-            return chain.invoke({"text": text})
+            partials = self._reduce(self._map(chunks))
+            if not partials:
+                return "Summary Error: no part of the document could be summarized."
+
+            notes = truncate_to_tokens("\n".join(partials), config.SUMMARY_CHUNK_TOKENS)
+            summary = self._chain("""
+        You are an expert analyst. The notes below summarize consecutive parts of one document, in order.
+        Summarize the whole document efficiently.
+
+        NOTES:
+        {text}
+
+        SUMMARY (3-4 sentences):
+        """).invoke({"text": notes})
         except Exception as e:
-            return f"Summary Error: {str(e)}"
\ No newline at end of file
+            return f"Summary Error: {str(e)}"
+
+        print(f"✔ Map-reduce summary of {len(chunks)} chunks in {time.perf_counter() - t0:.1f}s")
+        return summary
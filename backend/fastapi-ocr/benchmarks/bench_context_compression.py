@@ -0,0 +1,116 @@
+"""
+Context Compression Benchmark
+
+Compresses synthetic OCR-style case files with src/context_compressor.py
+and reports, per method (centroid, textrank; with and without a task
+query): prompt tokens before/after, reduction and compression time. With
+--llm, SummarizerAgent runs on raw and compressed input against the local
+LLM to compare end-to-end latency.
+
+Usage:
+    python benchmarks/bench_context_compression.py --docs 20 --sentences 400 --budget 1500
+    python benchmarks/bench_context_compression.py --llm --docs 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.context_compressor import COMPRESSION_METHODS, compress_text
+from src.context_packer import count_tokens
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_embedding_backends import sample_sentences
+from bench_local_vector_store import percentile_ms
+
+QUERY = "key facts and main points"
+
+
+def build_documents(n: int, sentences: int):
+    corpus = sample_sentences(n * sentences, seed=9)
+    return [
+        "\n".join(s.capitalize() + "." for s in corpus[i * sentences:(i + 1) * sentences])
+        for i in range(n)
+    ]
+
+
+def measure(documents, budget, method, query, model):
+    tokens_in = tokens_out = 0
+    times = []
+    for text in documents:
+        t0 = time.perf_counter()
+        compressed = compress_text(text, max_tokens=budget, query=query, method=method, model=model)
+        times.append(time.perf_counter() - t0)
+        tokens_in += count_tokens(text, model)
+        tokens_out += count_tokens(compressed, model)
+
+    return {
+        "mean_tokens_in": round(tokens_in / len(documents)),
+        "mean_tokens_out": round(tokens_out / len(documents)),
+        "token_reduction_pct": round(100.0 * (1 - tokens_out / tokens_in), 1),
+        "compress_p50_ms": percentile_ms(times, 50),
+        "compress_p95_ms": percentile_ms(times, 95),
+    }
+
+
+def measure_llm(documents):
+    from app.tools.summarizer_agent import SummarizerAgent
+
+    results = {}
+    for label, compress in (("raw", False), ("compressed", True)):
+        agent = SummarizerAgent(compress=compress)
+        times = []
+        for text in documents:
+            t0 = time.perf_counter()
+            agent.run(text)
+            times.append(time.perf_counter() - t0)
+        results[label] = {"p50_ms": percentile_ms(times, 50), "p95_ms": percentile_ms(times, 95)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--sentences", type=int, default=400, help="sentences per document")
+    parser.add_argument("--budget", type=int, default=config.COMPRESSION_TOKEN_BUDGET, help="token budget")
+    parser.add_argument("--model", default="llama3", help="tokenizer used for counting")
+    parser.add_argument("--llm", action="store_true", help="also time SummarizerAgent end to end")
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    config.COMPRESSION_TOKEN_BUDGET = args.budget
+    documents = build_documents(args.docs, args.sentences)
+    compress_text(documents[0], max_tokens=args.budget, model=args.model)  # embedding model load
+
+    results = {"docs": args.docs, "sentences": args.sentences, "budget": args.budget}
+    for method in COMPRESSION_METHODS:
+        results[method] = measure(documents, args.budget, method, None, args.model)
+        results[f"{method}+query"] = measure(documents, args.budget, method, QUERY, args.model)
+    if args.llm:
+        results["summarizer"] = measure_llm(documents)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{args.docs} docs x {args.sentences} sentences, budget {args.budget} tokens")
+    for method in COMPRESSION_METHODS:
+        for key in (method, f"{method}+query"):
+            r = results[key]
+            print(
+                f"{key:>15}: {r['mean_tokens_in']:,} → {r['mean_tokens_out']:,} tokens "
+                f"(-{r['token_reduction_pct']}%) | compress p50 {r['compress_p50_ms']} ms  p95 {r['compress_p95_ms']} ms"
+            )
+    if "summarizer" in results:
+        s = results["summarizer"]
+        print(
+            f"SummarizerAgent: raw p50 {s['raw']['p50_ms']} ms  p95 {s['raw']['p95_ms']} ms | "
+            f"compressed p50 {s['compressed']['p50_ms']} ms  p95 {s['compressed']['p95_ms']} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
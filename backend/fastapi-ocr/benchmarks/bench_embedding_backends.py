@@ -0,0 +1,98 @@
+"""
+Embedding Backend Benchmark
+
+Compares the PyTorch sentence-transformers path with the ONNX Runtime
+backend in src/embedding_backend.py (float32 and dynamic int8) on CPU:
+sentences/second and cosine agreement with the PyTorch embeddings.
+
+Usage:
+    python benchmarks/bench_embedding_backends.py --model sentence-transformers/all-MiniLM-L6-v2
+    python benchmarks/bench_embedding_backends.py --model sentence-transformers/all-mpnet-base-v2 --threads 4
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.embedding_backend import OnnxSentenceEncoder
+
+_WORDS = (
+    "complainant accused police station fir registered section ipc statement witness "
+    "transaction account bank transfer amount rupees mobile number call record address "
+    "vehicle seized evidence court hearing bail investigation officer report dated "
+    "incident location village district property dispute threat injury hospital"
+).split()
+
+
+def sample_sentences(n: int, seed: int = 0):
+    """Case-file flavoured sentences of 8-120 words (short queries to long chunks)."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 120))) for _ in range(n)]
+
+
+def throughput(encode, sentences, batch_size, repeats):
+    encode(sentences[:batch_size], batch_size=batch_size, normalize_embeddings=True)  # warm-up
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        vectors = encode(sentences, batch_size=batch_size, normalize_embeddings=True)
+        best = min(best, time.perf_counter() - t0)
+    return np.asarray(vectors, dtype=np.float32), len(sentences) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--sentences", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime / torch intra-op threads")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    sentences = sample_sentences(args.sentences)
+    results = {"model": args.model, "sentences": args.sentences, "batch_size": args.batch_size, "backends": []}
+
+    print("⧗ PyTorch...", file=sys.stderr)
+    reference, rate = throughput(SentenceTransformer(args.model, device="cpu").encode, sentences, args.batch_size, args.repeats)
+    results["backends"].append({"backend": "torch", "sentences_per_sec": round(rate, 1)})
+
+    for quantize in (False, True):
+        name = "onnx-int8" if quantize else "onnx-fp32"
+        print(f"⧗ {name}...", file=sys.stderr)
+        encoder = OnnxSentenceEncoder(args.model, quantize=quantize, intra_op_threads=args.threads)
+        vectors, rate = throughput(encoder.encode, sentences, args.batch_size, args.repeats)
+        cosine = (vectors * reference).sum(axis=1)
+        results["backends"].append({
+            "backend": name,
+            "sentences_per_sec": round(rate, 1),
+            "speedup": round(rate / results["backends"][0]["sentences_per_sec"], 2),
+            "cosine_mean": round(float(cosine.mean()), 5),
+            "cosine_min": round(float(cosine.min()), 5),
+        })
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"Model: {args.model}  sentences={args.sentences}  batch={args.batch_size}")
+    for row in results["backends"]:
+        line = f"{row['backend']:<10} {row['sentences_per_sec']:>9} sent/s"
+        if "cosine_mean" in row:
+            line += f"  x{row['speedup']}  cosine mean={row['cosine_mean']} min={row['cosine_min']}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
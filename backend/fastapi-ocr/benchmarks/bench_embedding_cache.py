@@ -0,0 +1,87 @@
+"""
+Embedding Cache Benchmark
+
+Replays the embedding work of a folder re-analysis through encode_texts()
+twice, first against an empty cache (cold) and then against the filled one
+(warm). Per file that work is:
+- run_folder_analysis: embed the raw OCR text
+- index_folder_to_vector_store: embed the cleaned text
+- store_embeddings: embed the 800-character chunks
+
+Usage:
+    python benchmarks/bench_embedding_cache.py --files 200
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.embedding_backend import encode_texts, embedding_stats
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_embedding_backends import sample_sentences
+
+
+def file_workload(files: int):
+    """Embedding calls of one re-analysis, as lists of texts per call."""
+    calls = []
+    for i, sentence in enumerate(sample_sentences(files, seed=7)):
+        raw = f"FILE {i}\n\n" + "  ".join([sentence] * 4)
+        cleaned = " ".join(raw.split())
+        chunks = [cleaned[s:s + 800] for s in range(0, len(cleaned), 650)]
+        calls.extend([[raw], [cleaned], chunks])
+    return calls
+
+
+def run(calls, encode_texts):
+    t0 = time.perf_counter()
+    for texts in calls:
+        encode_texts(texts)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="embedding-cache-bench-")
+    config.EMBEDDING_CACHE = True
+    config.EMBEDDING_CACHE_PATH = os.path.join(cache_dir, "embeddings.sqlite3")
+
+    try:
+        calls = file_workload(args.files)
+        encode_texts(["warm up the model"])  # model load is not cache work
+
+        cold = run(calls, encode_texts)
+        warm = run(calls, encode_texts)
+        cache = embedding_stats()["cache"]
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    results = {
+        "files": args.files,
+        "texts": sum(len(c) for c in calls),
+        "cold_seconds": round(cold, 3),
+        "warm_seconds": round(warm, 3),
+        "speedup": round(cold / max(warm, 1e-9), 1),
+        "cache": cache,
+    }
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"Re-analysis of {args.files} files ({results['texts']} texts)")
+    print(f"cold: {results['cold_seconds']}s  warm: {results['warm_seconds']}s  x{results['speedup']}")
+    print(f"cache: {cache['entries']} entries, {cache['size_mb']} MB, hit rate {cache['hit_rate']}")
+
+
+if __name__ == "__main__":
+    main()
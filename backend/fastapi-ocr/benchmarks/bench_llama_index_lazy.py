@@ -0,0 +1,99 @@
+"""
+Lazy LlamaIndex Benchmark
+
+Measures VectorStoreManager.load_vector_store() and add_documents()
+latency on a scratch Chroma directory in two modes:
+- lazy:  the LlamaIndex view is never touched (LangChain-only callers)
+- eager: the view is rebuilt after every call, as the manager used to do
+
+Usage:
+    python benchmarks/bench_llama_index_lazy.py --chunks 2000 --rounds 20
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from langchain_core.documents import Document
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_embedding_backends import sample_sentences
+from bench_local_vector_store import percentile_ms
+
+
+def measure(manager, documents, rounds: int, eager: bool):
+    load_times, add_times = [], []
+    for i in range(rounds):
+        t0 = time.perf_counter()
+        manager.load_vector_store()
+        if eager:
+            manager.invalidate_llama_index()
+            manager.llama_index
+        load_times.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        manager.add_documents([documents[i % len(documents)]])
+        if eager:
+            manager.llama_index
+        add_times.append(time.perf_counter() - t0)
+
+    return {
+        "load_p50_ms": percentile_ms(load_times, 50),
+        "load_p95_ms": percentile_ms(load_times, 95),
+        "add_p50_ms": percentile_ms(add_times, 50),
+        "add_p95_ms": percentile_ms(add_times, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks preloaded into the collection")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    chroma_dir = tempfile.mkdtemp(prefix="llama-lazy-bench-")
+    config.CHROMA_PERSIST_DIRECTORY = chroma_dir
+    from src.vector_store import VectorStoreManager
+
+    try:
+        manager = VectorStoreManager("bench")
+        documents = [
+            Document(page_content=text, metadata={"video_id": "bench", "chunk_index": i})
+            for i, text in enumerate(sample_sentences(args.chunks + args.rounds, seed=3))
+        ]
+        print(f"⧗ Loading {args.chunks:,} chunks...", file=sys.stderr)
+        for start in range(0, args.chunks, 500):
+            manager.add_documents(documents[start:min(start + 500, args.chunks)])
+
+        extra = documents[args.chunks:]
+        manager.llama_index  # embedding model load is not per-call work
+        results = {
+            "chunks": args.chunks,
+            "rounds": args.rounds,
+            "eager": measure(manager, extra, args.rounds, eager=True),
+            "lazy": measure(manager, extra, args.rounds, eager=False),
+        }
+    finally:
+        shutil.rmtree(chroma_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{args.chunks:,} chunks, {args.rounds} rounds")
+    for mode in ("eager", "lazy"):
+        r = results[mode]
+        print(
+            f"{mode:>5}: load p50 {r['load_p50_ms']} ms  p95 {r['load_p95_ms']} ms | "
+            f"add p50 {r['add_p50_ms']} ms  p95 {r['add_p95_ms']} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
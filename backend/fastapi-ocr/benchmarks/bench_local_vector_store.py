@@ -0,0 +1,118 @@
+"""
+Local Vector Backend Benchmark
+
+Measures recall@k and query latency of the IVF index in
+src/local_vector_store.py against exact brute-force NumPy search on a
+synthetic clustered corpus (default: 1M chunks, 384 dims like
+all-MiniLM-L6-v2).
+
+Usage:
+    python benchmarks/bench_local_vector_store.py --n 1000000 --nprobe 8 16 32 64
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.local_vector_store import IVFIndex, _normalize_rows, _top_k
+
+
+def synthetic_corpus(n: int, dim: int, topics: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors: documents about the same case sit close together."""
+    rng = np.random.default_rng(seed)
+    centers = _normalize_rows(rng.standard_normal((topics, dim)))
+    corpus = np.empty((n, dim), dtype=np.float32)
+    batch = 100000
+    for start in range(0, n, batch):
+        size = min(batch, n - start)
+        labels = rng.integers(0, topics, size)
+        noise = rng.standard_normal((size, dim)).astype(np.float32) * 0.06
+        corpus[start:start + size] = _normalize_rows(centers[labels] + noise)
+    return corpus
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=1_000_000, help="corpus size")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    print(f"⧗ Generating {args.n:,} x {args.dim} corpus...", file=sys.stderr)
+    corpus = synthetic_corpus(args.n, args.dim, args.topics)
+
+    rng = np.random.default_rng(1)
+    seeds = corpus[rng.choice(args.n, args.queries, replace=False)]
+    queries = _normalize_rows(seeds + rng.standard_normal(seeds.shape).astype(np.float32) * 0.04)
+
+    # ---------------- brute force ground truth ----------------
+    exact, brute_times = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        exact.append(set(_top_k(corpus @ q, args.k).tolist()))
+        brute_times.append(time.perf_counter() - t0)
+
+    # ---------------- IVF ----------------
+    t0 = time.perf_counter()
+    index = IVFIndex(nlist=args.nlist)
+    index.train(corpus)
+    build_s = time.perf_counter() - t0
+
+    results = {
+        "n": args.n,
+        "dim": args.dim,
+        "k": args.k,
+        "nlist": index.nlist,
+        "build_seconds": round(build_s, 2),
+        "brute_force": {
+            "p50_ms": percentile_ms(brute_times, 50),
+            "p95_ms": percentile_ms(brute_times, 95),
+        },
+        "ivf": [],
+    }
+
+    for nprobe in args.nprobe:
+        recalls, times = [], []
+        for q, truth in zip(queries, exact):
+            t0 = time.perf_counter()
+            candidates = index.candidates(q, nprobe=nprobe)
+            scores = corpus[candidates] @ q
+            found = candidates[_top_k(scores, args.k)]
+            times.append(time.perf_counter() - t0)
+            recalls.append(len(truth.intersection(found.tolist())) / args.k)
+
+        results["ivf"].append({
+            "nprobe": nprobe,
+            f"recall@{args.k}": round(float(np.mean(recalls)), 4),
+            "p50_ms": percentile_ms(times, 50),
+            "p95_ms": percentile_ms(times, 95),
+        })
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"Corpus: {args.n:,} x {args.dim}  nlist={index.nlist}  build={results['build_seconds']}s")
+    print(f"Brute force  p50={results['brute_force']['p50_ms']}ms  p95={results['brute_force']['p95_ms']}ms")
+    for row in results["ivf"]:
+        print(
+            f"IVF nprobe={row['nprobe']:<4} recall@{args.k}={row[f'recall@{args.k}']:.4f}  "
+            f"p50={row['p50_ms']}ms  p95={row['p95_ms']}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
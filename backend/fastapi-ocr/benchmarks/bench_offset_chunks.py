@@ -0,0 +1,131 @@
+"""
+Offset Chunk Benchmark
+
+Compares the full-text chunk format with offset-based pointers
+(src/chunk_offsets.py) on synthetic sources split like store_embeddings():
+- storage: text + metadata bytes written to the vector store (pointers
+  also pay for each source text once, in the source text store)
+- search payload: bytes a k-result search returns before hydration
+- hydration: latency of resolving k pointers from a scratch text store
+
+Usage:
+    python benchmarks/bench_offset_chunks.py --sources 200 --k 8
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_embedding_backends import sample_sentences
+from bench_local_vector_store import percentile_ms
+
+
+def build_sources(n: int, sentences_per_source: int, seed: int = 0):
+    sentences = sample_sentences(n * sentences_per_source, seed=seed)
+    return [
+        ". ".join(sentences[i * sentences_per_source:(i + 1) * sentences_per_source])
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=int, default=200)
+    parser.add_argument("--sentences", type=int, default=40, help="sentences per source")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--k", type=int, default=8, help="results per search")
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    store_dir = tempfile.mkdtemp(prefix="offset-chunk-bench-")
+    config.SOURCE_TEXT_STORE_PATH = os.path.join(store_dir, "source_texts.sqlite3")
+    config.OFFSET_CHUNKS = True
+    from src.chunk_offsets import (
+        get_source_text_store,
+        hydrate_documents,
+        offset_documents,
+        payload_bytes,
+        storage_text,
+        versioned_record_id,
+    )
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        separators=["\n\n", "\n", ".", " ", ""],
+    )
+
+    try:
+        text_store = get_source_text_store()
+        full_docs, pointer_docs = [], []
+        for i, text in enumerate(build_sources(args.sources, args.sentences)):
+            metadata = {"user_id": "bench", "source": f"source-{i}"}
+            record_id = versioned_record_id(f"rag/bench/source-{i}", text)
+            text_store.put(record_id, text)
+            for doc in offset_documents(splitter, text, metadata, record_id):
+                full_docs.append(Document(page_content=doc.page_content, metadata=dict(metadata)))
+                pointer_docs.append(Document(page_content=storage_text(doc), metadata=doc.metadata))
+
+        source_bytes = text_store.size_bytes()
+        full_bytes = payload_bytes(full_docs)
+        pointer_bytes = payload_bytes(pointer_docs)
+
+        rng = random.Random(1)
+        full_payload, pointer_payload, hydrate_times = [], [], []
+        for _ in range(args.searches):
+            rows = rng.sample(range(len(pointer_docs)), args.k)
+            full_payload.append(payload_bytes(full_docs[r] for r in rows))
+            pointer_payload.append(payload_bytes(pointer_docs[r] for r in rows))
+
+            t0 = time.perf_counter()
+            hydrated = hydrate_documents(pointer_docs[r] for r in rows)
+            hydrate_times.append(time.perf_counter() - t0)
+            assert [d.page_content for d in hydrated] == [full_docs[r].page_content for r in rows]
+
+        results = {
+            "sources": args.sources,
+            "chunks": len(pointer_docs),
+            "k": args.k,
+            "storage": {
+                "full_text_bytes": full_bytes,
+                "pointer_bytes": pointer_bytes,
+                "source_text_bytes": source_bytes,
+                "pointer_total_bytes": pointer_bytes + source_bytes,
+            },
+            "search_payload": {
+                "full_text_mean_bytes": round(sum(full_payload) / len(full_payload)),
+                "pointer_mean_bytes": round(sum(pointer_payload) / len(pointer_payload)),
+            },
+            "hydration": {
+                "p50_ms": percentile_ms(hydrate_times, 50),
+                "p95_ms": percentile_ms(hydrate_times, 95),
+            },
+        }
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    s, p, h = results["storage"], results["search_payload"], results["hydration"]
+    print(f"{results['sources']:,} sources, {results['chunks']:,} chunks")
+    print(f"storage   full text {s['full_text_bytes']:,} B | pointers {s['pointer_bytes']:,} B + sources {s['source_text_bytes']:,} B")
+    print(f"k={args.k} payload  full text {p['full_text_mean_bytes']:,} B | pointers {p['pointer_mean_bytes']:,} B")
+    print(f"hydration p50 {h['p50_ms']} ms  p95 {h['p95_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Vector Quantization Benchmark
+
+Compares memory per vector and recall@k of the compact formats in
+src/vector_quantization.py (float16, int8) against full float32 search,
+with and without full-precision rescoring.
+
+Usage:
+    python benchmarks/bench_quantization.py --n 200000 --rescore-factor 4
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.local_vector_store import _normalize_rows, _top_k
+from src.vector_quantization import QuantizedMatrix, rescore
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_local_vector_store import synthetic_corpus, percentile_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200_000, help="corpus size")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    print(f"⧗ Generating {args.n:,} x {args.dim} corpus...", file=sys.stderr)
+    corpus = synthetic_corpus(args.n, args.dim, args.topics)
+
+    rng = np.random.default_rng(1)
+    seeds = corpus[rng.choice(args.n, args.queries, replace=False)]
+    queries = _normalize_rows(seeds + rng.standard_normal(seeds.shape).astype(np.float32) * 0.04)
+    exact = [set(_top_k(corpus @ q, args.k).tolist()) for q in queries]
+
+    all_rows = np.arange(args.n)
+    results = {
+        "n": args.n,
+        "dim": args.dim,
+        "k": args.k,
+        "rescore_factor": args.rescore_factor,
+        "modes": [{
+            "mode": "float32",
+            "bytes_per_vector": corpus.nbytes / args.n,
+            "resident_mb": round(corpus.nbytes / 2**20, 1),
+            f"recall@{args.k}": 1.0,
+        }],
+    }
+
+    for mode in ("float16", "int8"):
+        compact = QuantizedMatrix.from_float(corpus, mode)
+        plain_recall, rescored_recall, plain_times, rescored_times = [], [], [], []
+
+        for q, truth in zip(queries, exact):
+            t0 = time.perf_counter()
+            approx = compact.dot(q)
+            found = _top_k(approx, args.k)
+            plain_times.append(time.perf_counter() - t0)
+            plain_recall.append(len(truth.intersection(found.tolist())) / args.k)
+
+            t0 = time.perf_counter()
+            approx = compact.dot(q)
+            hits = rescore(all_rows, approx, q, lambda rows: corpus[rows], args.k, args.rescore_factor)
+            rescored_times.append(time.perf_counter() - t0)
+            rescored_recall.append(len(truth.intersection(row for row, _ in hits)) / args.k)
+
+        results["modes"].append({
+            "mode": mode,
+            "bytes_per_vector": compact.nbytes / args.n,
+            "resident_mb": round(compact.nbytes / 2**20, 1),
+            f"recall@{args.k}": round(float(np.mean(plain_recall)), 4),
+            f"recall@{args.k}_rescored": round(float(np.mean(rescored_recall)), 4),
+            "p50_ms": percentile_ms(plain_times, 50),
+            "rescored_p50_ms": percentile_ms(rescored_times, 50),
+        })
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"Corpus: {args.n:,} x {args.dim}  k={args.k}  rescore_factor={args.rescore_factor}")
+    for row in results["modes"]:
+        line = (
+            f"{row['mode']:<8} {row['bytes_per_vector']:>7.1f} B/vec  {row['resident_mb']:>8} MB  "
+            f"recall@{args.k}={row[f'recall@{args.k}']:.4f}"
+        )
+        if f"recall@{args.k}_rescored" in row:
+            line += (
+                f"  rescored={row[f'recall@{args.k}_rescored']:.4f}"
+                f"  p50={row['p50_ms']}ms  rescored_p50={row['rescored_p50_ms']}ms"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Query Expansion Benchmark
+
+Compares multi-query expansion modes of src/query_expansion.py on a
+synthetic corpus held in a scratch BM25 index: expansion latency and
+end-to-end (expand + retrieve) latency per request, p50/p95. With --llm
+the RAGChain paraphrasing prompt is timed against the local llama3
+(Ollama) as the baseline.
+
+Usage:
+    python benchmarks/bench_query_expansion.py --chunks 5000 --queries 100
+    python benchmarks/bench_query_expansion.py --llm --queries 10
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from langchain_core.documents import Document
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_embedding_backends import _WORDS, sample_sentences
+from bench_local_vector_store import percentile_ms
+
+LLM_FREE_MODES = ("prf", "neighbors", "aliases", "local")
+
+
+def measure(expander, queries, retrieve, mode, llm_expand=None):
+    from src.query_expansion import retrieve_expanded
+
+    before = expander.latency_ms[mode].total
+    totals, variants = [], 0
+    for query in queries:
+        t0 = time.perf_counter()
+        expanded, _ = retrieve_expanded(query, retrieve, mode, llm_expand=llm_expand, expander=expander)
+        totals.append(time.perf_counter() - t0)
+        variants += len(expanded) - 1
+
+    return {
+        "expand_mean_ms": round((expander.latency_ms[mode].total - before) / len(queries), 3),
+        "total_p50_ms": percentile_ms(totals, 50),
+        "total_p95_ms": percentile_ms(totals, 95),
+        "variants_per_query": round(variants / len(queries), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000, help="chunks in the scratch BM25 index")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--llm", action="store_true", help="also time LLM expansion (local Ollama)")
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="query-expansion-bench-")
+    config.LEXICAL_INDEX_DIRECTORY = os.path.join(scratch, "lexical")
+    config.QUERY_VOCAB_PATH = os.path.join(scratch, "query_vocab.npz")
+    config.ENTITY_ALIASES_PATH = os.path.join(scratch, "entity_aliases.json")
+    from src.lexical_index import LexicalIndex
+    from src.query_expansion import AliasTable, QueryExpander, TermVocabulary
+
+    try:
+        index = LexicalIndex("bench")
+        index.add_documents(
+            Document(page_content=text, metadata={"source": f"doc-{i % 50}"})
+            for i, text in enumerate(sample_sentences(args.chunks, seed=5))
+        )
+
+        t0 = time.perf_counter()
+        vocabulary = TermVocabulary.from_lexical_indexes()
+        vocabulary_seconds = time.perf_counter() - t0
+
+        aliases = AliasTable()
+        rng = random.Random(7)
+        for word in rng.sample(_WORDS, 10):
+            aliases.add(word, [f"{word}-alias"])
+
+        expander = QueryExpander(vocabulary=vocabulary, aliases=aliases)
+        queries = [" ".join(s.split()[:6]) for s in sample_sentences(args.queries, seed=11)]
+
+        def retrieve(query):
+            return index.search(query, k=args.k)
+
+        results = {
+            "chunks": args.chunks,
+            "queries": args.queries,
+            "vocabulary_terms": len(vocabulary),
+            "vocabulary_build_seconds": round(vocabulary_seconds, 2),
+            "none": measure(expander, queries, retrieve, "none"),
+        }
+        for mode in LLM_FREE_MODES:
+            results[mode] = measure(expander, queries, retrieve, mode)
+
+        if args.llm:
+            from app.tools.llm_loader import load_llm
+            from src.rag_chain import RAGChain
+
+            chain = SimpleNamespace(llm=load_llm())
+            results["llm"] = measure(
+                expander, queries, retrieve, "llm",
+                llm_expand=lambda q: RAGChain._expand_queries(chain, q),
+            )
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    print(f"{args.chunks:,} chunks, {args.queries} queries, vocabulary {results['vocabulary_terms']:,} terms")
+    for mode in ("none", *LLM_FREE_MODES, "llm"):
+        if mode not in results:
+            continue
+        r = results[mode]
+        print(
+            f"{mode:>9}: expand {r['expand_mean_ms']} ms | total p50 {r['total_p50_ms']} ms  "
+            f"p95 {r['total_p95_ms']} ms | {r['variants_per_query']} variants/query"
+        )
+
+
+if __name__ == "__main__":
+    main()
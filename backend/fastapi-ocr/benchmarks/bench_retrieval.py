@@ -0,0 +1,399 @@
+"""
+Retrieval Quality Benchmark
+
+Recall@k, MRR and p50/p95 search latency of the retrieval paths over a
+fixture corpus of synthetic OCR-like case documents
+(benchmarks/fixtures/retrieval_cases.json):
+- rag: app/rag_engine._fetch_docs (store_embeddings ingestion, local backend)
+- rag_hybrid: app/rag_engine._fetch_docs_hybrid (vector + BM25)
+- chroma: VectorStoreManager.get_retriever (one context holding the corpus)
+- folder: FolderVectorStore.query (file-level, one folder)
+
+Every query is labeled with the fact spans that answer it; a result is
+relevant when its text contains one of them, so labels hold whatever the
+chunking. Indexes are built in a scratch directory with the embedding
+cache off (unless --embedding-cache), so latency includes query embedding.
+
+Runs are comparable across commits: save one with --output and pass it
+as --baseline to a later run. Change CHUNK_SIZE / CHUNK_OVERLAP /
+RETRIEVAL_K / the embedding model through the usual env vars or flags.
+
+Usage:
+    python benchmarks/bench_retrieval.py --output before.json
+    CHUNK_SIZE=800 python benchmarks/bench_retrieval.py --baseline before.json
+    python benchmarks/bench_retrieval.py --write-fixture --documents 30
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from bench_embedding_backends import _WORDS
+from bench_local_vector_store import percentile_ms
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "retrieval_cases.json")
+TARGETS = ("rag", "rag_hybrid", "chroma", "folder")
+BENCH_USER = "retrieval-bench"
+SCHEMA_VERSION = 1
+
+
+# =========================================================
+# FIXTURE CORPUS
+# =========================================================
+_FIRST = ("Ramesh", "Suresh", "Anita", "Kavita", "Imran", "Farhan", "Priya", "Deepak", "Sunita", "Rajesh",
+          "Manoj", "Pooja", "Vikram", "Neha", "Arjun", "Salma", "Gurpreet", "Harish", "Meena", "Naveen")
+_LAST = ("Kumar", "Sharma", "Verma", "Khan", "Singh", "Yadav", "Patel", "Gupta", "Reddy", "Das",
+         "Mishra", "Chauhan", "Joshi", "Ansari", "Nair", "Thakur")
+_STATIONS = ("Rampur", "Sadar", "Kotwali", "Civil Lines", "Model Town", "Nehru Nagar", "Gandhi Chowk", "Railway Colony")
+_VILLAGES = ("Bhagwanpur", "Sultanpur", "Khajuri", "Devnagar", "Lalpur", "Mohanpur", "Sitapur", "Chandpur", "Kishanganj")
+_LANDMARKS = ("bus stand", "petrol pump", "grain market", "primary school", "water tank", "temple gate", "railway crossing")
+_BANKS = ("State Bank of India", "Punjab National Bank", "Bank of Baroda", "Canara Bank", "HDFC Bank")
+_COURTS = ("Chief Judicial Magistrate", "Sessions Court", "Additional District Judge", "Judicial Magistrate First Class")
+_VEHICLES = ("motorcycle", "scooter", "car", "pickup van", "tractor")
+_COLOURS = ("black", "white", "red", "silver", "blue")
+_OFFENCES = (
+    "snatched a gold chain", "threatened the complainant with a knife", "broke the lock of the shop",
+    "took a loan in the complainant's name", "damaged the boundary wall", "stole two buffaloes",
+)
+# One per planted fact, in _case_document's fact order
+_HEADINGS = ("STATEMENT OF COMPLAINANT", "BANK TRANSACTION DETAILS", "CALL DETAIL RECORD",
+             "SEIZURE MEMO", "STATEMENT OF WITNESS", "PROGRESS OF INVESTIGATION")
+_OCR_SWAPS = (("o", "0"), ("l", "1"), ("i", "l"), ("e", "c"), ("m", "rn"), ("s", "5"))
+
+
+def _date(rng):
+    return f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(2019, 2024)}"
+
+
+def _filler(rng, sentences):
+    """Case-file noise: random case vocabulary, OCR character swaps, hard-wrapped lines."""
+    words = []
+    for _ in range(sentences):
+        sentence = [rng.choice(_WORDS) for _ in range(rng.randint(6, 25))]
+        sentence = [
+            w.replace(*rng.choice(_OCR_SWAPS), 1) if rng.random() < 0.04 else w
+            for w in sentence
+        ]
+        words.extend(sentence[:-1] + [sentence[-1] + "."])
+
+    lines, line = [], []
+    width = rng.randint(60, 90)
+    for w in words:
+        if line and len(" ".join(line + [w])) > width:
+            lines.append(" ".join(line))
+            line = []
+        line.append(w)
+    lines.append(" ".join(line))
+    return "\n".join(lines)
+
+
+def _case_document(rng, people, index):
+    """One case file with six planted facts; returns (text, [(kind, query, span)])."""
+    complainant, accused, witness, holder = people
+    station = rng.choice(_STATIONS)
+    village = rng.choice(_VILLAGES)
+    landmark = rng.choice(_LANDMARKS)
+    fir = f"{rng.randint(100, 999)}/{rng.randint(2019, 2024)}"
+    offence = rng.choice(_OFFENCES)
+    amount = f"{rng.randint(10, 990) * 1000:,}"
+    account_from, account_to = (str(rng.randint(10 ** 10, 10 ** 11 - 1)) for _ in range(2))
+    mobile_a, mobile_b = (f"9{rng.randint(10 ** 8, 10 ** 9 - 1)}" for _ in range(2))
+    calls = rng.randint(12, 480)
+    registration = f"UP{rng.randint(10, 99)} {rng.choice('ABCDEFGHJK')}{rng.choice('ABCDEFGHJK')} {rng.randint(1000, 9999)}"
+    vehicle = f"{rng.choice(_COLOURS)} {rng.choice(_VEHICLES)}"
+    court = rng.choice(_COURTS)
+    hearing = f"{index % 28 + 1:02d}.{rng.randint(1, 12):02d}.{2025 + index // 28}"  # unique per case
+    hour = f"{rng.randint(1, 11)}:{rng.choice(('00', '15', '30', '45'))} {rng.choice(('AM', 'PM'))}"
+
+    facts = [
+        ("paraphrase",
+         f"The complainant {complainant}, resident of {village}, stated that on {_date(rng)} "
+         f"the accused {accused} {offence}.",
+         f"What did {accused} do to {complainant}?",
+         f"{accused} {offence}"),
+        ("paraphrase",
+         f"An amount of Rs. {amount} was transferred from account No. {account_from} to account "
+         f"No. {account_to} held by {holder} at {rng.choice(_BANKS)}.",
+         f"How much money was transferred to the account of {holder}?",
+         f"Rs. {amount} was transferred"),
+        ("identifier",
+         f"Call detail records show {calls} calls between mobile No. {mobile_a} and mobile No. {mobile_b}.",
+         f"How many calls between {mobile_a} and {mobile_b}?",
+         f"{calls} calls between mobile No. {mobile_a}"),
+        ("identifier",
+         f"A {vehicle} bearing registration No. {registration} was seized near the {landmark}, {village}.",
+         f"Where was vehicle {registration} seized?",
+         f"registration No. {registration} was seized"),
+        ("paraphrase",
+         f"Witness {witness} stated having seen {accused} near the {landmark} at about {hour}.",
+         f"What did {witness} see near the {landmark}?",
+         f"Witness {witness} stated"),
+        ("multi_hop",
+         f"The next hearing in this matter before the {court} is fixed for {hearing}.",
+         f"When is the next hearing of FIR No. {fir} of {station} police station?",
+         f"is fixed for {hearing}"),
+    ]
+
+    header = (
+        f"OFFICE OF THE STATION HOUSE OFFICER\n{station.upper()} POLICE STATION\n"
+        f"FIR No. {fir}    Dated: {_date(rng)}\nCase file {index + 1}"
+    )
+    sections = []
+    for heading, (_, sentence, _, _) in zip(_HEADINGS, facts):
+        # The fact sits inside the section's noise, on its own line
+        before, after = _filler(rng, rng.randint(2, 5)), _filler(rng, rng.randint(1, 4))
+        sections.append(f"{heading}\n{before}\n{sentence}\n{after}")
+    rng.shuffle(sections)
+    return "\n\n".join([header] + sections), [(kind, query, span) for kind, _, query, span in facts]
+
+
+def build_fixture(documents: int = 30, seed: int = 0) -> dict:
+    """Deterministic fixture corpus with labeled query -> fact span pairs."""
+    rng = random.Random(seed)
+    names = [f"{first} {last}" for first in _FIRST for last in _LAST]
+    people = rng.sample(names, 4 * documents)
+
+    docs, queries = [], []
+    for i in range(documents):
+        text, facts = _case_document(rng, people[4 * i:4 * i + 4], i)
+        doc_id = f"case-{i + 1:03d}"
+        docs.append({"id": doc_id, "source": f"{doc_id}.pdf", "text": text})
+        for kind, query, span in facts:
+            queries.append({"query": query, "kind": kind, "source": f"{doc_id}.pdf", "relevant": [span]})
+
+    corpus = "\n".join(d["text"] for d in docs)
+    ambiguous = [q["relevant"][0] for q in queries if corpus.count(q["relevant"][0]) != 1]
+    if ambiguous:
+        raise ValueError(f"Fixture spans not unique in the corpus: {ambiguous[:3]}")
+    return {"version": SCHEMA_VERSION, "seed": seed, "documents": docs, "queries": queries}
+
+
+def load_fixture(path: str):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return json.loads(raw), hashlib.sha256(raw).hexdigest()
+
+
+# =========================================================
+# METRICS
+# =========================================================
+def first_relevant_rank(texts, spans):
+    """1-based rank of the first result containing a relevant span, or None."""
+    for rank, text in enumerate(texts, start=1):
+        if any(span in text for span in spans):
+            return rank
+    return None
+
+
+def score(ranked, cutoffs):
+    """recall@k (share of a query's spans in the top k) and MRR over (texts, spans) pairs."""
+    metrics = {}
+    for k in cutoffs:
+        found = [
+            sum(any(span in text for text in texts[:k]) for span in spans) / len(spans)
+            for texts, spans in ranked
+        ]
+        metrics[f"recall@{k}"] = round(sum(found) / len(found), 4)
+
+    ranks = [first_relevant_rank(texts, spans) for texts, spans in ranked]
+    metrics["mrr"] = round(sum(1.0 / r for r in ranks if r) / len(ranks), 4)
+    return metrics
+
+
+def evaluate(search, queries, cutoffs):
+    search(queries[0]["query"])  # warm-up (model load, index paging)
+
+    ranked, seconds = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        texts = search(q["query"])
+        seconds.append(time.perf_counter() - t0)
+        ranked.append((texts, q["relevant"]))
+
+    result = score(ranked, cutoffs)
+    result["p50_ms"] = percentile_ms(seconds, 50)
+    result["p95_ms"] = percentile_ms(seconds, 95)
+
+    by_kind = {}
+    for kind in sorted({q["kind"] for q in queries}):
+        subset = [r for r, q in zip(ranked, queries) if q["kind"] == kind]
+        by_kind[kind] = {"queries": len(subset), **score(subset, (max(cutoffs),))}
+    result["by_kind"] = by_kind
+    return result
+
+
+# =========================================================
+# TARGETS
+# =========================================================
+def rag_target(documents, k, hybrid=False):
+    from app import rag_engine
+
+    for d in documents:
+        rag_engine.store_embeddings(d["text"], {"user_id": BENCH_USER, "source": d["source"]})
+
+    fetch = rag_engine._fetch_docs_hybrid if hybrid else rag_engine._fetch_docs
+    return lambda query: [doc.page_content for doc in fetch(query, BENCH_USER, k=k, strict_source=False)]
+
+
+def chroma_target(documents, k):
+    from src.vector_store import VectorStoreManager
+
+    manager = VectorStoreManager(BENCH_USER)
+    manager.add_documents(manager.text_splitter.create_documents(
+        [d["text"] for d in documents],
+        metadatas=[{"source": d["source"]} for d in documents],
+    ))
+    retriever = manager.get_retriever(k=k)
+    return lambda query: [doc.page_content for doc in retriever.invoke(query)]
+
+
+def folder_target(documents, k, persist_dir):
+    from src.folder_vector_store import FolderVectorStore
+
+    store = FolderVectorStore(persist_dir=persist_dir)
+    store.upsert_files(BENCH_USER, [
+        {"file_id": d["id"], "text": d["text"], "metadata": {"source": d["source"]}}
+        for d in documents
+    ])
+    return lambda query: store.query(query, n_results=k, folder_id=BENCH_USER)["documents"][0]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_comparison(results, baseline):
+    if baseline.get("fixture", {}).get("sha256") != results["fixture"]["sha256"]:
+        print("⚠ Baseline was run on a different fixture; quality numbers are not comparable")
+    print(f"\nvs baseline {baseline.get('commit')} (settings {baseline.get('settings')})")
+    for name, r in results["targets"].items():
+        base = baseline.get("targets", {}).get(name)
+        if not base:
+            continue
+        deltas = [
+            f"{metric} {r[metric] - base[metric]:+.4g}"
+            for metric in r
+            if metric != "by_kind" and isinstance(base.get(metric), (int, float))
+        ]
+        print(f"{name:>10}: " + " | ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", default=FIXTURE_PATH)
+    parser.add_argument("--write-fixture", action="store_true", help="regenerate the fixture file and exit")
+    parser.add_argument("--documents", type=int, default=30, help="documents when writing the fixture")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10], help="recall cutoffs")
+    parser.add_argument("--chunk-size", type=int, default=None, help="CHUNK_SIZE for the rag targets")
+    parser.add_argument("--chunk-overlap", type=int, default=None, help="CHUNK_OVERLAP for the rag targets")
+    parser.add_argument("--embedding-cache", action="store_true", help="keep the embedding cache on")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--baseline", help="JSON result of an earlier run to compare against")
+    parser.add_argument("--json", action="store_true", help="print one JSON object")
+    args = parser.parse_args()
+
+    if args.write_fixture:
+        fixture = build_fixture(args.documents)
+        os.makedirs(os.path.dirname(os.path.abspath(args.fixture)), exist_ok=True)
+        with open(args.fixture, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False)
+            f.write("\n")
+        print(f"✔ Wrote {len(fixture['documents'])} documents, {len(fixture['queries'])} queries to {args.fixture}")
+        return
+
+    fixture, fixture_sha = load_fixture(args.fixture)
+    documents, queries = fixture["documents"], fixture["queries"]
+    cutoffs = sorted(set(args.k))
+
+    # rag_engine reads its settings from the environment at import time
+    if args.chunk_size:
+        os.environ["CHUNK_SIZE"] = str(args.chunk_size)
+    if args.chunk_overlap is not None:
+        os.environ["CHUNK_OVERLAP"] = str(args.chunk_overlap)
+    scratch = tempfile.mkdtemp(prefix="retrieval-bench-")
+    os.environ["VECTOR_BACKEND"] = "local"
+    os.environ["LOCAL_VECTOR_DIRECTORY"] = os.path.join(scratch, "local_vectors")
+    config.LOCAL_VECTOR_DIRECTORY = os.environ["LOCAL_VECTOR_DIRECTORY"]
+    config.CHROMA_PERSIST_DIRECTORY = os.path.join(scratch, "chroma")
+    config.SHARD_CATALOG_PATH = os.path.join(scratch, "shard_catalog.sqlite3")
+    config.CHUNK_MANIFEST_PATH = os.path.join(scratch, "chunk_manifest.sqlite3")
+    config.SOURCE_TEXT_STORE_PATH = os.path.join(scratch, "source_texts.sqlite3")
+    config.LEXICAL_INDEX_DIRECTORY = os.path.join(scratch, "lexical")
+    config.EMBEDDING_CACHE = args.embedding_cache
+
+    results = {
+        "schema": SCHEMA_VERSION,
+        "commit": _git_commit(),
+        "fixture": {
+            "path": os.path.relpath(args.fixture),
+            "sha256": fixture_sha,
+            "documents": len(documents),
+            "queries": len(queries),
+        },
+        "settings": {
+            "chunk_size": int(os.getenv("CHUNK_SIZE", 500)),
+            "chunk_overlap": int(os.getenv("CHUNK_OVERLAP", 100)),
+            "retrieval_k": int(os.getenv("RETRIEVAL_K", config.RETRIEVAL_K)),
+            "embedding_model": config.HUGGINGFACE_EMBEDDING_MODEL,
+            "embedding_backend": config.EMBEDDING_BACKEND,
+            "offset_chunks": config.OFFSET_CHUNKS,
+            "embedding_cache": config.EMBEDDING_CACHE,
+            "k": cutoffs,
+        },
+        "targets": {},
+    }
+
+    try:
+        for name in args.targets:
+            print(f"⧗ Indexing {len(documents)} documents for {name}...", file=sys.stderr)
+            t0 = time.perf_counter()
+            if name in ("rag", "rag_hybrid"):
+                search = rag_target(documents, max(cutoffs), hybrid=name == "rag_hybrid")
+            elif name == "chroma":
+                search = chroma_target(documents, max(cutoffs))
+            else:
+                search = folder_target(documents, max(cutoffs), os.path.join(scratch, "folder"))
+            index_seconds = time.perf_counter() - t0
+
+            results["targets"][name] = {"index_seconds": round(index_seconds, 2), **evaluate(search, queries, cutoffs)}
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        print(f"{len(documents)} documents, {len(queries)} queries, settings {results['settings']}")
+        for name, r in results["targets"].items():
+            recalls = "  ".join(f"R@{k} {r[f'recall@{k}']:.3f}" for k in cutoffs)
+            print(f"{name:>10}: {recalls} | MRR {r['mrr']:.3f} | p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms")
+            for kind, m in r["by_kind"].items():
+                print(f"{'':>12}{kind}: R@{max(cutoffs)} {m[f'recall@{max(cutoffs)}']:.3f}  MRR {m['mrr']:.3f}")
+
+    if args.baseline and not args.json:
+        with open(args.baseline, encoding="utf-8") as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
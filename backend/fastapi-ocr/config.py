@@ -18,6 +18,10 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 # ChromaDB Configuration
 CHROMA_PERSIST_DIRECTORY = "./chroma_db"
 CHROMA_COLLECTION_NAME = "youtube_transcripts"
+# Per-tenant collections: "context" (one per context), "bucket" (hashed shared shards) or "none" (global)
+VECTOR_SHARDING = os.getenv("VECTOR_SHARDING", "context")
+VECTOR_SHARD_BUCKETS = int(os.getenv("VECTOR_SHARD_BUCKETS", 64))
+SHARD_CATALOG_PATH = os.getenv("SHARD_CATALOG_PATH", "./shard_catalog.sqlite3")
 
 # Text Splitting Configuration
 CHUNK_SIZE = 500
@@ -28,6 +32,136 @@ RETRIEVAL_K = 4  # Number of documents to retrieve
 LLM_TEMPERATURE = 0.2
 LLM_MAX_NEW_TOKENS = 512
 
+# Context Packing Configuration
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", 0.8))
+CONTEXT_SHINGLE_SIZE = 5  # Words per shingle for near-duplicate detection
+CONTEXT_MINHASH_PERMUTATIONS = 64
+CONTEXT_MIN_MERGE_OVERLAP = 40  # Characters; splitter overlaps are 100-150
+CONTEXT_MAX_MERGE_OVERLAP = 400
+# Token counting uses tokenizers already on disk; "true" lets it download them (gated repos need a token)
+TOKENIZER_DOWNLOAD = os.getenv("TOKENIZER_DOWNLOAD", "false").lower() == "true"
+
+# Extractive compression of agent inputs (src/context_compressor.py)
+# Opted-in agents: summarizer, decision, cognitive, data_extraction, folder_case ("*" = all)
+COMPRESSION_AGENTS = frozenset(a.strip() for a in os.getenv("COMPRESSION_AGENTS", "").split(",") if a.strip())
+COMPRESSION_METHOD = os.getenv("COMPRESSION_METHOD", "textrank")  # "textrank" or "centroid"
+COMPRESSION_TOKEN_BUDGET = int(os.getenv("COMPRESSION_TOKEN_BUDGET", 1500))
+COMPRESSION_QUERY_WEIGHT = 0.5  # Centroid vs query similarity when a task query is given
+COMPRESSION_TEXTRANK_MAX_SENTENCES = 2000  # Longer documents are ranked by centroid
+
+# Map-reduce summarization of long documents (SummarizerAgent)
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "auto")  # "auto", "single" or "map_reduce"
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", 8192))  # Ollama num_ctx (llama3's window)
+# Per map prompt; "auto" splits above this. The window minus the template and the answer
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", LLM_CONTEXT_TOKENS - 1536))
+SUMMARY_MAX_PARALLEL = int(os.getenv("SUMMARY_MAX_PARALLEL", 2))  # Concurrent LLM calls (match OLLAMA_NUM_PARALLEL)
+SUMMARY_CACHE = os.getenv("SUMMARY_CACHE", "true").lower() == "true"
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "./summary_cache.sqlite3")
+
+# Shared LLM clients and their keep-alive HTTP pools (src/llm_clients.py)
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 8))  # Per pool; further callers wait
+LLM_HTTP_KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", 60))  # Idle connection lifetime
+LLM_HTTP_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", 900))  # Long local generations
+LLM_HTTP_CONNECT_TIMEOUT_SECONDS = 5
+
+# Ollama model residency (src/ollama_residency.py): background preload, keep_alive, pinning
+OLLAMA_PRELOAD_MODELS = [m.strip() for m in os.getenv("OLLAMA_PRELOAD_MODELS", "llama3").split(",") if m.strip()]
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # Default per model; seconds or a duration
+OLLAMA_MODEL_KEEP_ALIVE = os.getenv("OLLAMA_MODEL_KEEP_ALIVE", "")  # Overrides, e.g. "llama3=1h,mistral=10m"
+OLLAMA_PINNED_KEEP_ALIVE = os.getenv("OLLAMA_PINNED_KEEP_ALIVE", "-1")  # -1 = stay loaded
+OLLAMA_PIN_MIN_REQUESTS = int(os.getenv("OLLAMA_PIN_MIN_REQUESTS", 20))  # Uses within the window to pin; 0 = never
+OLLAMA_PIN_WINDOW_SECONDS = float(os.getenv("OLLAMA_PIN_WINDOW_SECONDS", 3600))
+OLLAMA_PROBE_INTERVAL_SECONDS = float(os.getenv("OLLAMA_PROBE_INTERVAL_SECONDS", 30))
+OLLAMA_COLD_START_SECONDS = 1.0  # load_duration above this counts as a cold start
+OLLAMA_AUTOSTART = os.getenv("OLLAMA_AUTOSTART", "true").lower() == "true"  # Launch `ollama serve` if down
+OLLAMA_AUTO_PULL = os.getenv("OLLAMA_AUTO_PULL", "true").lower() == "true"
+
+# Lexical (BM25) Index Configuration
+LEXICAL_INDEX_DIRECTORY = os.getenv("LEXICAL_INDEX_DIRECTORY", "./lexical_index")
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60  # Reciprocal-rank fusion damping constant
+
+# Multi-query expansion: "llm", "prf", "neighbors", "aliases", "local" (no LLM) or "none"
+QUERY_EXPANSION_MODE = os.getenv("QUERY_EXPANSION_MODE", "llm")
+QUERY_EXPANSION_MAX_QUERIES = 3  # Variants retrieved besides the original query
+PRF_FEEDBACK_DOCS = 5  # First-pass hits read for pseudo-relevance feedback
+PRF_TERMS = 5  # Feedback terms appended to the query
+QUERY_VOCAB_PATH = os.getenv("QUERY_VOCAB_PATH", "./query_vocab.npz")
+QUERY_VOCAB_MAX_TERMS = 20000
+QUERY_NEIGHBORS = 2
+QUERY_NEIGHBOR_MIN_SIMILARITY = 0.6
+ENTITY_ALIASES_PATH = os.getenv("ENTITY_ALIASES_PATH", "./entity_aliases.json")
+
+# Vector Backend Configuration ("atlas" or "local")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "atlas").lower()
+LOCAL_VECTOR_DIRECTORY = os.getenv("LOCAL_VECTOR_DIRECTORY", "./local_vectors")
+LOCAL_VECTOR_NPROBE = int(os.getenv("LOCAL_VECTOR_NPROBE", 32))
+LOCAL_VECTOR_IVF_MIN_SIZE = 20000  # Below this a partition is searched exactly
+LOCAL_VECTOR_BRUTE_FORCE_LIMIT = 20000  # Source filters this small skip the IVF
+# Compact in-memory vectors: "none", "float16" or "int8" (full precision stays on disk)
+LOCAL_VECTOR_QUANTIZATION = os.getenv("LOCAL_VECTOR_QUANTIZATION", "none")
+LOCAL_VECTOR_RESCORE_FACTOR = 4  # Approximate hits rescored per requested result
+
+# Embedding Backend Configuration ("torch" or "onnx")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+ONNX_MODEL_DIRECTORY = os.getenv("ONNX_MODEL_DIRECTORY", "./onnx_models")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "true").lower() == "true"  # Dynamic int8 weights
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", 0))  # 0 = physical cores
+# Cross-request micro-batching of embedding calls
+EMBEDDING_MICRO_BATCHING = os.getenv("EMBEDDING_MICRO_BATCHING", "true").lower() == "true"
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", 64))
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", 5))
+# Persistent content-addressed embedding cache
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", 1024))
+
+# Embedding model per Chroma collection and re-embedding migrations (src/embedding_migration.py)
+EMBEDDING_REGISTRY_PATH = os.getenv("EMBEDDING_REGISTRY_PATH", "./collection_registry.sqlite3")
+EMBEDDING_REGISTRY_TTL_SECONDS = float(os.getenv("EMBEDDING_REGISTRY_TTL_SECONDS", 5))  # Binding re-read interval
+EMBEDDING_MIGRATION_BATCH_SIZE = int(os.getenv("EMBEDDING_MIGRATION_BATCH_SIZE", 2000))  # Rows per checkpoint
+EMBEDDING_MIGRATION_PROCESSES = int(os.getenv("EMBEDDING_MIGRATION_PROCESSES", 0))  # 0 = one per core
+
+# Incremental re-indexing (per-source chunk manifest)
+CHUNK_MANIFEST_PATH = os.getenv("CHUNK_MANIFEST_PATH", "./chunk_manifest.sqlite3")
+
+# Offset-based chunks: vector stores keep (record id, start, end) pointers, not chunk text (opt-in)
+OFFSET_CHUNKS = os.getenv("OFFSET_CHUNKS", "false").lower() == "true"
+SOURCE_TEXT_STORE_PATH = os.getenv("SOURCE_TEXT_STORE_PATH", "./source_texts.sqlite3")
+
+# Transcript provider ("youtube" or "fake" for offline use) and cache
+TRANSCRIPT_PROVIDER = os.getenv("TRANSCRIPT_PROVIDER", "youtube")
+FAKE_TRANSCRIPT_DIRECTORY = os.getenv("FAKE_TRANSCRIPT_DIRECTORY", "./fake_transcripts")
+TRANSCRIPT_CACHE_BACKEND = os.getenv("TRANSCRIPT_CACHE_BACKEND", "disk")  # "disk", "mongo" or "none"
+TRANSCRIPT_CACHE_DIRECTORY = os.getenv("TRANSCRIPT_CACHE_DIRECTORY", "./transcript_cache")
+TRANSCRIPT_CACHE_COLLECTION = "transcript_cache"
+TRANSCRIPT_CACHE_TTL_HOURS = float(os.getenv("TRANSCRIPT_CACHE_TTL_HOURS", 24 * 7))
+
+# Bulk multi-video ingestion
+BULK_INGEST_FETCH_WORKERS = int(os.getenv("BULK_INGEST_FETCH_WORKERS", 8))
+BULK_INGEST_EMBED_BATCH = 512  # New chunks embedded per flush
+BULK_INGEST_UPSERT_BATCH = 1000  # Chunks per Chroma upsert call
+BULK_INGEST_MAX_JOBS = 100  # Finished jobs kept for status polling
+BULK_INGEST_LOCK_TIMEOUT_SECONDS = float(os.getenv("BULK_INGEST_LOCK_TIMEOUT_SECONDS", 60))  # Wait for a busy video
+
+# Warm VectorStoreManager pool and per-user active context cache
+VECTOR_STORE_POOL_SIZE = int(os.getenv("VECTOR_STORE_POOL_SIZE", 32))
+ACTIVE_CONTEXT_TTL_SECONDS = float(os.getenv("ACTIVE_CONTEXT_TTL_SECONDS", 60))
+
+# Persistent folder index (src/folder_vector_store.py)
+FOLDER_VECTOR_BATCH_SIZE = int(os.getenv("FOLDER_VECTOR_BATCH_SIZE", 256))  # Files embedded per add/upsert
+FOLDER_VECTOR_WARM_LOAD = os.getenv("FOLDER_VECTOR_WARM_LOAD", "true").lower() == "true"
+
+# Vector retention: per-context TTLs, duplicate compaction, background maintenance
+RETENTION_DB_PATH = os.getenv("RETENTION_DB_PATH", "./retention.sqlite3")
+RETENTION_DEFAULT_TTL_DAYS = float(os.getenv("RETENTION_DEFAULT_TTL_DAYS", 0))  # 0 = keep forever
+RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", 24))  # 0 = no background job
+
 # Streamlit Configuration
 PAGE_TITLE = "YouTube Video Chatbot"
 PAGE_ICON = "🎥"
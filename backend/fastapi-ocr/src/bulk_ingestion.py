@@ -0,0 +1,309 @@
+"""
+Bulk Ingestion Module
+
+Ingests a list of YouTube videos as one background job:
+- transcripts are fetched concurrently by a bounded thread pool
+- chunks of many videos are embedded together in large batches
+- vectors are written to each video's shard collection with batched upserts
+- every video carries its own status, and the job reports videos/minute
+
+Videos go through the same chunk manifest as single ingestion, so already
+indexed videos are skipped and re-ingested ones only embed changed chunks.
+"""
+import os
+import sys
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.utils import extract_video_id
+from src.chunk_manifest import get_chunk_manifest
+from src.vector_shards import get_shard_catalog
+from src.chunk_offsets import storage_text
+from src.collection_registry import get_collection_registry, shadow_delete, shadow_upsert
+from src.embedding_backend import encode_texts
+from src.transcript_fetcher import TranscriptFetcher, transcript_variant
+from src.vector_store_pool import get_vector_store_pool
+from src.vector_store import (
+    build_transcript_documents,
+    is_video_indexed,
+    safe_context_id,
+    transcript_version,
+)
+
+
+class BulkIngestionJob:
+    """Status of one bulk ingestion request."""
+
+    FINAL_STATES = ("indexed", "already_indexed", "failed", "duplicate")
+
+    def __init__(self, user_id: str, urls: List[str], force: bool = False):
+        self.job_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.force = force
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+        seen = set()
+        self.items: List[dict] = []
+        for url in urls:
+            video_id = extract_video_id(url or "")
+            item = {
+                "input": url,
+                "video_id": video_id,
+                "status": "queued",
+                "chunks": 0,
+                "new_chunks": 0,
+                "error": None,
+            }
+            if not video_id:
+                item.update(status="failed", error="Invalid YouTube URL or video ID")
+            elif video_id in seen:
+                item["status"] = "duplicate"
+            seen.add(video_id)
+            self.items.append(item)
+
+    def update(self, item: dict, **fields):
+        with self._lock:
+            item.update(fields)
+
+    def to_dict(self) -> Dict[str, object]:
+        with self._lock:
+            items = [dict(item) for item in self.items]
+
+        counts: Dict[str, int] = {}
+        for item in items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        indexed = counts.get("indexed", 0)
+        return {
+            "job_id": self.job_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "counts": counts,
+            "elapsed_seconds": round(elapsed, 2),
+            "videos_per_minute": round(indexed / (elapsed / 60), 2) if elapsed > 0 else 0.0,
+            "videos": items,
+        }
+
+
+# =========================================================
+# JOB RUNNER
+# =========================================================
+def _fetch(video_id: str) -> str:
+    return TranscriptFetcher().fetch_transcript(video_id)
+
+
+def _binding(collection_name: str):
+    return get_collection_registry().resolve(
+        config.CHROMA_PERSIST_DIRECTORY, collection_name, config.HUGGINGFACE_EMBEDDING_MODEL
+    )
+
+
+def _lock_and_diff(job: BulkIngestionJob, pending: List[tuple]):
+    """
+    Lock the pending videos and diff them against their manifests.
+
+    Locks are taken in sorted order, so jobs with overlapping videos cannot
+    deadlock; a video busy for longer than BULK_INGEST_LOCK_TIMEOUT_SECONDS
+    is failed instead of stalling the batch.
+
+    Returns:
+        ([(item, diff, version, route)], held locks)
+    """
+    manifest = get_chunk_manifest()
+    diffed, locks = [], []
+    for item, safe_id, documents, version, route in sorted(pending, key=lambda p: (p[4].collection_name, p[1])):
+        namespace = f"chroma:{route.collection_name}"
+        lock = manifest.source_lock(namespace, safe_id)
+        if not lock.acquire(timeout=config.BULK_INGEST_LOCK_TIMEOUT_SECONDS):
+            job.update(item, status="failed", error="Video is being indexed by another request")
+            continue
+        locks.append(lock)
+        # Diffed under the lock: another writer may have indexed the video since it was fetched
+        diffed.append((item, manifest.diff(namespace, safe_id, documents), version, route))
+    return diffed, locks
+
+
+def _flush(job: BulkIngestionJob, client, pending: List[tuple]):
+    """Embed all pending new chunks in one call, upsert them per shard in batches, commit manifests."""
+    manifest = get_chunk_manifest()
+    catalog = get_shard_catalog()
+    pending, locks = _lock_and_diff(job, pending)
+    documents = [doc for _, diff, _, _ in pending for doc in diff.new_documents]
+
+    try:
+        # One encode per model; shards only differ while one is pinned to another model
+        vectors_by_model = {}
+
+        def vectors_for(model):
+            if model not in vectors_by_model:
+                vectors_by_model[model] = encode_texts([doc.page_content for doc in documents], model, normalize=True)
+            return vectors_by_model[model]
+
+        # Group rows by shard collection, keeping their position in `vectors`
+        shards: Dict[str, dict] = {}
+        offset = 0
+        for _, diff, _, route in pending:
+            shard = shards.setdefault(route.collection_name, {"removed": [], "rows": []})
+            shard["removed"].extend(diff.removed_ids)
+            shard["rows"].extend(zip(range(offset, offset + len(diff.new_ids)), diff.new_ids, diff.new_documents))
+            offset += len(diff.new_ids)
+
+        step = config.BULK_INGEST_UPSERT_BATCH
+        for collection_name, shard in shards.items():
+            binding = _binding(collection_name)
+            collection = client.get_or_create_collection(name=binding.physical)
+            if shard["removed"]:
+                collection.delete(ids=shard["removed"])
+                shadow_delete(client, binding, ids=shard["removed"])
+            rows = shard["rows"]
+            for start in range(0, len(rows), step):
+                batch = rows[start:start + step]
+                collection.upsert(
+                    ids=[chunk_id for _, chunk_id, _ in batch],
+                    embeddings=vectors_for(binding.model)[[row for row, _, _ in batch]].tolist(),
+                    documents=[storage_text(doc) for _, _, doc in batch],
+                    metadatas=[doc.metadata for _, _, doc in batch],
+                )
+                shadow_upsert(
+                    client, binding, [chunk_id for _, chunk_id, _ in batch],
+                    texts=[doc.page_content for _, _, doc in batch],
+                    metadatas=[doc.metadata for _, _, doc in batch],
+                    documents=[storage_text(doc) for _, _, doc in batch],
+                )
+
+        for item, diff, version, route in pending:
+            manifest.commit(diff, version=version)
+            catalog.register(diff.source, route)
+            job.update(item, status="indexed", new_chunks=len(diff.new_ids))
+    except Exception as e:
+        for item, _, _, _ in pending:
+            job.update(item, status="failed", error=f"Indexing failed: {e}")
+    finally:
+        for lock in locks:
+            lock.release()
+
+
+def run_bulk_ingestion(job: BulkIngestionJob):
+    """Run a job to completion (blocking)."""
+    job.status = "running"
+    job.started_at = time.time()
+    pending = []
+
+    try:
+        manager = get_vector_store_pool().get("bulk_ingestion")
+        client = manager.client
+        catalog = get_shard_catalog()
+        manifest = get_chunk_manifest()
+        variant = transcript_variant()
+
+        todo = []
+        for item in job.items:
+            if item["status"] != "queued":
+                continue
+            safe_id = safe_context_id(item["video_id"])
+            route = catalog.route(safe_id)
+            physical = _binding(route.collection_name).physical
+            if not job.force and is_video_indexed(client, route.collection_name, safe_id, variant, physical):
+                job.update(item, status="already_indexed")
+                continue
+            job.update(item, status="fetching")
+            todo.append(item)
+
+        pending_chunks = 0
+        with ThreadPoolExecutor(max_workers=config.BULK_INGEST_FETCH_WORKERS) as pool:
+            futures = {pool.submit(_fetch, item["video_id"]): item for item in todo}
+
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    transcript = future.result()
+                except Exception as e:
+                    job.update(item, status="failed", error=str(e))
+                    continue
+                if not transcript:
+                    job.update(item, status="failed", error="Transcript not found")
+                    continue
+
+                safe_id = safe_context_id(item["video_id"])
+                documents = build_transcript_documents(manager.text_splitter, safe_id, transcript)
+                route = catalog.route(safe_id)
+                namespace = f"chroma:{route.collection_name}"
+
+                # Unlocked estimate for batching; _flush re-diffs under the video's lock
+                diff = manifest.diff(namespace, safe_id, documents)
+                pending.append((item, safe_id, documents, transcript_version(transcript, variant), route))
+                pending_chunks += len(diff.new_ids)
+                job.update(item, status="embedding", chunks=len(diff.ids))
+
+                if pending_chunks >= config.BULK_INGEST_EMBED_BATCH:
+                    _flush(job, client, pending)
+                    pending, pending_chunks = [], 0
+
+        if pending:
+            _flush(job, client, pending)
+            pending = []
+
+        job.status = "completed"
+    except Exception as e:
+        print(f"❌ Bulk ingestion {job.job_id} failed: {e}")
+        for item in job.items:
+            if item["status"] not in BulkIngestionJob.FINAL_STATES:
+                job.update(item, status="failed", error=str(e))
+        job.status = "failed"
+    finally:
+        job.finished_at = time.time()
+
+    summary = job.to_dict()
+    print(
+        f"✔ Bulk ingestion {job.job_id}: {summary['counts']} "
+        f"in {summary['elapsed_seconds']}s ({summary['videos_per_minute']} videos/min)"
+    )
+
+
+# =========================================================
+# JOB REGISTRY
+# =========================================================
+_jobs: "OrderedDict[str, BulkIngestionJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def start_bulk_ingestion(user_id: str, urls: List[str], force: bool = False) -> BulkIngestionJob:
+    """
+    Queue a bulk ingestion job and run it in a background thread.
+
+    Args:
+        user_id: Requesting user
+        urls: YouTube URLs or video ids
+        force: Re-fetch videos that are already indexed
+
+    Returns:
+        The job (poll with get_bulk_job)
+    """
+    job = BulkIngestionJob(user_id, urls, force=force)
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+        while len(_jobs) > config.BULK_INGEST_MAX_JOBS:
+            oldest = next(iter(_jobs.values()))
+            if oldest.finished_at is None:
+                break
+            _jobs.popitem(last=False)
+
+    threading.Thread(target=run_bulk_ingestion, args=(job,), daemon=True).start()
+    return job
+
+
+def get_bulk_job(job_id: str) -> Optional[BulkIngestionJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
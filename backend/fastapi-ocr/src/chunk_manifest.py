@@ -0,0 +1,229 @@
+"""
+Chunk Manifest Module
+
+Per-source record of which chunks are currently indexed. Chunk ids are
+deterministic (hash of the source id and the chunk text), so re-indexing a
+source becomes a diff against the manifest: only new chunks are embedded
+and inserted, removed chunks are deleted and unchanged chunks are left
+untouched.
+"""
+import os
+import sys
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Set
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.lexical_index import chunk_id_for
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    namespace TEXT NOT NULL,
+    source    TEXT NOT NULL,
+    chunk_id  TEXT NOT NULL,
+    PRIMARY KEY (namespace, source, chunk_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sources (
+    namespace  TEXT NOT NULL,
+    source     TEXT NOT NULL,
+    version    TEXT,
+    chunks     INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, source)
+) WITHOUT ROWID;
+"""
+
+
+class ChunkDiff:
+    """Result of comparing a source's new chunks with its manifest."""
+
+    def __init__(self, namespace: str, source: str, documents: list, ids: List[str], existing: Set[str]):
+        self.namespace = namespace
+        self.source = source
+        self.ids = ids
+
+        current = set(ids)
+        seen = set()
+        self.new_documents, self.new_ids = [], []
+        for doc, chunk_id in zip(documents, ids):
+            if chunk_id in existing or chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            self.new_documents.append(doc)
+            self.new_ids.append(chunk_id)
+
+        self.removed_ids = sorted(existing - current)
+        self.unchanged = len(existing & current)
+
+    @property
+    def is_noop(self) -> bool:
+        return not self.new_ids and not self.removed_ids
+
+    def summary(self) -> str:
+        return f"+{len(self.new_ids)} -{len(self.removed_ids)} ={self.unchanged}"
+
+
+class ChunkManifest:
+    """SQLite-backed (namespace, source) -> chunk id set."""
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: SQLite file (default: config.CHUNK_MANIFEST_PATH)
+        """
+        self.path = path or config.CHUNK_MANIFEST_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._source_locks: Dict[tuple, threading.Lock] = {}
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def source_lock(self, namespace: str, source: str) -> threading.Lock:
+        """Serializes diff + store writes + commit of one source in this process."""
+        key = (namespace, str(source))
+        with self._write_lock:
+            return self._source_locks.setdefault(key, threading.Lock())
+
+    # ---------------------------------------------------------
+    # DIFF / COMMIT
+    # ---------------------------------------------------------
+    def chunk_ids(self, namespace: str, source: str) -> Set[str]:
+        with self._connect() as conn:
+            return {
+                r[0] for r in conn.execute(
+                    "SELECT chunk_id FROM chunks WHERE namespace = ? AND source = ?",
+                    (namespace, str(source)),
+                )
+            }
+
+    def diff(
+        self,
+        namespace: str,
+        source: str,
+        documents: Sequence,
+        id_prefix: str = "",
+        existing: Optional[Set[str]] = None,
+    ) -> ChunkDiff:
+        """
+        Assign deterministic chunk ids and compare them with the manifest.
+
+        Sets metadata['chunk_id'] on every document.
+
+        Args:
+            namespace: Store the chunks live in (e.g. "atlas:<user_id>")
+            source: Source document id
+            documents: New chunks of the source (LangChain documents)
+            id_prefix: Scope prepended to the source when hashing (e.g. user id)
+            existing: Chunk ids currently in the store (default: this manifest's record);
+                pass them for stores shared between hosts, whose manifests may lag
+
+        Returns:
+            ChunkDiff
+        """
+        documents = list(documents)
+        ids = []
+        for doc in documents:
+            chunk_id = chunk_id_for(f"{id_prefix}{source}", doc.page_content)
+            doc.metadata["chunk_id"] = chunk_id
+            ids.append(chunk_id)
+        if existing is None:
+            existing = self.chunk_ids(namespace, source)
+        return ChunkDiff(namespace, str(source), documents, ids, set(existing))
+
+    def commit(self, diff: ChunkDiff, version: Optional[str] = None):
+        """Record the applied diff (call after the store writes succeeded)."""
+        with self._write_lock, self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM chunks WHERE namespace = ? AND source = ? AND chunk_id = ?",
+                [(diff.namespace, diff.source, c) for c in diff.removed_ids],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunks VALUES (?, ?, ?)",
+                [(diff.namespace, diff.source, c) for c in diff.new_ids],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+                (diff.namespace, diff.source, version, len(set(diff.ids)), time.time()),
+            )
+
+    # ---------------------------------------------------------
+    # SOURCES
+    # ---------------------------------------------------------
+    def source_info(self, namespace: str, source: str) -> Optional[Dict[str, object]]:
+        """Version, chunk count and update time of an indexed source."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT version, chunks, updated_at FROM sources WHERE namespace = ? AND source = ?",
+                (namespace, str(source)),
+            ).fetchone()
+        if not row:
+            return None
+        return {"version": row[0], "chunks": row[1], "updated_at": row[2]}
+
+    def sources(self, namespace_prefix: str = "") -> List[Dict[str, object]]:
+        """Indexed sources, optionally of namespaces starting with a prefix."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT namespace, source, version, chunks, updated_at FROM sources WHERE substr(namespace, 1, ?) = ?",
+                (len(namespace_prefix), namespace_prefix),
+            ).fetchall()
+        return [
+            {"namespace": r[0], "source": r[1], "version": r[2], "chunks": r[3], "updated_at": r[4]}
+            for r in rows
+        ]
+
+    def forget_source(self, namespace: str, source: str) -> List[str]:
+        """
+        Drop a source from the manifest.
+
+        Returns:
+            Chunk ids that were recorded for it (to delete from the store)
+        """
+        with self._write_lock, self._connect() as conn:
+            ids = [
+                r[0] for r in conn.execute(
+                    "SELECT chunk_id FROM chunks WHERE namespace = ? AND source = ?",
+                    (namespace, str(source)),
+                )
+            ]
+            conn.execute("DELETE FROM chunks WHERE namespace = ? AND source = ?", (namespace, str(source)))
+            conn.execute("DELETE FROM sources WHERE namespace = ? AND source = ?", (namespace, str(source)))
+        return ids
+
+    def move_source(self, namespace: str, new_namespace: str, source: str):
+        """Re-home a source's records after its chunks moved to another store."""
+        with self._write_lock, self._connect() as conn:
+            for table in ("chunks", "sources"):
+                conn.execute(
+                    f"UPDATE OR REPLACE {table} SET namespace = ? WHERE namespace = ? AND source = ?",
+                    (new_namespace, namespace, str(source)),
+                )
+
+
+_manifest: Optional[ChunkManifest] = None
+_manifest_lock = threading.Lock()
+
+
+def get_chunk_manifest() -> ChunkManifest:
+    """Shared ChunkManifest instance."""
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                _manifest = ChunkManifest()
+    return _manifest
@@ -0,0 +1,262 @@
+"""
+Chunk Offsets Module
+
+Offset-based chunk format. Instead of copying every chunk's text into the
+vector store, a chunk stores a pointer next to its vector:
+
+    metadata: record_id, text_source, start, end, page, chunk_hash
+    text:     "" (empty)
+
+Texts are hydrated lazily and in bulk from their source record, only for
+the documents a search actually returns. Source records are resolved per
+'text_source' kind:
+- "text_store": the full text kept once in a local SQLite store, keyed by
+  a versioned record id (transcripts, RAG sources)
+- other kinds: resolvers registered by the owning module (e.g. "ocr_file"
+  reads ocrrecords.extractedText, "rag_text" the shared Mongo copy of
+  Atlas RAG sources)
+
+Pointers carry a hash of their chunk, so a source record that changed
+after indexing is detected instead of returning the wrong span.
+"""
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document as LCDocument
+from langchain_core.retrievers import BaseRetriever
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def versioned_record_id(key: str, text: str) -> str:
+    """Record id of one version of a source text (old versions stay resolvable)."""
+    return f"{key}@{chunk_hash(text)}"
+
+
+def split_with_offsets(splitter, text: str) -> List[Tuple[int, int, str]]:
+    """
+    Split a text and locate every chunk in it.
+
+    Returns:
+        (start, end, chunk) triples with text[start:end] == chunk
+    """
+    spans = []
+    cursor = 0
+    for chunk in splitter.split_text(text):
+        start = text.find(chunk, cursor)
+        if start < 0:
+            start = text.find(chunk)
+        if start < 0:
+            continue  # the splitter altered the chunk; it cannot be addressed
+        spans.append((start, start + len(chunk), chunk))
+        cursor = start + 1
+    return spans
+
+
+def pointer_metadata(record_id: str, start: int, end: int, text: str, text_source: str = "text_store", page=None) -> dict:
+    metadata = {
+        "record_id": record_id,
+        "text_source": text_source,
+        "start": start,
+        "end": end,
+        "chunk_hash": chunk_hash(text),
+    }
+    if page is not None:  # Chroma rejects None metadata values
+        metadata["page"] = page
+    return metadata
+
+
+def offset_documents(
+    splitter,
+    text: str,
+    metadata: dict,
+    record_id: str,
+    text_source: str = "text_store",
+) -> List[LCDocument]:
+    """
+    Split a source into chunks that carry pointer metadata.
+
+    The returned documents still hold their text (for embedding, chunk ids
+    and the lexical index); write them with storage_text() as the stored text.
+    """
+    return [
+        LCDocument(
+            page_content=chunk,
+            metadata={
+                **metadata,
+                **pointer_metadata(record_id, start, end, chunk, text_source, metadata.get("page")),
+            },
+        )
+        for start, end, chunk in split_with_offsets(splitter, text)
+    ]
+
+
+def is_pointer(metadata: Optional[dict]) -> bool:
+    return bool(metadata) and "record_id" in metadata and "start" in metadata and "end" in metadata
+
+
+def storage_text(doc) -> str:
+    """Text to write to a vector store: empty for pointer chunks when OFFSET_CHUNKS is on."""
+    if config.OFFSET_CHUNKS and is_pointer(doc.metadata):
+        return ""
+    return doc.page_content
+
+
+# =========================================================
+# SOURCE TEXT STORE
+# =========================================================
+class SourceTextStore:
+    """SQLite-backed record_id -> full text."""
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: SQLite file (default: config.SOURCE_TEXT_STORE_PATH)
+        """
+        self.path = path or config.SOURCE_TEXT_STORE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS texts (record_id TEXT PRIMARY KEY, text TEXT NOT NULL) WITHOUT ROWID")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def put(self, record_id: str, text: str):
+        with self._write_lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO texts VALUES (?, ?)", (record_id, text))
+
+    def get_many(self, record_ids: Sequence[str]) -> Dict[str, str]:
+        found = {}
+        ids = list(dict.fromkeys(record_ids))
+        with self._connect() as conn:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(conn.execute(
+                    f"SELECT record_id, text FROM texts WHERE record_id IN ({placeholders})", chunk
+                ))
+        return found
+
+    def delete_prefix(self, prefix: str, keep: Iterable[str] = ()) -> int:
+        """Drop every version of a source (record ids starting with prefix), except the kept ids."""
+        keep = list(keep)
+        with self._write_lock, self._connect() as conn:
+            return conn.execute(
+                f"DELETE FROM texts WHERE substr(record_id, 1, ?) = ? "
+                f"AND record_id NOT IN ({','.join('?' * len(keep))})",
+                (len(prefix), prefix, *keep),
+            ).rowcount
+
+    def size_bytes(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(LENGTH(CAST(text AS BLOB))), 0) FROM texts").fetchone()[0]
+
+
+_text_store: Optional[SourceTextStore] = None
+_text_store_lock = threading.Lock()
+
+
+def get_source_text_store() -> SourceTextStore:
+    """Shared SourceTextStore instance."""
+    global _text_store
+    if _text_store is None:
+        with _text_store_lock:
+            if _text_store is None:
+                _text_store = SourceTextStore()
+    return _text_store
+
+
+# =========================================================
+# HYDRATION
+# =========================================================
+_resolvers: Dict[str, Callable[[Sequence[str]], Dict[str, str]]] = {
+    "text_store": lambda ids: get_source_text_store().get_many(ids),
+}
+
+
+def register_text_resolver(text_source: str, resolver: Callable[[Sequence[str]], Dict[str, str]]):
+    """
+    Register how records of a text_source kind are loaded.
+
+    Args:
+        text_source: Kind stored in pointer metadata
+        resolver: record ids -> {record_id: full text} (one bulk call per search)
+    """
+    _resolvers[text_source] = resolver
+
+
+def hydrate_documents(documents: Iterable[LCDocument]) -> List[LCDocument]:
+    """
+    Fill in the text of pointer chunks with one bulk lookup per source kind.
+
+    Documents that already hold text pass through; pointers whose source
+    record is gone or changed are dropped.
+    """
+    documents = list(documents)
+    wanted: Dict[str, set] = {}
+    for doc in documents:
+        if not doc.page_content and is_pointer(doc.metadata):
+            wanted.setdefault(doc.metadata.get("text_source") or "text_store", set()).add(doc.metadata["record_id"])
+    if not wanted:
+        return documents
+
+    texts: Dict[Tuple[str, str], str] = {}
+    for kind, record_ids in wanted.items():
+        resolver = _resolvers.get(kind)
+        if resolver is None:
+            print(f"⚠ No text resolver for '{kind}' chunks")
+            continue
+        for record_id, text in resolver(list(record_ids)).items():
+            texts[(kind, record_id)] = text
+
+    hydrated = []
+    for doc in documents:
+        metadata = doc.metadata or {}
+        if doc.page_content or not is_pointer(metadata):
+            hydrated.append(doc)
+            continue
+
+        source = texts.get((metadata.get("text_source") or "text_store", metadata["record_id"]))
+        text = source[int(metadata["start"]):int(metadata["end"])] if source is not None else None
+        if text is None or (metadata.get("chunk_hash") and chunk_hash(text) != metadata["chunk_hash"]):
+            print(f"⚠ Dropping stale chunk of {metadata['record_id']}")
+            continue
+        hydrated.append(LCDocument(page_content=text, metadata=dict(metadata)))
+    return hydrated
+
+
+class HydratingRetriever(BaseRetriever):
+    """Wraps a retriever so its results come back with hydrated text."""
+
+    base: BaseRetriever
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[LCDocument]:
+        return hydrate_documents(self.base.invoke(query))
+
+
+def payload_bytes(documents: Iterable[LCDocument]) -> int:
+    """Serialized size of documents as returned by a search (text + metadata)."""
+    return sum(
+        len(doc.page_content.encode("utf-8")) + len(json.dumps(doc.metadata, default=str).encode("utf-8"))
+        for doc in documents
+    )
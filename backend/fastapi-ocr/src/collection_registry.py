@@ -0,0 +1,336 @@
+"""
+Collection Registry Module
+
+Maps each logical Chroma collection (a shard, the folder index, ...) to
+the physical collection that serves it and the embedding model its
+vectors were made with. The model is pinned when a collection is first
+seen, so changing HUGGINGFACE_EMBEDDING_MODEL never makes queries embed
+with a model the stored vectors do not match.
+
+While an embedding migration is running (src/embedding_migration.py) a
+collection also has a shadow: writers mirror every upsert/delete into it
+with the shadow's model. The switch swaps primary and shadow in one
+transaction; the old collection stays the shadow (still dual-written)
+until the migration is finalized, so processes holding a stale binding
+and rollbacks both stay consistent.
+"""
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    directory    TEXT NOT NULL,
+    name         TEXT NOT NULL,
+    physical     TEXT NOT NULL,
+    model        TEXT NOT NULL,
+    shadow       TEXT,
+    shadow_model TEXT,
+    state        TEXT NOT NULL DEFAULT 'ready',
+    cursor       INTEGER NOT NULL DEFAULT 0,
+    copied       INTEGER NOT NULL DEFAULT 0,
+    skipped      INTEGER NOT NULL DEFAULT 0,
+    updated_at   REAL NOT NULL,
+    PRIMARY KEY (directory, name)
+) WITHOUT ROWID;
+"""
+
+# ready     : primary only
+# migrating : shadow (new model) is being backfilled and dual-written
+# switched  : primary is the new collection, shadow the old one (rollback possible)
+STATES = ("ready", "migrating", "switched")
+
+
+class CollectionBinding(NamedTuple):
+    name: str
+    physical: str
+    model: str
+    shadow: Optional[str] = None
+    shadow_model: Optional[str] = None
+    state: str = "ready"
+
+
+def shadow_collection_name(physical: str, model: str) -> str:
+    """Chroma-safe (<= 63 chars) name of a collection's copy under another model."""
+    digest = hashlib.sha1(f"{physical}|{model}".encode("utf-8")).hexdigest()[:10]
+    return f"{physical[:52].rstrip('_-')}_{digest}"
+
+
+def _directory_key(directory: str) -> str:
+    return os.path.abspath(directory)
+
+
+class CollectionRegistry:
+    """SQLite-backed (directory, logical name) -> CollectionBinding."""
+
+    def __init__(self, path: str = None, ttl_seconds: float = None):
+        """
+        Args:
+            path: SQLite file (default: config.EMBEDDING_REGISTRY_PATH)
+            ttl_seconds: How long a process trusts a resolved binding
+                         (default: config.EMBEDDING_REGISTRY_TTL_SECONDS)
+        """
+        self.path = path or config.EMBEDDING_REGISTRY_PATH
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.EMBEDDING_REGISTRY_TTL_SECONDS
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._cache: Dict[tuple, tuple] = {}
+        self._warned = set()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _binding(row) -> CollectionBinding:
+        return CollectionBinding(*row)
+
+    def _row(self, conn, directory: str, name: str):
+        return conn.execute(
+            "SELECT name, physical, model, shadow, shadow_model, state FROM collections "
+            "WHERE directory = ? AND name = ?",
+            (directory, name),
+        ).fetchone()
+
+    # ---------------------------------------------------------
+    # READ PATH
+    # ---------------------------------------------------------
+    def resolve(self, directory: str, name: str, default_model: str) -> CollectionBinding:
+        """
+        Binding of a collection; unknown collections are pinned to default_model.
+
+        Args:
+            directory: Chroma persist directory
+            name: Logical collection name
+            default_model: Model the caller would embed with (used on first sight)
+        """
+        key = (_directory_key(directory), name)
+        cached = self._cache.get(key)
+        now = time.monotonic()
+        if cached is not None and now - cached[1] < self.ttl_seconds:
+            binding = cached[0]
+        else:
+            with self._connect() as conn:
+                row = self._row(conn, *key)
+                if row is None:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO collections (directory, name, physical, model, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (*key, name, default_model, time.time()),
+                    )
+                    row = self._row(conn, *key)
+            binding = self._binding(row)
+            self._cache[key] = (binding, now)
+
+        if binding.model != default_model and key not in self._warned:
+            self._warned.add(key)
+            print(f"⚠ Collection {name} is pinned to {binding.model} (configured: {default_model}); "
+                  f"it is queried with {binding.model}")
+        return binding
+
+    def bindings(self, directory: str = None) -> List[Dict[str, object]]:
+        """Registry rows with migration progress, optionally of one directory."""
+        query = "SELECT directory, name, physical, model, shadow, shadow_model, state, cursor, copied, skipped, updated_at FROM collections"
+        params = ()
+        if directory:
+            query += " WHERE directory = ?"
+            params = (_directory_key(directory),)
+        columns = ("directory", "name", "physical", "model", "shadow", "shadow_model", "state", "cursor", "copied", "skipped", "updated_at")
+        with self._connect() as conn:
+            return [dict(zip(columns, row)) for row in conn.execute(query, params)]
+
+    def progress(self, directory: str, name: str) -> Dict[str, int]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cursor, copied, skipped FROM collections WHERE directory = ? AND name = ?",
+                (_directory_key(directory), name),
+            ).fetchone()
+        return dict(zip(("cursor", "copied", "skipped"), row or (0, 0, 0)))
+
+    # ---------------------------------------------------------
+    # MIGRATION STATE
+    # ---------------------------------------------------------
+    def _update(self, sql: str, params: tuple):
+        with self._write_lock, self._connect() as conn:
+            conn.execute(sql, params)
+        self._cache.clear()
+
+    def begin(self, directory: str, name: str, model: str, default_model: str) -> CollectionBinding:
+        """
+        Start (or resume) migrating a collection to a model; dual-writes begin.
+
+        Raises:
+            ValueError: Another migration of the collection is open
+        """
+        self._cache.clear()
+        binding = self.resolve(directory, name, default_model)
+        if binding.state == "migrating" and binding.shadow_model == model:
+            return binding  # resume from the checkpoint
+        if binding.state != "ready":
+            raise ValueError(f"{name} is '{binding.state}' toward {binding.shadow_model}; finalize or roll back first")
+        if binding.model == model:
+            raise ValueError(f"{name} is already embedded with {model}")
+
+        self._update(
+            "UPDATE collections SET shadow = ?, shadow_model = ?, state = 'migrating', cursor = 0, copied = 0, "
+            "skipped = 0, updated_at = ? WHERE directory = ? AND name = ?",
+            (shadow_collection_name(binding.physical, model), model, time.time(), _directory_key(directory), name),
+        )
+        return self.resolve(directory, name, default_model)
+
+    def checkpoint(self, directory: str, name: str, cursor: int, copied: int, skipped: int):
+        self._update(
+            "UPDATE collections SET cursor = ?, copied = copied + ?, skipped = skipped + ?, updated_at = ? "
+            "WHERE directory = ? AND name = ?",
+            (cursor, copied, skipped, time.time(), _directory_key(directory), name),
+        )
+
+    def switch(self, directory: str, names: Sequence[str]):
+        """
+        Make the shadows primary, for all names in one transaction.
+
+        Raises:
+            ValueError: A collection is not mid-migration (nothing is switched)
+        """
+        directory = _directory_key(directory)
+        with self._write_lock, self._connect() as conn:
+            for name in names:
+                row = self._row(conn, directory, name)
+                if row is None or row[5] != "migrating":
+                    raise ValueError(f"{name} has no migration to switch")
+            conn.executemany(
+                "UPDATE collections SET physical = shadow, model = shadow_model, shadow = physical, "
+                "shadow_model = model, state = 'switched', updated_at = ? WHERE directory = ? AND name = ?",
+                [(time.time(), directory, name) for name in names],
+            )
+        self._cache.clear()
+
+    def rollback(self, directory: str, name: str) -> Optional[str]:
+        """
+        Undo a migration: swap back after a switch, or drop the shadow before one.
+
+        Returns:
+            Collection that is no longer used and can be deleted, if any
+        """
+        directory = _directory_key(directory)
+        with self._write_lock, self._connect() as conn:
+            row = self._row(conn, directory, name)
+            if row is None or row[5] == "ready":
+                return None
+            if row[5] == "switched":
+                conn.execute(
+                    "UPDATE collections SET physical = shadow, model = shadow_model, shadow = physical, "
+                    "shadow_model = model, state = 'migrating', updated_at = ? WHERE directory = ? AND name = ?",
+                    (time.time(), directory, name),
+                )
+                row = self._row(conn, directory, name)
+            conn.execute(
+                "UPDATE collections SET shadow = NULL, shadow_model = NULL, state = 'ready', cursor = 0, "
+                "updated_at = ? WHERE directory = ? AND name = ?",
+                (time.time(), directory, name),
+            )
+        self._cache.clear()
+        return row[3]
+
+    def finalize(self, directory: str, name: str) -> Optional[str]:
+        """
+        End a switched migration; dual-writes to the old collection stop.
+
+        Returns:
+            The old collection, to be deleted
+        """
+        directory = _directory_key(directory)
+        with self._write_lock, self._connect() as conn:
+            row = self._row(conn, directory, name)
+            if row is None or row[5] != "switched":
+                return None
+            conn.execute(
+                "UPDATE collections SET shadow = NULL, shadow_model = NULL, state = 'ready', cursor = 0, "
+                "updated_at = ? WHERE directory = ? AND name = ?",
+                (time.time(), directory, name),
+            )
+        self._cache.clear()
+        return row[3]
+
+    def forget(self, directory: str, name: str):
+        """Drop a collection's entry (the collection itself was deleted)."""
+        self._update(
+            "DELETE FROM collections WHERE directory = ? AND name = ?",
+            (_directory_key(directory), name),
+        )
+
+
+_registry: Optional[CollectionRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_collection_registry() -> CollectionRegistry:
+    """Shared CollectionRegistry instance."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = CollectionRegistry()
+    return _registry
+
+
+# =========================================================
+# DUAL WRITES
+# =========================================================
+def shadow_upsert(client, binding: CollectionBinding, ids: Sequence[str], texts: Sequence[str],
+                  metadatas: Sequence[dict], documents: Sequence[str] = None):
+    """
+    Mirror an upsert into the binding's shadow collection, embedded with the shadow model.
+
+    A failure is only logged: the migration's reconcile pass re-copies
+    whatever the shadow is missing before the switch.
+
+    Args:
+        client: Chroma client
+        binding: Binding the primary write went through
+        ids: Row ids (the same as in the primary)
+        texts: Texts to embed
+        metadatas: Row metadata
+        documents: Stored texts, when they differ from texts (pointer chunks)
+    """
+    if binding.shadow is None or not ids:
+        return
+    from src.embedding_backend import encode_texts
+
+    try:
+        client.get_or_create_collection(name=binding.shadow).upsert(
+            ids=list(ids),
+            embeddings=encode_texts(list(texts), binding.shadow_model, normalize=True).tolist(),
+            documents=list(documents if documents is not None else texts),
+            metadatas=list(metadatas),
+        )
+    except Exception as e:
+        print(f"⚠ Shadow write to {binding.shadow} failed: {e}")
+
+
+def shadow_delete(client, binding: CollectionBinding, ids: Sequence[str] = None, where: dict = None):
+    """Mirror a delete into the binding's shadow collection."""
+    if binding.shadow is None or not (ids or where):
+        return
+    try:
+        client.get_or_create_collection(name=binding.shadow).delete(ids=list(ids) if ids else None, where=where)
+    except Exception as e:
+        print(f"⚠ Shadow delete in {binding.shadow} failed: {e}")
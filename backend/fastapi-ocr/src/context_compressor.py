@@ -0,0 +1,259 @@
+"""
+Context Compressor Module
+
+CPU-only extractive compression of long texts before they reach an LLM.
+Sentences are embedded once and ranked by
+- "centroid": similarity to the document centroid, biased toward the
+  query when one is given
+- "textrank": PageRank over the sentence similarity graph (personalized
+  by the query when one is given)
+
+The top sentences are kept, in document order, until the token budget is
+spent. Agents opt in by name (config.COMPRESSION_AGENTS) or per instance;
+compression_report() shows prompt-token reduction and LLM latency per agent.
+"""
+import os
+import re
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.context_packer import count_tokens
+from src.embedding_backend import encode_texts
+
+
+COMPRESSION_METHODS = ("centroid", "textrank")
+
+# Sentence ends before a capitalized word, or line breaks (OCR output is often one fact per line)
+_BOUNDARY_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])|\s*\n\s*")
+_ABBREVIATION_RE = re.compile(r"\b(?:mr|mrs|ms|dr|sh|smt|st|no|nos|sec|vs|u/s|dt|ltd|co|inc|ft|approx)\.$", re.I)
+
+
+def split_sentences(text: str, min_chars: int = 3) -> List[str]:
+    """Sentences (and OCR lines) of a text, stripped, in order."""
+    sentences: List[str] = []
+    carry = ""
+    for piece in _BOUNDARY_RE.split(text):
+        piece = f"{carry} {piece}".strip() if carry else piece.strip()
+        carry = ""
+        if _ABBREVIATION_RE.search(piece):
+            carry = piece  # "Mr. Kumar", "FIR No. 12": not a sentence end
+            continue
+        if len(piece) >= min_chars:
+            sentences.append(piece)
+    if len(carry) >= min_chars:
+        sentences.append(carry)
+    return sentences
+
+
+def _textrank(similarities: np.ndarray, personalization: Optional[np.ndarray] = None,
+              damping: float = 0.85, iterations: int = 50, tol: float = 1e-6) -> np.ndarray:
+    n = similarities.shape[0]
+    graph = np.clip(similarities, 0.0, None)
+    np.fill_diagonal(graph, 0.0)
+    out = graph.sum(axis=1, keepdims=True)
+    transition = np.divide(graph, out, out=np.full_like(graph, 1.0 / n), where=out > 0)
+
+    teleport = np.full(n, 1.0 / n, dtype=np.float32)
+    if personalization is not None:
+        p = np.clip(personalization, 0.0, None)
+        if p.sum() > 0:
+            teleport = p / p.sum()
+
+    rank = teleport.copy()
+    for _ in range(iterations):
+        updated = (1 - damping) * teleport + damping * (transition.T @ rank)
+        if np.abs(updated - rank).sum() < tol:
+            return updated
+        rank = updated
+    return rank
+
+
+def rank_sentences(sentences: List[str], query: Optional[str] = None, method: str = None,
+                   model_name: str = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score sentences for extraction.
+
+    Args:
+        sentences: Sentences in document order
+        query: Bias the ranking toward this text (task or question)
+        method: "centroid" or "textrank" (default: config.COMPRESSION_METHOD)
+        model_name: Embedding model (default: config.HUGGINGFACE_EMBEDDING_MODEL)
+
+    Returns:
+        (scores, unit-norm sentence embeddings)
+    """
+    method = method or config.COMPRESSION_METHOD
+    if method not in COMPRESSION_METHODS:
+        raise ValueError(f"Unknown compression method '{method}' (expected one of {COMPRESSION_METHODS})")
+
+    texts = sentences + ([query] if query else [])
+    vectors = encode_texts(texts, model_name, normalize=True)
+    embeddings = vectors[:len(sentences)]
+    query_similarity = embeddings @ vectors[-1] if query else None
+
+    # The similarity graph is quadratic; very long documents fall back to the centroid
+    if method == "textrank" and len(sentences) <= config.COMPRESSION_TEXTRANK_MAX_SENTENCES:
+        return _textrank(embeddings @ embeddings.T, query_similarity), embeddings
+
+    centroid = embeddings.mean(axis=0)
+    centroid /= np.linalg.norm(centroid) or 1.0
+    scores = embeddings @ centroid
+    if query_similarity is not None:
+        weight = config.COMPRESSION_QUERY_WEIGHT
+        scores = (1 - weight) * scores + weight * query_similarity
+    return scores, embeddings
+
+
+def compress_text(text: str, max_tokens: int = None, query: Optional[str] = None, method: str = None,
+                  model: Optional[str] = None, redundancy_threshold: float = 0.95) -> str:
+    """
+    Keep the highest-ranked sentences of a text within a token budget.
+
+    Texts already within the budget are returned unchanged.
+
+    Args:
+        text: Text to compress
+        max_tokens: Token budget (default: config.COMPRESSION_TOKEN_BUDGET)
+        query: Bias the selection toward this text
+        method: "centroid" or "textrank" (default: config.COMPRESSION_METHOD)
+        model: Target LLM, used for token counting
+        redundancy_threshold: Skip sentences this similar to one already kept
+
+    Returns:
+        Selected sentences in document order
+    """
+    max_tokens = max_tokens or config.COMPRESSION_TOKEN_BUDGET
+    if not text or count_tokens(text, model) <= max_tokens:
+        return text
+
+    sentences = list(dict.fromkeys(split_sentences(text)))
+    if len(sentences) < 2:
+        return text
+
+    scores, embeddings = rank_sentences(sentences, query=query, method=method)
+
+    selected: List[int] = []
+    used = 0
+    for i in np.argsort(-scores):
+        cost = count_tokens(sentences[i], model) + 1
+        if used + cost > max_tokens:
+            continue
+        if selected and float(np.max(embeddings[selected] @ embeddings[i])) >= redundancy_threshold:
+            continue
+        selected.append(int(i))
+        used += cost
+
+    return "\n".join(sentences[i] for i in sorted(selected))
+
+
+# =========================================================
+# AGENT OPT-IN + REPORT
+# =========================================================
+class CompressionStats:
+    """Per-agent prompt-token and LLM latency counters, split by compressed/raw calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents: Dict[str, dict] = {}
+
+    def _entry(self, agent: str) -> dict:
+        return self._agents.setdefault(agent, {
+            "compressions": 0, "tokens_in": 0, "tokens_out": 0, "compress_seconds": 0.0,
+            "llm": {"compressed": [0, 0.0], "raw": [0, 0.0]},
+        })
+
+    def record_compression(self, agent: str, tokens_in: int, tokens_out: int, seconds: float):
+        with self._lock:
+            entry = self._entry(agent)
+            entry["compressions"] += 1
+            entry["tokens_in"] += tokens_in
+            entry["tokens_out"] += tokens_out
+            entry["compress_seconds"] += seconds
+
+    def record_llm(self, agent: str, compressed: bool, seconds: float):
+        with self._lock:
+            calls = self._entry(agent)["llm"]["compressed" if compressed else "raw"]
+            calls[0] += 1
+            calls[1] += seconds
+
+    def report(self) -> Dict[str, dict]:
+        with self._lock:
+            report = {}
+            for agent, e in self._agents.items():
+                n = e["compressions"]
+                report[agent] = {
+                    "compressions": n,
+                    "mean_tokens_in": round(e["tokens_in"] / n) if n else None,
+                    "mean_tokens_out": round(e["tokens_out"] / n) if n else None,
+                    "token_reduction_pct": round(100.0 * (1 - e["tokens_out"] / e["tokens_in"]), 1) if e["tokens_in"] else None,
+                    "mean_compress_ms": round(1000.0 * e["compress_seconds"] / n, 1) if n else None,
+                    "llm": {
+                        kind: {"calls": c, "mean_ms": round(1000.0 * s / c, 1) if c else None}
+                        for kind, (c, s) in e["llm"].items()
+                    },
+                }
+            return report
+
+
+_stats = CompressionStats()
+
+
+def compression_enabled(agent: str) -> bool:
+    """Whether an agent opted in through config.COMPRESSION_AGENTS ("*" = all)."""
+    agents = config.COMPRESSION_AGENTS
+    return "*" in agents or agent in agents
+
+
+def compress_for_agent(agent: str, text: str, enabled: Optional[bool] = None, query: Optional[str] = None,
+                       max_tokens: int = None, model: Optional[str] = None) -> str:
+    """
+    Compress an agent's input text if the agent opted in.
+
+    Args:
+        agent: Agent name (config.COMPRESSION_AGENTS entry)
+        text: Raw input text
+        enabled: Per-instance override (None: config.COMPRESSION_AGENTS)
+        query: Task description biasing the selection
+        max_tokens: Token budget (default: config.COMPRESSION_TOKEN_BUDGET)
+        model: Target LLM, used for token counting
+
+    Returns:
+        Compressed text, or the input unchanged
+    """
+    if not text or not (compression_enabled(agent) if enabled is None else enabled):
+        return text
+
+    t0 = time.perf_counter()
+    try:
+        compressed = compress_text(text, max_tokens=max_tokens, query=query, model=model)
+    except Exception as e:
+        print(f"⚠ Context compression failed for {agent}: {e}")
+        return text
+    _stats.record_compression(agent, count_tokens(text, model), count_tokens(compressed, model), time.perf_counter() - t0)
+    return compressed
+
+
+@contextmanager
+def timed_llm_call(agent: str, compressed: bool):
+    """Time an agent's LLM call for the compression report."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stats.record_llm(agent, compressed, time.perf_counter() - t0)
+
+
+def compression_report() -> Dict[str, object]:
+    return {
+        "method": config.COMPRESSION_METHOD,
+        "token_budget": config.COMPRESSION_TOKEN_BUDGET,
+        "agents_opted_in": sorted(config.COMPRESSION_AGENTS),
+        "agents": _stats.report(),
+    }
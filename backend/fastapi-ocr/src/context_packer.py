@@ -0,0 +1,406 @@
+"""
+Context Packer Module
+
+Builds LLM prompt context from retrieved chunks under a token budget:
+near-duplicate chunks are dropped (MinHash over word shingles), chunks that
+overlap because of the splitter's chunk_overlap are merged back together,
+and the result is filled by relevance until the budget is spent.
+"""
+import os
+import re
+import sys
+import zlib
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+# Large Mersenne prime used by the universal hash family of the MinHash
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Metadata keys that identify the document a chunk was cut from
+SOURCE_KEYS = ("record_id", "file_id", "video_id", "source")
+
+_tokenizers: Dict[str, Optional[Callable[[str], int]]] = {}
+_tokenizer_lock = threading.Lock()
+
+
+# ---------------------------------------------------------
+# TOKEN COUNTING
+# ---------------------------------------------------------
+def _approx_token_count(text: str) -> int:
+    """Tokenizer-free estimate (~4 characters per token for English BPE)."""
+    return (len(text) + 3) // 4
+
+
+def _load_tokenizer(model: str) -> Optional[Callable[[str], int]]:
+    """Return a token counting function for the model, or None if unavailable."""
+    try:
+        import tiktoken
+
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = None
+        if encoding is not None:
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except ImportError:
+        pass
+    except Exception as e:
+        # tiktoken fetches its BPE files on first use
+        print(f"⚠ tiktoken encoding for {model} unavailable, estimating tokens: {e}")
+        return None
+
+    if "/" in model:
+        try:
+            from transformers import AutoTokenizer
+
+            # Cached files only unless TOKENIZER_DOWNLOAD: the default model is a gated repo
+            tokenizer = AutoTokenizer.from_pretrained(
+                model,
+                token=config.HUGGINGFACE_API_TOKEN or None,
+                local_files_only=not config.TOKENIZER_DOWNLOAD,
+            )
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+        except Exception as e:
+            print(f"⚠ Tokenizer for {model} unavailable, estimating tokens: {type(e).__name__}")
+
+    return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count tokens of text with the target model's tokenizer.
+
+    OpenAI model names resolve through tiktoken and HuggingFace repo ids
+    through transformers, from the local cache only unless
+    config.TOKENIZER_DOWNLOAD is set. Tokenizers are loaded once per model;
+    when none can be loaded (not cached, gated repo, Ollama tag) a
+    character-based estimate is used instead.
+
+    Args:
+        text: Text to measure
+        model: Target model name (default: config.HUGGINGFACE_LLM_MODEL)
+
+    Returns:
+        Number of tokens
+    """
+    if not text:
+        return 0
+
+    model = model or config.HUGGINGFACE_LLM_MODEL
+
+    counter = _tokenizers.get(model)
+    if counter is None and model not in _tokenizers:
+        with _tokenizer_lock:
+            if model not in _tokenizers:
+                _tokenizers[model] = _load_tokenizer(model)
+            counter = _tokenizers[model]
+
+    if counter is None:
+        return _approx_token_count(text)
+    return counter(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """
+    Cut text to at most max_tokens tokens, preferring a whitespace boundary.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token limit
+        model: Target model name
+
+    Returns:
+        Truncated text
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    # Binary search on character length; token counts are monotonic enough
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid], model) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+
+    cut = text[:lo]
+    boundary = cut.rfind(" ")
+    if boundary > lo * 0.8:
+        cut = cut[:boundary]
+    return cut.rstrip()
+
+
+# ---------------------------------------------------------
+# NEAR-DUPLICATE DETECTION (SHINGLES + MINHASH)
+# ---------------------------------------------------------
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def shingles(text: str, size: int = None) -> set:
+    """
+    Word shingles of a text, hashed to 32-bit integers.
+
+    Args:
+        text: Input text
+        size: Words per shingle (default: config.CONTEXT_SHINGLE_SIZE)
+
+    Returns:
+        Set of shingle hashes
+    """
+    size = size or config.CONTEXT_SHINGLE_SIZE
+    words = _normalize(text).split(" ")
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words[0] else set()
+
+    return {
+        zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    }
+
+
+def _permutations(num_perm: int):
+    # Deterministic (a, b) pairs so signatures are stable across processes
+    params = []
+    for i in range(num_perm):
+        a = zlib.crc32(f"minhash-a-{i}".encode()) | 1
+        b = zlib.crc32(f"minhash-b-{i}".encode())
+        params.append((a, b))
+    return params
+
+
+_PERMUTATIONS = {}
+
+
+def minhash_signature(shingle_set: set, num_perm: int = None) -> tuple:
+    """
+    MinHash signature of a shingle set.
+
+    Args:
+        shingle_set: Output of shingles()
+        num_perm: Number of hash permutations (default: config.CONTEXT_MINHASH_PERMUTATIONS)
+
+    Returns:
+        Tuple of num_perm minimum hash values
+    """
+    num_perm = num_perm or config.CONTEXT_MINHASH_PERMUTATIONS
+    perms = _PERMUTATIONS.get(num_perm)
+    if perms is None:
+        perms = _PERMUTATIONS.setdefault(num_perm, _permutations(num_perm))
+
+    if not shingle_set:
+        return tuple([_MAX_HASH] * num_perm)
+
+    return tuple(
+        min(((a * s + b) % _MERSENNE_PRIME) & _MAX_HASH for s in shingle_set)
+        for a, b in perms
+    )
+
+
+def estimate_similarity(sig_a: tuple, sig_b: tuple) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+# ---------------------------------------------------------
+# OVERLAP MERGING
+# ---------------------------------------------------------
+def find_overlap(left: str, right: str, min_overlap: int = None, max_overlap: int = None) -> int:
+    """
+    Length of the longest suffix of left that is a prefix of right.
+
+    Args:
+        left: Earlier chunk
+        right: Later chunk
+        min_overlap: Shortest overlap worth merging (default: config.CONTEXT_MIN_MERGE_OVERLAP)
+        max_overlap: Longest overlap to look for (default: config.CONTEXT_MAX_MERGE_OVERLAP)
+
+    Returns:
+        Overlap length in characters, 0 if none
+    """
+    min_overlap = min_overlap or config.CONTEXT_MIN_MERGE_OVERLAP
+    max_overlap = max_overlap or config.CONTEXT_MAX_MERGE_OVERLAP
+
+    limit = min(len(left), len(right), max_overlap)
+    if limit < min_overlap:
+        return 0
+
+    probe = right[:min_overlap]
+    start = len(left) - limit
+    pos = left.find(probe, start)
+    while pos != -1:
+        length = len(left) - pos
+        if right.startswith(left[pos:]):
+            return length
+        pos = left.find(probe, pos + 1)
+    return 0
+
+
+def _source_key(metadata: dict):
+    for key in SOURCE_KEYS:
+        value = metadata.get(key)
+        if value is not None:
+            return key, str(value)
+    return None
+
+
+class _Chunk:
+    __slots__ = ("text", "metadata", "rank", "signature")
+
+    def __init__(self, text: str, metadata: dict, rank: int):
+        self.text = text
+        self.metadata = metadata
+        self.rank = rank
+        self.signature = None
+
+
+def _as_chunks(docs: Sequence, scores: Optional[Sequence[float]]) -> List[_Chunk]:
+    chunks = []
+    for i, doc in enumerate(docs):
+        if isinstance(doc, str):
+            text, metadata = doc, {}
+        else:
+            text = getattr(doc, "page_content", "") or ""
+            metadata = dict(getattr(doc, "metadata", None) or {})
+        text = text.strip()
+        if text:
+            chunks.append(_Chunk(text, metadata, i))
+
+    if scores is not None:
+        order = sorted(range(len(chunks)), key=lambda i: -scores[chunks[i].rank])
+        chunks = [chunks[i] for i in order]
+        for rank, chunk in enumerate(chunks):
+            chunk.rank = rank
+    return chunks
+
+
+def _try_merge(kept: _Chunk, new: _Chunk) -> bool:
+    """Merge new into kept when they are adjacent overlapping chunks of one source."""
+    source = _source_key(kept.metadata)
+    # Chunks without a known source are never assumed to be neighbours
+    if source is None or source != _source_key(new.metadata):
+        return False
+
+    if new.text in kept.text:
+        return True
+
+    overlap = find_overlap(kept.text, new.text)
+    if overlap:
+        kept.text = kept.text + new.text[overlap:]
+    else:
+        overlap = find_overlap(new.text, kept.text)
+        if not overlap:
+            return False
+        kept.text = new.text + kept.text[overlap:]
+
+    # Near-duplicate checks must see the merged text
+    kept.signature = minhash_signature(shingles(kept.text))
+    return True
+
+
+# ---------------------------------------------------------
+# PACKING
+# ---------------------------------------------------------
+def select_chunks(
+    docs: Sequence,
+    scores: Optional[Sequence[float]] = None,
+    dedup_threshold: float = None,
+) -> List[_Chunk]:
+    """
+    Deduplicate and merge chunks, keeping relevance order.
+
+    Args:
+        docs: LangChain documents or plain strings, most relevant first
+        scores: Optional relevance scores (higher is better) overriding input order
+        dedup_threshold: Estimated Jaccard similarity above which a chunk is dropped
+
+    Returns:
+        Chunks with .text and .metadata, most relevant first
+    """
+    if dedup_threshold is None:
+        dedup_threshold = config.CONTEXT_DEDUP_THRESHOLD
+
+    kept: List[_Chunk] = []
+    seen_exact = set()
+
+    for chunk in _as_chunks(docs, scores):
+        normalized = _normalize(chunk.text)
+        if normalized in seen_exact:
+            continue
+        seen_exact.add(normalized)
+
+        if any(_try_merge(k, chunk) for k in kept):
+            continue
+
+        chunk.signature = minhash_signature(shingles(chunk.text))
+        if any(
+            k.signature is not None
+            and estimate_similarity(k.signature, chunk.signature) >= dedup_threshold
+            for k in kept
+        ):
+            continue
+
+        kept.append(chunk)
+
+    return kept
+
+
+def pack_context(
+    docs: Sequence,
+    max_tokens: int = None,
+    model: Optional[str] = None,
+    scores: Optional[Sequence[float]] = None,
+    separator: str = "\n\n",
+    formatter: Optional[Callable[[str, dict], str]] = None,
+    dedup_threshold: float = None,
+) -> str:
+    """
+    Pack retrieved chunks into a prompt context within a token budget.
+
+    Chunks are taken in relevance order; exact and near-duplicate chunks are
+    dropped, adjacent overlapping chunks of the same source are merged, and
+    chunks that no longer fit the remaining budget are skipped. The first
+    chunk is truncated rather than dropped so the context is never empty
+    when there is material to use.
+
+    Args:
+        docs: LangChain documents or plain strings, most relevant first
+        max_tokens: Token budget (default: config.CONTEXT_TOKEN_BUDGET)
+        model: Target model name used for token counting
+        scores: Optional relevance scores (higher is better)
+        separator: String placed between chunks
+        formatter: Optional callable (text, metadata) -> str applied per chunk
+        dedup_threshold: Near-duplicate similarity threshold
+
+    Returns:
+        Context string
+    """
+    max_tokens = max_tokens or config.CONTEXT_TOKEN_BUDGET
+    chunks = select_chunks(docs, scores=scores, dedup_threshold=dedup_threshold)
+
+    parts = []
+    used = 0
+    sep_tokens = count_tokens(separator, model) if separator.strip() else 0
+
+    for chunk in chunks:
+        text = formatter(chunk.text, chunk.metadata) if formatter else chunk.text
+        cost = count_tokens(text, model) + (sep_tokens if parts else 0)
+
+        if used + cost <= max_tokens:
+            parts.append(text)
+            used += cost
+        elif not parts:
+            parts.append(truncate_to_tokens(text, max_tokens, model))
+            break
+
+    return separator.join(parts)
@@ -0,0 +1,436 @@
+"""
+Embedding Backend Module
+
+Single entry point for sentence embeddings on CPU:
+- "torch": sentence-transformers / PyTorch (default)
+- "onnx":  the same model exported to ONNX (optionally dynamic int8
+           quantized) and served by ONNX Runtime
+
+Both backends expose SentenceTransformer-style `encode()`. encode_texts()
+is the shared call path: it reads through the persistent embedding cache
+(src/embedding_cache.py), sends misses through the cross-request
+micro-batcher (src/embedding_batcher.py) when enabled, and
+SentenceEncoderEmbeddings adapts it to LangChain.
+"""
+import os
+import sys
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Set, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.embedding_batcher import EmbeddingBatcher
+from src.embedding_cache import get_embedding_cache, normalize_text, text_hash
+
+
+def _default_threads() -> int:
+    # Hyper-threads hurt GEMM-bound inference; approximate physical cores
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+# =========================================================
+# ONNX RUNTIME ENCODER
+# =========================================================
+class OnnxSentenceEncoder:
+    """sentence-transformers model served by ONNX Runtime."""
+
+    def __init__(
+        self,
+        model_name: str,
+        quantize: bool = None,
+        directory: str = None,
+        intra_op_threads: int = None,
+    ):
+        """
+        Load (exporting on first use) an ONNX version of a sentence-transformer.
+
+        Args:
+            model_name: sentence-transformers model id
+            quantize: Use the dynamic int8 quantized graph (default: config.ONNX_QUANTIZE)
+            directory: Export directory (default: config.ONNX_MODEL_DIRECTORY)
+            intra_op_threads: ONNX Runtime intra-op threads (default: config / physical cores)
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.quantize = config.ONNX_QUANTIZE if quantize is None else quantize
+        base = directory or config.ONNX_MODEL_DIRECTORY
+        self.directory = os.path.join(base, model_name.replace("/", "__"))
+
+        if not os.path.exists(os.path.join(self.directory, "meta.json")):
+            export_onnx_model(model_name, self.directory)
+
+        with open(os.path.join(self.directory, "meta.json"), "r", encoding="utf-8") as fh:
+            self.meta = json.load(fh)
+
+        model_path = os.path.join(self.directory, "model.onnx")
+        if self.quantize:
+            quantized_path = os.path.join(self.directory, "model.int8.onnx")
+            if not os.path.exists(quantized_path):
+                quantize_onnx_model(model_path, quantized_path)
+            model_path = quantized_path
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = intra_op_threads or config.ONNX_INTRA_OP_THREADS or _default_threads()
+        options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(self.directory)
+        self.max_seq_length = self.meta["max_seq_length"]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.meta["dimension"]
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        feeds = {k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens (the pooling both supported models use)
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = None,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ) -> np.ndarray:
+        """
+        Embed sentences (SentenceTransformer.encode compatible subset).
+
+        Args:
+            sentences: One text or a list of texts
+            batch_size: Texts per forward pass (default: config.EMBEDDING_BATCH_SIZE)
+            normalize_embeddings: L2-normalize the output
+
+        Returns:
+            float32 array, shape (d,) for a single text or (n, d)
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+        dim = self.get_sentence_embedding_dimension()
+        out = np.zeros((len(texts), dim), dtype=np.float32)
+
+        # Length-sorted batches keep padding (and wasted FLOPs) small
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            out[rows] = self._forward([texts[i] for i in rows])
+
+        if normalize_embeddings or self.meta.get("normalize"):
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out[0] if single else out
+
+
+def export_onnx_model(model_name: str, directory: str):
+    """
+    Export the transformer of a sentence-transformers model to ONNX.
+
+    Writes model.onnx, the tokenizer files and meta.json (pooling settings)
+    into `directory`. Needs torch + sentence-transformers at export time only.
+
+    Args:
+        model_name: sentence-transformers model id
+        directory: Output directory
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    print(f"⧗ Exporting {model_name} to ONNX...")
+    os.makedirs(directory, exist_ok=True)
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in tokenizer.model_input_names]
+
+    dummy = tokenizer(["export sample"], return_tensors="pt")
+    args = tuple(dummy[n] for n in input_names)
+    dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            args,
+            os.path.join(directory, "model.onnx"),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    tokenizer.save_pretrained(directory)
+    module_names = [type(module).__name__ for module in st_model]
+    meta = {
+        "model_name": model_name,
+        "dimension": st_model.get_sentence_embedding_dimension(),
+        "max_seq_length": st_model.max_seq_length,
+        "normalize": "Normalize" in module_names,
+    }
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, indent=2)
+    print(f"✔ ONNX model written to {directory}")
+
+
+def quantize_onnx_model(source_path: str, target_path: str):
+    """Dynamic int8 quantization of the MatMul weights (activations stay float)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    print(f"⧗ Quantizing {source_path} to int8...")
+    quantize_dynamic(source_path, target_path, weight_type=QuantType.QInt8)
+    print(f"✔ Quantized model written to {target_path}")
+
+
+# =========================================================
+# BACKEND SELECTION
+# =========================================================
+_encoders: Dict[tuple, object] = {}
+_encoders_lock = threading.Lock()
+_onnx_fallbacks: Set[str] = set()  # Models whose ONNX encoder failed to load (served by PyTorch)
+
+
+def _normalize_model_name(model_name: str) -> str:
+    if "/" not in model_name:
+        return f"sentence-transformers/{model_name}"
+    return model_name
+
+
+def get_sentence_encoder(model_name: str = None, backend: str = None):
+    """
+    Shared encoder for a model on the configured backend.
+
+    Args:
+        model_name: sentence-transformers model id (default: config.HUGGINGFACE_EMBEDDING_MODEL)
+        backend: "torch" or "onnx" (default: config.EMBEDDING_BACKEND)
+
+    Returns:
+        Object with a SentenceTransformer-style encode()
+    """
+    model_name = _normalize_model_name(model_name or config.HUGGINGFACE_EMBEDDING_MODEL)
+    backend = backend or config.EMBEDDING_BACKEND
+    key = (model_name, backend)
+
+    encoder = _encoders.get(key)
+    if encoder is not None:
+        return encoder
+
+    with _encoders_lock:
+        encoder = _encoders.get(key)
+        if encoder is None:
+            encoder = _load_encoder(model_name, backend)
+            _encoders[key] = encoder
+    return encoder
+
+
+def _load_encoder(model_name: str, backend: str):
+    if backend == "onnx":
+        try:
+            return OnnxSentenceEncoder(model_name)
+        except Exception as e:
+            # Missing packages, a failed export or download, or a broken ONNX Runtime install
+            print(f"⚠ ONNX backend unavailable ({type(e).__name__}: {e}); falling back to PyTorch")
+            _onnx_fallbacks.add(model_name)
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+_batchers: Dict[tuple, EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_embedding_batcher(model_name: str = None, backend: str = None) -> EmbeddingBatcher:
+    """Shared micro-batcher in front of get_sentence_encoder(model_name, backend)."""
+    model_name = _normalize_model_name(model_name or config.HUGGINGFACE_EMBEDDING_MODEL)
+    backend = backend or config.EMBEDDING_BACKEND
+    key = (model_name, backend)
+
+    batcher = _batchers.get(key)
+    if batcher is not None:
+        return batcher
+
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            encoder = get_sentence_encoder(model_name, backend)
+            batcher = EmbeddingBatcher(
+                lambda texts: encoder.encode(
+                    texts,
+                    batch_size=config.EMBEDDING_BATCH_SIZE,
+                    normalize_embeddings=False,
+                ),
+                max_batch_size=config.EMBEDDING_MAX_BATCH_SIZE,
+                max_wait_ms=config.EMBEDDING_MAX_WAIT_MS,
+            )
+            _batchers[key] = batcher
+    return batcher
+
+
+def _model_key(model_name: str, backend: str) -> str:
+    # ONNX / int8 vectors differ slightly from PyTorch ones, so cache them apart
+    if backend == "onnx" and model_name not in _onnx_fallbacks:
+        return f"{model_name}|onnx-{'int8' if config.ONNX_QUANTIZE else 'fp32'}"
+    return f"{model_name}|torch"
+
+
+def _encode_uncached(texts: List[str], model_name: str, backend: str) -> np.ndarray:
+    if config.EMBEDDING_MICRO_BATCHING:
+        return get_embedding_batcher(model_name, backend).embed(texts, normalize=False)
+
+    vectors = get_sentence_encoder(model_name, backend).encode(
+        texts,
+        batch_size=config.EMBEDDING_BATCH_SIZE,
+        normalize_embeddings=False,
+    )
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def encode_texts(
+    texts: List[str],
+    model_name: str = None,
+    normalize: bool = True,
+    backend: str = None,
+) -> np.ndarray:
+    """
+    Embed texts on the configured backend, reading through the embedding cache.
+
+    Args:
+        texts: Texts to embed (whitespace-normalized before embedding)
+        model_name: sentence-transformers model id (default: config.HUGGINGFACE_EMBEDDING_MODEL)
+        normalize: L2-normalize the rows
+        backend: "torch" or "onnx" (default: config.EMBEDDING_BACKEND)
+
+    Returns:
+        float32 array, shape (len(texts), d)
+    """
+    model_name = _normalize_model_name(model_name or config.HUGGINGFACE_EMBEDDING_MODEL)
+    backend = backend or config.EMBEDDING_BACKEND
+    texts = [normalize_text(t) for t in texts]
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    cache = get_embedding_cache()
+    if cache is None:
+        vectors = _encode_uncached(texts, model_name, backend)
+    else:
+        key = _model_key(model_name, backend)
+        hashes = [text_hash(t) for t in texts]
+        try:
+            found = cache.get_many(key, hashes)
+        except sqlite3.Error as e:
+            print(f"⚠ Embedding cache read failed: {e}")
+            found = {}
+
+        missing = {h: t for h, t in zip(hashes, texts) if h not in found}
+        if missing:
+            computed = dict(zip(missing, _encode_uncached(list(missing.values()), model_name, backend)))
+            try:
+                # Re-keyed: the encoder may have just fallen back from ONNX to PyTorch
+                cache.put_many(_model_key(model_name, backend), computed)
+            except sqlite3.Error as e:
+                print(f"⚠ Embedding cache write failed: {e}")
+            found.update(computed)
+        vectors = np.stack([found[h] for h in hashes])
+
+    if normalize:
+        vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    return vectors
+
+
+@contextmanager
+def multi_process_encoder(model_name: str = None, processes: int = None):
+    """
+    Bulk encoder spreading batches over worker processes (one per core by default).
+
+    For offline jobs (re-embedding a collection): bypasses the cache and the
+    micro-batcher. With a single process it falls back to encode_texts().
+
+    Args:
+        model_name: sentence-transformers model id (default: config.HUGGINGFACE_EMBEDDING_MODEL)
+        processes: Worker processes (default: config.EMBEDDING_MIGRATION_PROCESSES / all cores)
+
+    Yields:
+        texts -> L2-normalized float32 array
+    """
+    model_name = _normalize_model_name(model_name or config.HUGGINGFACE_EMBEDDING_MODEL)
+    processes = processes or config.EMBEDDING_MIGRATION_PROCESSES or os.cpu_count() or 1
+    if processes <= 1:
+        yield lambda texts: encode_texts(texts, model_name, normalize=True)
+        return
+
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    # One intra-op thread per worker; N workers x all-core GEMMs oversubscribe the CPU
+    previous = os.environ.get("OMP_NUM_THREADS")
+    os.environ["OMP_NUM_THREADS"] = "1"
+    try:
+        pool = model.start_multi_process_pool(target_devices=["cpu"] * processes)
+    finally:
+        if previous is None:
+            os.environ.pop("OMP_NUM_THREADS", None)
+        else:
+            os.environ["OMP_NUM_THREADS"] = previous
+
+    def encode(texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(model.encode_multi_process(
+            [normalize_text(t) for t in texts],
+            pool,
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+        ), dtype=np.float32)
+        return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+    print(f"✔ Encoding with {processes} worker processes ({model_name})")
+    try:
+        yield encode
+    finally:
+        SentenceTransformer.stop_multi_process_pool(pool)
+
+
+def embedding_stats() -> Dict[str, dict]:
+    """Micro-batcher histograms and embedding cache counters."""
+    cache = get_embedding_cache()
+    return {
+        "batchers": {f"{model}|{backend}": b.stats() for (model, backend), b in list(_batchers.items())},
+        "cache": cache.stats() if cache is not None else None,
+    }
+
+
+class SentenceEncoderEmbeddings(Embeddings):
+    """LangChain Embeddings backed by encode_texts()."""
+
+    def __init__(self, model_name: str = None, normalize: bool = True, backend: str = None):
+        self.model_name = _normalize_model_name(model_name or config.HUGGINGFACE_EMBEDDING_MODEL)
+        self.normalize = normalize
+        self.backend = backend
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return encode_texts(texts, self.model_name, self.normalize, self.backend).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,197 @@
+"""
+Embedding Batcher Module
+
+In-process embedding service that coalesces embedding requests from
+concurrent callers (chat queries, ingestion, folder analysis) into
+micro-batches: a batch is closed when it reaches the max batch size or
+the oldest request has waited max_wait_ms, then embedded in one forward
+pass and every caller's future is resolved with its own rows.
+
+Requests larger than the max batch size (bulk ingestion) are queued one
+slice at a time, so chat queries arriving meanwhile run between the
+slices instead of waiting for the whole request.
+"""
+import time
+import queue
+import asyncio
+import threading
+from bisect import bisect_left
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram (bucket = first upper bound >= value)."""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.total += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+            return {
+                "count": self.count,
+                "mean": round(self.total / self.count, 3) if self.count else 0.0,
+                "buckets": dict(zip(labels, self.counts)),
+            }
+
+
+class _Request:
+    __slots__ = ("texts", "normalize", "future", "enqueued")
+
+    def __init__(self, texts: List[str], normalize: bool):
+        self.texts = texts
+        self.normalize = normalize
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class EmbeddingBatcher:
+    """Dynamic micro-batching in front of an encode(texts) -> matrix function."""
+
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+    QUEUE_DELAY_MS_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch_size: int, max_wait_ms: float):
+        """
+        Start the batching worker.
+
+        Args:
+            encode_fn: Embeds a list of texts in one call, returns (n, d) array
+            max_batch_size: Texts per forward pass (larger requests are split into slices)
+            max_wait_ms: Longest time the first queued request waits for company
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self.batch_sizes = Histogram(self.BATCH_SIZE_BUCKETS)
+        self.queue_delays_ms = Histogram(self.QUEUE_DELAY_MS_BUCKETS)
+
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._carry = None
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    # ---------------------------------------------------------
+    # CLIENT API
+    # ---------------------------------------------------------
+    def submit(self, texts: Sequence[str], normalize: bool = True) -> Future:
+        """
+        Queue texts for embedding.
+
+        Args:
+            texts: Texts to embed
+            normalize: L2-normalize the returned rows
+
+        Returns:
+            Future resolving to a float32 array of shape (len(texts), d)
+        """
+        texts = list(texts)
+        if len(texts) > self.max_batch_size:
+            return self._submit_sliced(texts, normalize)
+        request = _Request(texts, normalize)
+        if not request.texts:
+            request.future.set_result(np.zeros((0, 0), dtype=np.float32))
+            return request.future
+        self._queue.put(request)
+        return request.future
+
+    def _submit_sliced(self, texts: List[str], normalize: bool) -> Future:
+        """Queue max-batch slices one after another; each is queued when the previous one is done."""
+        result: Future = Future()
+        slices = [texts[i:i + self.max_batch_size] for i in range(0, len(texts), self.max_batch_size)]
+        parts: List[np.ndarray] = []
+
+        def queue_next(done: Future = None):
+            if done is not None:
+                try:
+                    parts.append(done.result())
+                except Exception as e:
+                    result.set_exception(e)
+                    return
+            if len(parts) == len(slices):
+                result.set_result(np.concatenate(parts))
+                return
+            request = _Request(slices[len(parts)], normalize)
+            request.future.add_done_callback(queue_next)
+            self._queue.put(request)
+
+        queue_next()
+        return result
+
+    def embed(self, texts: Sequence[str], normalize: bool = True) -> np.ndarray:
+        """Blocking embed through the batcher."""
+        return self.submit(texts, normalize).result()
+
+    async def embed_async(self, texts: Sequence[str], normalize: bool = True) -> np.ndarray:
+        """Awaitable embed through the batcher (does not block the event loop)."""
+        return await asyncio.wrap_future(self.submit(texts, normalize))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": self._queue.qsize(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_delay_ms": self.queue_delays_ms.snapshot(),
+        }
+
+    # ---------------------------------------------------------
+    # WORKER
+    # ---------------------------------------------------------
+    def _collect(self) -> List[_Request]:
+        first = self._carry or self._queue.get()
+        self._carry = None
+        batch, size = [first], len(first.texts)
+        deadline = first.enqueued + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if size + len(request.texts) > self.max_batch_size:
+                self._carry = request  # opens the next batch
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            texts = [text for request in batch for text in request.texts]
+
+            for request in batch:
+                self.queue_delays_ms.observe((started - request.enqueued) * 1000.0)
+            self.batch_sizes.observe(len(texts))
+
+            try:
+                vectors = np.asarray(self.encode_fn(texts), dtype=np.float32)
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            offset = 0
+            for request in batch:
+                rows = vectors[offset:offset + len(request.texts)]
+                offset += len(request.texts)
+                if request.normalize:
+                    rows = rows / np.clip(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12, None)
+                request.future.set_result(rows)
@@ -0,0 +1,222 @@
+"""
+Embedding Cache Module
+
+Content-addressed, disk-backed cache of embeddings shared by every
+ingestion and query path. Entries are keyed by (model key, SHA-256 of the
+whitespace-normalized text), stored as float32 blobs in SQLite and evicted
+least-recently-used once the cache exceeds its size limit.
+
+Lookups are read-only: access times of hits are buffered in memory and
+written in one batch (before every eviction, or once the buffer fills).
+"""
+import os
+import re
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+_WS_RE = re.compile(r"\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model       TEXT NOT NULL,
+    text_hash   TEXT NOT NULL,
+    vector      BLOB NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access);
+CREATE TABLE IF NOT EXISTS stats (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats VALUES ('total_bytes', 0);
+"""
+
+# SQLite caps bound parameters per statement
+_LOOKUP_CHUNK = 500
+# Buffered access times written back once this many hits are pending
+_ACCESS_FLUSH_SIZE = 1000
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form used both for hashing and embedding."""
+    return _WS_RE.sub(" ", text or "").strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed (model, text hash) -> vector cache with LRU eviction."""
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path: SQLite file (default: config.EMBEDDING_CACHE_PATH)
+            max_bytes: Size limit of stored vectors (default: config.EMBEDDING_CACHE_MAX_MB)
+        """
+        self.path = path or config.EMBEDDING_CACHE_PATH
+        self.max_bytes = max_bytes or config.EMBEDDING_CACHE_MAX_MB * 1024 * 1024
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pending_access: Dict[tuple, float] = {}
+        self._stats_lock = threading.Lock()  # Counters and the access buffer
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---------------------------------------------------------
+    # READ / WRITE
+    # ---------------------------------------------------------
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Look up vectors.
+
+        Args:
+            model: Model key (model id + backend variant)
+            hashes: text_hash() values
+
+        Returns:
+            Dict of hash -> float32 vector for the hits
+        """
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, np.ndarray] = {}
+        now = time.time()
+
+        with self._connect() as conn:
+            for start in range(0, len(unique), _LOOKUP_CHUNK):
+                chunk = unique[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+
+        with self._stats_lock:
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+            for key in found:
+                self._pending_access[(model, key)] = now
+            flush = len(self._pending_access) >= _ACCESS_FLUSH_SIZE
+        if flush:
+            with self._write_lock, self._connect() as conn:
+                self._flush_access(conn)
+        return found
+
+    def _flush_access(self, conn):
+        """Write buffered access times (call under the write lock)."""
+        with self._stats_lock:
+            pending, self._pending_access = self._pending_access, {}
+        conn.executemany(
+            "UPDATE embeddings SET last_access = MAX(last_access, ?) WHERE model = ? AND text_hash = ?",
+            [(at, model, key) for (model, key), at in pending.items()],
+        )
+
+    def put_many(self, model: str, items: Dict[str, np.ndarray]):
+        """
+        Store vectors, then evict least-recently-used entries over the limit.
+
+        Args:
+            model: Model key
+            items: Dict of hash -> vector
+        """
+        if not items:
+            return
+        now = time.time()
+        with self._write_lock, self._connect() as conn:
+            added = 0
+            for key, vector in items.items():
+                blob = np.asarray(vector, dtype=np.float32).tobytes()
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?)",
+                    (model, key, blob, now),
+                )
+                added += len(blob) if cur.rowcount else 0
+            conn.execute("UPDATE stats SET value = value + ? WHERE key = 'total_bytes'", (added,))
+            self._flush_access(conn)
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT value FROM stats WHERE key = 'total_bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% so eviction does not run on every insert
+        target = int(self.max_bytes * 0.9)
+        freed, victims = 0, []
+        for model, key, size in conn.execute(
+            "SELECT model, text_hash, length(vector) FROM embeddings ORDER BY last_access"
+        ):
+            victims.append((model, key))
+            freed += size
+            if total - freed <= target:
+                break
+
+        conn.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", victims)
+        conn.execute("UPDATE stats SET value = value - ? WHERE key = 'total_bytes'", (freed,))
+        with self._stats_lock:
+            self.evictions += len(victims)
+
+    def stats(self) -> Dict[str, object]:
+        with self._connect() as conn:
+            total = conn.execute("SELECT value FROM stats WHERE key = 'total_bytes'").fetchone()[0]
+            entries = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        with self._stats_lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "size_mb": round(total / 2**20, 2),
+            "max_mb": round(self.max_bytes / 2**20, 2),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": evictions,
+        }
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Shared cache instance, or None when EMBEDDING_CACHE is disabled."""
+    global _cache
+    if not config.EMBEDDING_CACHE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
@@ -0,0 +1,333 @@
+"""
+Embedding Migration Module
+
+Re-embeds Chroma collections with a new embedding model without downtime:
+1. begin: a shadow collection is created and registered
+   (src/collection_registry.py); from then on every writer mirrors its
+   upserts/deletes into the shadow, embedded with the new model
+2. backfill: rows are read from the primary in pages, re-embedded on all
+   cores (multi-process encoder) and upserted into the shadow; the page
+   cursor is checkpointed, so a crashed run resumes where it stopped
+3. reconcile: rows the backfill missed (deleted/inserted mid-run) are
+   copied, rows deleted from the primary are dropped from the shadow
+4. switch: primary and shadow swap in one registry transaction (for all
+   migrated collections at once); the old collection keeps receiving
+   dual-writes so `rollback` stays possible
+5. finalize: dual-writes stop and the old collection is deleted
+
+A --no-switch run leaves dual-writes on; running it again later resumes,
+reconciles and switches. Collections the registry has not seen yet are
+assumed to hold --source-model vectors (default: HUGGINGFACE_EMBEDDING_MODEL).
+
+Usage:
+    python -m src.embedding_migration run --model sentence-transformers/all-mpnet-base-v2 --all
+    python -m src.embedding_migration run --model BAAI/bge-small-en-v1.5 --collections folder_analysis --no-switch
+    python -m src.embedding_migration run --model sentence-transformers/all-MiniLM-L6-v2 --directory ./chroma \
+        --collections ocr_notebooklm --source-model sentence-transformers/all-mpnet-base-v2
+    python -m src.embedding_migration status
+    python -m src.embedding_migration finalize --all
+    python -m src.embedding_migration rollback --collections folder_analysis
+"""
+import os
+import sys
+import time
+import argparse
+import importlib
+from typing import Dict, List, Sequence, Set
+
+import chromadb
+from chromadb.config import Settings
+from langchain_core.documents import Document as LCDocument
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.chunk_offsets import hydrate_documents, is_pointer
+from src.collection_registry import get_collection_registry, shadow_collection_name
+from src.embedding_backend import _normalize_model_name, multi_process_encoder
+
+_ROW_KEY = "__migration_row"
+
+
+def _client(directory: str):
+    return chromadb.PersistentClient(path=directory, settings=Settings(anonymized_telemetry=False))
+
+
+def _register_resolvers():
+    # Pointer chunks of OCR files are hydrated from the OCR metadata store
+    try:
+        importlib.import_module("app.folder_analyzer.content_indexer")
+    except Exception as e:
+        print(f"⚠ OCR file resolver unavailable ({e}); such pointer chunks are skipped")
+
+
+def _embedding_texts(ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[dict]) -> Dict[str, str]:
+    """
+    Text to embed per row id; offset-based chunks are hydrated in bulk.
+
+    Pointers whose source is gone or changed are left out (they are
+    unreachable by search anyway).
+    """
+    texts: Dict[str, str] = {}
+    pointers = []
+    for row_id, document, metadata in zip(ids, documents, metadatas):
+        if not document and is_pointer(metadata):
+            pointers.append(LCDocument(page_content="", metadata={**metadata, _ROW_KEY: row_id}))
+        elif document:
+            texts[row_id] = document
+    for doc in hydrate_documents(pointers):
+        texts[doc.metadata[_ROW_KEY]] = doc.page_content
+    return texts
+
+
+def _copy_rows(shadow, encode, rows: dict) -> int:
+    """Re-embed rows (a Chroma get() result) into the shadow; returns rows skipped."""
+    ids = rows["ids"]
+    documents = rows["documents"] or [""] * len(ids)
+    metadatas = rows["metadatas"] or [None] * len(ids)
+    texts = _embedding_texts(ids, documents, [m or {} for m in metadatas])
+
+    keep = [i for i, row_id in enumerate(ids) if row_id in texts]
+    if keep:
+        vectors = encode([texts[ids[i]] for i in keep])
+        shadow.upsert(
+            ids=[ids[i] for i in keep],
+            embeddings=vectors.tolist(),
+            documents=[documents[i] or "" for i in keep],
+            metadatas=[metadatas[i] for i in keep],
+        )
+    return len(ids) - len(keep)
+
+
+def _all_ids(collection, page: int) -> Set[str]:
+    ids: Set[str] = set()
+    for offset in range(0, collection.count(), page):
+        ids.update(collection.get(limit=page, offset=offset, include=[])["ids"])
+    return ids
+
+
+# =========================================================
+# JOB
+# =========================================================
+def migrate_collection(
+    name: str,
+    model: str,
+    encode,
+    directory: str = None,
+    batch_size: int = None,
+    client=None,
+    source_model: str = None,
+) -> Dict[str, object]:
+    """
+    Begin (or resume) a collection's migration and backfill + reconcile its shadow.
+
+    Args:
+        name: Logical collection name
+        model: Target embedding model
+        encode: texts -> normalized vectors of the target model
+        directory: Chroma persist directory (default: config.CHROMA_PERSIST_DIRECTORY)
+        batch_size: Rows per page / checkpoint (default: config.EMBEDDING_MIGRATION_BATCH_SIZE)
+        client: Chroma client of the directory
+        source_model: Model of the current vectors, if the registry has not seen the collection
+
+    Returns:
+        Rows copied, skipped (stale pointers), reconciled and elapsed seconds
+    """
+    directory = directory or config.CHROMA_PERSIST_DIRECTORY
+    batch_size = batch_size or config.EMBEDDING_MIGRATION_BATCH_SIZE
+    client = client or _client(directory)
+    registry = get_collection_registry()
+    source_model = source_model or config.HUGGINGFACE_EMBEDDING_MODEL
+
+    binding = registry.resolve(directory, name, source_model)
+    source = client.get_collection(name=binding.physical)
+    if binding.state == "ready":
+        # Created before it is registered: writers never create it with default settings
+        client.get_or_create_collection(name=shadow_collection_name(binding.physical, model), metadata=source.metadata)
+    binding = registry.begin(directory, name, model, source_model)
+    shadow = client.get_or_create_collection(name=binding.shadow, metadata=source.metadata)
+
+    t0 = time.perf_counter()
+    cursor = registry.progress(directory, name)["cursor"]
+    total = source.count()
+    if cursor:
+        print(f"⧗ Resuming {name} at row {cursor:,}/{total:,}")
+
+    copied = skipped = 0
+    while cursor < total:
+        rows = source.get(limit=batch_size, offset=cursor, include=["documents", "metadatas"])
+        if not rows["ids"]:
+            break
+        batch_skipped = _copy_rows(shadow, encode, rows)
+        cursor += len(rows["ids"])
+        copied += len(rows["ids"]) - batch_skipped
+        skipped += batch_skipped
+        registry.checkpoint(directory, name, cursor, len(rows["ids"]) - batch_skipped, batch_skipped)
+
+        rate = copied / max(time.perf_counter() - t0, 1e-9)
+        print(f"⧗ {name}: {cursor:,}/{total:,} rows ({rate:,.0f} rows/s)")
+        total = source.count()  # dual-written inserts append to the primary
+
+    # Offsets shift when rows are deleted mid-run; diff the id sets to close the gaps
+    primary_ids, shadow_ids = _all_ids(source, batch_size), _all_ids(shadow, batch_size)
+    missing = sorted(primary_ids - shadow_ids)
+    orphans = sorted(shadow_ids - primary_ids)
+    reconciled = 0
+    for start in range(0, len(missing), batch_size):
+        rows = source.get(ids=missing[start:start + batch_size], include=["documents", "metadatas"])
+        missed = _copy_rows(shadow, encode, rows)
+        reconciled += len(rows["ids"]) - missed
+        skipped += missed
+    for start in range(0, len(orphans), batch_size):
+        shadow.delete(ids=orphans[start:start + batch_size])
+
+    elapsed = time.perf_counter() - t0
+    print(f"✔ {name} → {binding.shadow}: {copied:,} rows re-embedded, {reconciled:,} reconciled, "
+          f"{len(orphans):,} orphans dropped in {elapsed:.1f}s")
+    return {
+        "collection": name,
+        "shadow": binding.shadow,
+        "copied": copied,
+        "skipped": skipped,
+        "reconciled": reconciled,
+        "orphans_dropped": len(orphans),
+        "elapsed_seconds": round(elapsed, 2),
+    }
+
+
+def logical_collections(directory: str = None, client=None) -> List[str]:
+    """Logical names of every collection in a directory (shadows excluded)."""
+    directory = directory or config.CHROMA_PERSIST_DIRECTORY
+    client = client or _client(directory)
+    bindings = {b["name"]: b for b in get_collection_registry().bindings(directory)}
+    physical = {b["physical"] for b in bindings.values()} | {b["shadow"] for b in bindings.values() if b["shadow"]}
+
+    names = set(bindings)
+    for c in client.list_collections():
+        collection = getattr(c, "name", c)
+        if collection not in physical:
+            names.add(collection)
+    return sorted(names)
+
+
+def run_migration(
+    model: str,
+    names: Sequence[str] = None,
+    directory: str = None,
+    processes: int = None,
+    batch_size: int = None,
+    switch: bool = True,
+    source_model: str = None,
+) -> Dict[str, object]:
+    """
+    Re-embed collections with a model and switch them over together.
+
+    Args:
+        model: Target sentence-transformers model
+        names: Logical collections (default: every collection in the directory)
+        directory: Chroma persist directory (default: config.CHROMA_PERSIST_DIRECTORY)
+        processes: Encoder worker processes (default: config / all cores)
+        batch_size: Rows per page / checkpoint
+        switch: Switch once every collection is backfilled
+        source_model: Model of collections the registry has not seen yet
+
+    Returns:
+        Per-collection results and whether the switch happened
+    """
+    directory = directory or config.CHROMA_PERSIST_DIRECTORY
+    model = _normalize_model_name(model)
+    client = _client(directory)
+    registry = get_collection_registry()
+    source_model = _normalize_model_name(source_model or config.HUGGINGFACE_EMBEDDING_MODEL)
+    names = list(names or logical_collections(directory, client))
+    todo = [n for n in names if registry.resolve(directory, n, source_model).model != model]
+    if not todo:
+        print(f"⏭ Every collection already uses {model}")
+        return {"collections": [], "switched": False}
+
+    _register_resolvers()
+    results = []
+    with multi_process_encoder(model, processes) as encode:
+        for name in todo:
+            results.append(migrate_collection(name, model, encode, directory, batch_size, client, source_model))
+
+    if switch:
+        registry.switch(directory, todo)
+        print(f"✔ Switched {len(todo)} collections to {model}; finalize once all workers picked it up")
+    return {"collections": results, "switched": switch}
+
+
+def finalize_migration(names: Sequence[str], directory: str = None) -> List[str]:
+    """Stop dual-writes and delete the old collections; returns the deleted names."""
+    directory = directory or config.CHROMA_PERSIST_DIRECTORY
+    client = _client(directory)
+    dropped = []
+    for name in names:
+        old = get_collection_registry().finalize(directory, name)
+        if old:
+            client.delete_collection(name=old)
+            dropped.append(old)
+            print(f"✔ {name}: dropped {old}")
+    return dropped
+
+
+def rollback_migration(names: Sequence[str], directory: str = None) -> List[str]:
+    """Return collections to their pre-migration model; returns the deleted names."""
+    directory = directory or config.CHROMA_PERSIST_DIRECTORY
+    client = _client(directory)
+    dropped = []
+    for name in names:
+        unused = get_collection_registry().rollback(directory, name)
+        if unused:
+            try:
+                client.delete_collection(name=unused)
+            except Exception:
+                pass
+            dropped.append(unused)
+            print(f"✔ {name}: rolled back, dropped {unused}")
+    return dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("run", "finalize", "rollback", "status"))
+    parser.add_argument("--model", help="target embedding model (run)")
+    parser.add_argument("--source-model", default=None, help="model of collections not yet in the registry")
+    parser.add_argument("--collections", nargs="+", help="logical collection names")
+    parser.add_argument("--all", action="store_true", help="every collection in the directory")
+    parser.add_argument("--directory", default=None, help="Chroma persist directory")
+    parser.add_argument("--processes", type=int, default=None, help="encoder worker processes")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--no-switch", action="store_true", help="backfill only; switch later")
+    args = parser.parse_args()
+
+    directory = args.directory or config.CHROMA_PERSIST_DIRECTORY
+    registry = get_collection_registry()
+    if args.command == "status":
+        for b in registry.bindings(directory):
+            line = f"{b['name']}: {b['model']} [{b['state']}]"
+            if b["shadow"]:
+                line += f" ↔ {b['shadow_model']} ({b['copied']:,} copied, {b['skipped']:,} skipped)"
+            print(line)
+        return
+
+    if not (args.collections or args.all):
+        parser.error("pass --collections or --all")
+
+    if args.command == "run":
+        if not args.model:
+            parser.error("run needs --model")
+        run_migration(
+            args.model, args.collections, directory, args.processes, args.batch_size,
+            switch=not args.no_switch, source_model=args.source_model,
+        )
+        return
+
+    names = args.collections or [b["name"] for b in registry.bindings(directory)]
+    if args.command == "finalize":
+        finalize_migration(names, directory)
+    else:
+        rollback_migration(names, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,208 @@
+"""
+Folder Vector Store Module
+
+Persistent Chroma collection of analysed folder files. Files are keyed by
+file id and carry folder_id metadata, so a folder can be queried, updated
+(only changed files are re-embedded) or dropped on its own. The index
+lives on disk and is warm-loaded at startup instead of being rebuilt.
+The collection is resolved through src/collection_registry.py, so it
+follows embedding migrations (writes are mirrored into the shadow).
+"""
+import os
+import sys
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional, Sequence
+
 import chromadb
-from chromadb.utils import embedding_functions
+from chromadb.config import Settings
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.embedding_backend import encode_texts
+from src.collection_registry import CollectionBinding, get_collection_registry, shadow_delete, shadow_upsert
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
 
 class FolderVectorStore:
-    def __init__(self, persist_dir="chroma_db"):
-        self.client = chromadb.Client(
-            settings=chromadb.Settings(
-                persist_directory=persist_dir,
-                anonymized_telemetry=False
-            )
+    def __init__(self, persist_dir: str = None, collection_name: str = "folder_analysis", model_name: str = None):
+        """
+        Args:
+            persist_dir: Chroma directory (default: config.CHROMA_PERSIST_DIRECTORY)
+            collection_name: Collection holding folder files
+            model_name: Embedding model (default: config.HUGGINGFACE_EMBEDDING_MODEL)
+        """
+        self.persist_dir = persist_dir or config.CHROMA_PERSIST_DIRECTORY
+        self.client = chromadb.PersistentClient(
+            path=self.persist_dir,
+            settings=Settings(anonymized_telemetry=False),
         )
+        self.collection_name = collection_name
+        self.model_name = model_name or config.HUGGINGFACE_EMBEDDING_MODEL
+        self._collections: Dict[str, object] = {}
+        self.warm_seconds: Optional[float] = None
 
-        self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
-        )
+    @property
+    def binding(self) -> CollectionBinding:
+        """Physical collection and embedding model serving this store (cached by the registry)."""
+        return get_collection_registry().resolve(self.persist_dir, self.collection_name, self.model_name)
 
-        self.collection = self.client.get_or_create_collection(
-            name="folder_analysis",
-            embedding_function=self.embedding_function
-        )
+    @property
+    def collection(self):
+        name = self.binding.physical
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = self.client.get_or_create_collection(
+                name=name,
+                metadata={"hnsw:space": "cosine"},
+            )
+        return collection
+
+    def _embed(self, texts: Sequence[str], model_name: str = None) -> List[List[float]]:
+        # Vectors come from the shared embedding backend (cache + micro-batching)
+        return encode_texts(list(texts), model_name or self.binding.model, normalize=True).tolist()
+
+    # ---------------------------------------------------------
+    # WRITE PATH
+    # ---------------------------------------------------------
+    def add_documents(self, doc_ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[dict], batch_size: int = None):
+        """Embed and add documents in batches."""
+        batch_size = batch_size or config.FOLDER_VECTOR_BATCH_SIZE
+        for start in range(0, len(doc_ids), batch_size):
+            batch = slice(start, start + batch_size)
+            binding = self.binding
+            ids = [str(i) for i in doc_ids[batch]]
+            self.collection.add(
+                ids=ids,
+                embeddings=self._embed(texts[batch], binding.model),
+                documents=list(texts[batch]),
+                metadatas=list(metadatas[batch]),
+            )
+            shadow_upsert(self.client, binding, ids, list(texts[batch]), list(metadatas[batch]))
 
     def add_document(self, doc_id, text, metadata):
-        self.collection.add(
-            documents=[text],
-            metadatas=[metadata],
-            ids=[doc_id]
-        )
+        self.add_documents([doc_id], [text], [metadata])
+
+    def upsert_files(self, folder_id: str, files: Sequence[dict], batch_size: int = None) -> Dict[str, int]:
+        """
+        Insert or update a folder's files by file id; unchanged files are not re-embedded.
+
+        Args:
+            folder_id: Folder the files belong to
+            files: {"file_id", "text", "metadata"} dicts
+            batch_size: Files embedded per batch (default: config.FOLDER_VECTOR_BATCH_SIZE)
+
+        Returns:
+            Counts of upserted and unchanged files
+        """
+        batch_size = batch_size or config.FOLDER_VECTOR_BATCH_SIZE
+        upserted = unchanged = 0
+
+        for start in range(0, len(files), batch_size):
+            batch = files[start:start + batch_size]
+            ids = [str(f["file_id"]) for f in batch]
+            existing = self.collection.get(ids=ids, include=["metadatas"])
+            stored = {i: (m or {}).get("content_hash") for i, m in zip(existing["ids"], existing["metadatas"])}
+
+            changed = []
+            for file_id, f in zip(ids, batch):
+                digest = content_hash(f["text"])
+                if stored.get(file_id) == digest:
+                    unchanged += 1
+                    continue
+                metadata = dict(f.get("metadata") or {}, folder_id=str(folder_id), file_id=file_id, content_hash=digest)
+                changed.append((file_id, f["text"], metadata))
+
+            if changed:
+                binding = self.binding
+                self.collection.upsert(
+                    ids=[c[0] for c in changed],
+                    embeddings=self._embed([c[1] for c in changed], binding.model),
+                    documents=[c[1] for c in changed],
+                    metadatas=[c[2] for c in changed],
+                )
+                shadow_upsert(self.client, binding, [c[0] for c in changed], [c[1] for c in changed], [c[2] for c in changed])
+                upserted += len(changed)
+
+        print(f"✔ Folder {folder_id}: {upserted} files upserted, {unchanged} unchanged")
+        return {"upserted": upserted, "unchanged": unchanged}
+
+    def delete_folder(self, folder_id: str):
+        self.collection.delete(where={"folder_id": str(folder_id)})
+        shadow_delete(self.client, self.binding, where={"folder_id": str(folder_id)})
+
+    # ---------------------------------------------------------
+    # READ PATH
+    # ---------------------------------------------------------
+    def query(self, text, n_results=5, folder_id: str = None, where: dict = None):
+        """
+        Nearest files to a text, optionally within one folder.
+
+        Args:
+            text: Query text
+            n_results: Results to return
+            folder_id: Restrict to this folder
+            where: Extra Chroma metadata filter
+        """
+        conditions = [where] if where else []
+        if folder_id is not None:
+            conditions.append({"folder_id": str(folder_id)})
+        if len(conditions) > 1:
+            where = {"$and": conditions}
+        else:
+            where = conditions[0] if conditions else None
 
-    def query(self, text, n_results=5):
         return self.collection.query(
-            query_texts=[text],
-            n_results=n_results
+            query_embeddings=self._embed([text]),
+            n_results=n_results,
+            where=where,
         )
+
+    def warm_load(self) -> float:
+        """
+        Page the persisted HNSW segment and the embedding model in before the
+        first request (nothing is re-embedded or rebuilt).
+
+        Returns:
+            Seconds spent
+        """
+        t0 = time.perf_counter()
+        count = self.collection.count()
+        if count:
+            self.query("warm up", n_results=1)
+        else:
+            self._embed(["warm up"])
+        self.warm_seconds = time.perf_counter() - t0
+        print(f"✔ Folder index warm: {count} files in {self.warm_seconds:.2f}s")
+        return self.warm_seconds
+
+
+_store: Optional[FolderVectorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_folder_vector_store() -> FolderVectorStore:
+    """Shared FolderVectorStore instance."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FolderVectorStore()
+    return _store
+
+
+def warm_load_folder_vector_store() -> threading.Thread:
+    """Warm-load the shared store in a background thread (startup must not block)."""
+    def run():
+        try:
+            get_folder_vector_store().warm_load()
+        except Exception as e:
+            print(f"⚠ Folder index warm-load failed: {e}")
+
+    thread = threading.Thread(target=run, name="folder-index-warm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,390 @@
+"""
+Lexical Index Module
+
+Per-user BM25 inverted index over the same chunks written to the vector
+store. Backed by one SQLite file per user so it works offline, is updated
+incrementally on every write and answers identifier-style queries (FIR
+numbers, IPC sections, account numbers, exact names) without an embedding
+call.
+"""
+import os
+import re
+import sys
+import json
+import math
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document as LCDocument
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[/\-.:][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[/\-.:]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has he in is it its of on or that the "
+    "to was were will with this which who what when where how".split()
+)
+
+# Identifier values; keywords alone ("FIR case analysis") are fused with vector search
+_IDENTIFIER_PATTERNS = [
+    re.compile(r"\b(?:fir|ipc|crpc|ndps|u/s|a/c|acc(?:ount)?)\.?\s*(?:no\.?\s*)?\d+", re.I),  # IPC 302, FIR No. 45
+    re.compile(r"\bsection\s+\d+", re.I),
+    re.compile(r"\b\d+/\d+\b"),         # FIR 123/2020, case numbers
+    re.compile(r"\b\d{6,}\b"),          # account, phone, Aadhaar numbers
+    re.compile(r'^\s*".+"\s*$'),        # explicit exact-phrase search (e.g. a quoted name)
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id TEXT PRIMARY KEY,
+    source   TEXT,
+    text     TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    length   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source);
+CREATE TABLE IF NOT EXISTS postings (
+    term     TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    tf       INTEGER NOT NULL,
+    PRIMARY KEY (term, chunk_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings(chunk_id);
+CREATE TABLE IF NOT EXISTS stats (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats VALUES ('doc_count', 0), ('total_length', 0);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms.
+
+    Compound identifiers are kept whole and also split into their parts, so
+    "FIR No. 123/2020" yields "123/2020", "123" and "2020".
+
+    Args:
+        text: Input text
+
+    Returns:
+        List of terms (with repetitions)
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        if _SPLIT_RE.search(token):
+            terms.extend(part for part in _SPLIT_RE.split(token) if part)
+    return terms
+
+
+def is_identifier_query(query: str) -> bool:
+    """
+    Decide whether a query is best answered by exact term matching.
+
+    Args:
+        query: User query
+
+    Returns:
+        True when the query contains an identifier value (FIR/section/case/
+        account number) or is a quoted phrase; keywords alone ("FIR case
+        analysis") and capitalized words ("Risk Analysis") are not identifiers
+    """
+    if not query or len(query.split()) > 8:
+        return False
+    return any(p.search(query) for p in _IDENTIFIER_PATTERNS)
+
+
+def chunk_id_for(source: Optional[str], text: str) -> str:
+    """Deterministic chunk id from the source id and chunk content."""
+    digest = hashlib.sha1()
+    digest.update((source or "").encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def document_key(doc) -> str:
+    """Identity of a retrieved document across retrievers (content based)."""
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[Sequence], k: int = None, rrf_k: int = None) -> List:
+    """
+    Fuse ranked document lists with reciprocal-rank fusion.
+
+    Args:
+        result_lists: Ranked lists of documents, best first
+        k: Number of documents to return (default: all)
+        rrf_k: RRF damping constant (default: config.RRF_K)
+
+    Returns:
+        Fused list of documents, best first
+    """
+    rrf_k = rrf_k or config.RRF_K
+    scores: Dict[str, float] = {}
+    docs: Dict[str, object] = {}
+
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = document_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(key, doc)
+
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    if k is not None:
+        ordered = ordered[:k]
+    return [docs[key] for key in ordered]
+
+
+class LexicalIndex:
+    """BM25 inverted index for one user, persisted in SQLite."""
+
+    def __init__(self, user_id: str, directory: str = None):
+        """
+        Open (or create) the index of a user.
+
+        Args:
+            user_id: Owner of the indexed chunks
+            directory: Index directory (default: config.LEXICAL_INDEX_DIRECTORY)
+        """
+        self.user_id = str(user_id)
+        self.directory = directory or config.LEXICAL_INDEX_DIRECTORY
+        os.makedirs(self.directory, exist_ok=True)
+
+        safe_id = re.sub(r"[^a-zA-Z0-9._-]", "_", self.user_id).strip("_")[:120] or "default"
+        self.path = os.path.join(self.directory, f"{safe_id}.sqlite3")
+
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---------------------------------------------------------
+    # WRITE PATH
+    # ---------------------------------------------------------
+    def add_documents(self, documents: Iterable) -> int:
+        """
+        Index chunks; chunks already present are skipped.
+
+        Args:
+            documents: LangChain documents (metadata 'source' is used for filtering)
+
+        Returns:
+            Number of newly indexed chunks
+        """
+        added = 0
+        with self._write_lock, self._connect() as conn:
+            for doc in documents:
+                text = doc.page_content or ""
+                if not text.strip():
+                    continue
+                metadata = dict(doc.metadata or {})
+                source = metadata.get("source")
+                source = str(source) if source is not None else None
+                chunk_id = metadata.get("chunk_id") or chunk_id_for(source, text)
+
+                terms = Counter(tokenize(text))
+                length = sum(terms.values())
+
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO chunks VALUES (?, ?, ?, ?, ?)",
+                    (chunk_id, source, text, json.dumps(metadata, default=str), length),
+                )
+                if cur.rowcount == 0:
+                    continue
+
+                conn.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?)",
+                    [(term, chunk_id, tf) for term, tf in terms.items()],
+                )
+                conn.execute("UPDATE stats SET value = value + 1 WHERE key = 'doc_count'")
+                conn.execute(
+                    "UPDATE stats SET value = value + ? WHERE key = 'total_length'", (length,)
+                )
+                added += 1
+        return added
+
+    def delete_chunks(self, chunk_ids: Sequence[str]) -> int:
+        """
+        Remove chunks by id.
+
+        Args:
+            chunk_ids: Chunk ids to remove
+
+        Returns:
+            Number of removed chunks
+        """
+        removed = 0
+        with self._write_lock, self._connect() as conn:
+            for chunk_id in chunk_ids:
+                row = conn.execute(
+                    "SELECT length FROM chunks WHERE chunk_id = ?", (chunk_id,)
+                ).fetchone()
+                if not row:
+                    continue
+                conn.execute("DELETE FROM postings WHERE chunk_id = ?", (chunk_id,))
+                conn.execute("DELETE FROM chunks WHERE chunk_id = ?", (chunk_id,))
+                conn.execute("UPDATE stats SET value = value - 1 WHERE key = 'doc_count'")
+                conn.execute(
+                    "UPDATE stats SET value = value - ? WHERE key = 'total_length'", (row[0],)
+                )
+                removed += 1
+        return removed
+
+    def delete_source(self, source: str) -> int:
+        """
+        Remove every chunk of a source.
+
+        Args:
+            source: Source id as stored in chunk metadata
+
+        Returns:
+            Number of removed chunks
+        """
+        with self._connect() as conn:
+            chunk_ids = [
+                r[0] for r in conn.execute(
+                    "SELECT chunk_id FROM chunks WHERE source = ?", (str(source),)
+                )
+            ]
+        return self.delete_chunks(chunk_ids)
+
+    # ---------------------------------------------------------
+    # READ PATH
+    # ---------------------------------------------------------
+    def search_with_scores(
+        self,
+        query: str,
+        k: int = None,
+        source: Optional[str] = None,
+    ) -> List[Tuple[LCDocument, float]]:
+        """
+        BM25 search.
+
+        Args:
+            query: Query text
+            k: Number of results (default: config.RETRIEVAL_K)
+            source: Restrict results to one source
+
+        Returns:
+            List of (document, score) pairs, best first
+        """
+        k = k or config.RETRIEVAL_K
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        k1, b = config.BM25_K1, config.BM25_B
+        scores: Dict[str, float] = {}
+
+        with self._connect() as conn:
+            stats = dict(conn.execute("SELECT key, value FROM stats"))
+            n_docs = stats.get("doc_count", 0)
+            if n_docs <= 0:
+                return []
+            avgdl = max(stats.get("total_length", 0) / n_docs, 1.0)
+
+            for term in terms:
+                df = conn.execute(
+                    "SELECT COUNT(*) FROM postings WHERE term = ?", (term,)
+                ).fetchone()[0]
+                if not df:
+                    continue
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+                sql = (
+                    "SELECT p.chunk_id, p.tf, c.length FROM postings p "
+                    "JOIN chunks c ON c.chunk_id = p.chunk_id WHERE p.term = ?"
+                )
+                params = [term]
+                if source is not None:
+                    sql += " AND c.source = ?"
+                    params.append(str(source))
+
+                for chunk_id, tf, length in conn.execute(sql, params):
+                    norm = tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avgdl))
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * norm
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            if not top:
+                return []
+
+            placeholders = ",".join("?" * len(top))
+            rows = {
+                r[0]: r[1:] for r in conn.execute(
+                    f"SELECT chunk_id, text, metadata FROM chunks WHERE chunk_id IN ({placeholders})",
+                    [chunk_id for chunk_id, _ in top],
+                )
+            }
+
+        results = []
+        for chunk_id, score in top:
+            text, metadata = rows[chunk_id]
+            results.append((LCDocument(page_content=text, metadata=json.loads(metadata)), score))
+        return results
+
+    def search(self, query: str, k: int = None, source: Optional[str] = None) -> List[LCDocument]:
+        """BM25 search returning documents only."""
+        return [doc for doc, _ in self.search_with_scores(query, k=k, source=source)]
+
+    def document_frequencies(self, min_df: int = 1, limit: int = None) -> Tuple[int, Dict[str, int]]:
+        """
+        Chunk counts per term.
+
+        Args:
+            min_df: Skip terms in fewer chunks
+            limit: Keep only the most frequent terms
+
+        Returns:
+            (indexed chunks, {term: chunks containing it})
+        """
+        sql = "SELECT term, COUNT(*) AS df FROM postings GROUP BY term HAVING df >= ? ORDER BY df DESC"
+        params = [min_df]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            return self.size(), dict(conn.execute(sql, params))
+
+    def size(self) -> int:
+        """Number of indexed chunks."""
+        with self._connect() as conn:
+            return conn.execute("SELECT value FROM stats WHERE key = 'doc_count'").fetchone()[0]
+
+
+_indexes: Dict[str, LexicalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(user_id: str) -> LexicalIndex:
+    """Shared LexicalIndex instance for a user."""
+    key = str(user_id)
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = _indexes[key] = LexicalIndex(key)
+    return index
@@ -0,0 +1,376 @@
+"""
+LLM Clients Module
+
+Process-wide registry of LLM clients keyed by (backend, model, params),
+so chats, reports and agents share one client - and its keep-alive HTTP
+connection pool - instead of building a new one per request. The pools
+owned here (Ollama, OpenAI, raw requests sessions) are bounded (callers
+beyond LLM_HTTP_MAX_CONNECTIONS wait for a free connection); Hugging Face
+endpoints keep huggingface_hub's own keep-alive session, which is
+process-wide (model downloads use it too) and therefore left untouched.
+Every request is counted and timed per backend for llm_client_stats().
+
+Per-request callbacks (token streaming) are bound with
+llm.with_config(callbacks=...) on the shared client. Generation listeners
+(add_generation_listener) see every completed generation, e.g. the
+Ollama residency manager counting cold model loads.
+"""
+import os
+import sys
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.callbacks import BaseCallbackHandler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.embedding_batcher import Histogram
+
+
+BACKENDS = ("ollama", "openai", "huggingface")
+LATENCY_MS_BUCKETS = (100, 250, 500, 1000, 2000, 5000, 10000, 30000, 60000, 120000)
+
+
+# =========================================================
+# STATS
+# =========================================================
+class BackendStats:
+    """Request counters and latency histogram of one backend."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latency_ms = Histogram(LATENCY_MS_BUCKETS)
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+
+    def finished(self, seconds: float, error: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            self.errors += int(error)
+        self.latency_ms.observe(seconds * 1000.0)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            counters = {"requests": self.requests, "errors": self.errors, "in_flight": self.in_flight}
+        return {**counters, "latency_ms": self.latency_ms.snapshot()}
+
+
+# (backend, model, seconds, model load seconds or None) after each successful generation
+_listeners: List[Callable[[str, str, float, Optional[float]], None]] = []
+
+
+def add_generation_listener(listener: Callable[[str, str, float, Optional[float]], None]):
+    """Call listener(backend, model, seconds, load_seconds) after every successful generation."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def _notify(backend: str, model: str, seconds: float, load_seconds: Optional[float]):
+    for listener in list(_listeners):
+        try:
+            listener(backend, model, seconds, load_seconds)
+        except Exception as e:
+            print(f"⚠ Generation listener failed: {e}")
+
+
+def _load_seconds(response) -> Optional[float]:
+    """Model load time Ollama reports for a generation (None for other backends)."""
+    try:
+        generation = response.generations[0][0]
+    except (AttributeError, IndexError, TypeError):
+        return None
+    info = dict(getattr(generation, "generation_info", None) or {})
+    info.update(getattr(getattr(generation, "message", None), "response_metadata", None) or {})
+    load_duration = info.get("load_duration")
+    return load_duration / 1e9 if load_duration is not None else None
+
+
+class _StatsCallback(BaseCallbackHandler):
+    """Times each generation of a registry client (streamed or not)."""
+
+    def __init__(self, stats: BackendStats, backend: str, model: str):
+        self.stats = stats
+        self.backend = backend
+        self.model = model
+        self._started: Dict[object, float] = {}
+        self._lock = threading.Lock()
+
+    def _begin(self, run_id):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+        self.stats.started()
+
+    def _end(self, run_id, error: bool, response=None):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        self.stats.finished(seconds, error)
+        if not error:
+            _notify(self.backend, self.model, seconds, _load_seconds(response))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._begin(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._begin(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, False, response)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, True)
+
+
+# =========================================================
+# POOLED HTTP
+# =========================================================
+def _httpx_limits():
+    import httpx
+
+    return httpx.Limits(
+        max_connections=config.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.LLM_HTTP_MAX_CONNECTIONS,
+        keepalive_expiry=config.LLM_HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+def _httpx_client():
+    """Bounded keep-alive httpx client (OpenAI SDK)."""
+    import httpx
+
+    return httpx.Client(
+        timeout=httpx.Timeout(config.LLM_HTTP_TIMEOUT_SECONDS, connect=config.LLM_HTTP_CONNECT_TIMEOUT_SECONDS),
+        limits=_httpx_limits(),
+    )
+
+
+def _requests_session() -> requests.Session:
+    """Bounded keep-alive requests session (pool_block: callers wait for a connection)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=config.LLM_HTTP_MAX_CONNECTIONS,
+        pool_block=True,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# =========================================================
+# BUILDERS
+# =========================================================
+def _build_ollama(model: str, params: dict, callbacks: list, registry: "LLMClientRegistry"):
+    from langchain_ollama import ChatOllama
+
+    # ollama.Client passes these on to the httpx.Client it owns
+    client_kwargs = {"timeout": config.LLM_HTTP_TIMEOUT_SECONDS, "limits": _httpx_limits()}
+    return ChatOllama(
+        base_url=config.OLLAMA_BASE_URL,
+        model=model,
+        client_kwargs=client_kwargs,
+        callbacks=callbacks,
+        **params,
+    )
+
+
+def _build_openai(model: str, params: dict, callbacks: list, registry: "LLMClientRegistry"):
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        openai_api_key=config.OPENAI_API_KEY,
+        model_name=model,
+        http_client=registry.http_client("openai"),
+        callbacks=callbacks,
+        **params,
+    )
+
+
+def _build_huggingface(model: str, params: dict, callbacks: list, registry: "LLMClientRegistry"):
+    from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+
+    endpoint = HuggingFaceEndpoint(
+        repo_id=model,
+        huggingfacehub_api_token=config.HUGGINGFACE_API_TOKEN or None,
+        **params,
+    )
+    return ChatHuggingFace(llm=endpoint, callbacks=callbacks)
+
+
+_BUILDERS: Dict[str, Callable] = {
+    "ollama": _build_ollama,
+    "openai": _build_openai,
+    "huggingface": _build_huggingface,
+}
+
+
+# =========================================================
+# REGISTRY
+# =========================================================
+class LLMClientRegistry:
+    """Shared LLM clients keyed by (backend, model, params)."""
+
+    def __init__(self):
+        self._clients: Dict[Tuple, object] = {}
+        self._http: Dict[str, object] = {}
+        self._stats: Dict[str, BackendStats] = {backend: BackendStats() for backend in BACKENDS}
+        self._lock = threading.Lock()
+        self._counter_lock = threading.Lock()  # Not self._lock: that one is held while clients are built
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(backend: str, model: str, params: dict) -> Tuple:
+        return (backend, model, tuple(sorted(params.items())))
+
+    def get(self, backend: str, model: str, **params):
+        """
+        Shared client of a backend/model/params combination, built on first use.
+
+        Args:
+            backend: "ollama", "openai" or "huggingface"
+            model: Model name (Ollama tag, OpenAI model, HF repo id)
+            **params: Client parameters (temperature, streaming, ...); must be hashable
+
+        Raises:
+            ValueError: Unknown backend
+        """
+        if backend not in _BUILDERS:
+            raise ValueError(f"Unknown LLM backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+        key = self._key(backend, model, params)
+        client = self._clients.get(key)
+        if client is not None:
+            with self._counter_lock:
+                self.hits += 1
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            hit = client is not None
+            if not hit:
+                callbacks = [_StatsCallback(self._stats[backend], backend, model)]
+                client = _BUILDERS[backend](model, dict(params), callbacks, self)
+                self._clients[key] = client
+                print(f"✔ LLM client ready: {backend}/{model}")
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return client
+
+    def http_client(self, backend: str):
+        """Shared httpx client of a backend (only called by builders, under the registry lock)."""
+        client = self._http.get(backend)
+        if client is None:
+            client = self._http[backend] = _httpx_client()
+        return client
+
+    def session(self, backend: str) -> requests.Session:
+        """Shared requests session of a backend, for raw HTTP calls."""
+        key = f"{backend}:requests"
+        session = self._http.get(key)
+        if session is None:
+            with self._lock:
+                session = self._http.get(key)
+                if session is None:
+                    session = self._http[key] = _requests_session()
+        return session
+
+    def stats_for(self, backend: str) -> BackendStats:
+        return self._stats[backend]
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            clients = [f"{backend}/{model}" for backend, model, _ in self._clients]
+        with self._counter_lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "clients": len(clients),
+            "hits": hits,
+            "misses": misses,
+            "max_connections_per_backend": config.LLM_HTTP_MAX_CONNECTIONS,
+            "backends": {
+                backend: {**stats.snapshot(), "clients": sum(c.startswith(f"{backend}/") for c in clients)}
+                for backend, stats in self._stats.items()
+            },
+        }
+
+
+_registry: Optional[LLMClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_llm_registry() -> LLMClientRegistry:
+    """Shared LLMClientRegistry instance."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = LLMClientRegistry()
+    return _registry
+
+
+def get_llm(backend: str, model: str, callbacks: list = None, **params):
+    """
+    Shared LLM client, with per-request callbacks bound when given.
+
+    Args:
+        backend: "ollama", "openai" or "huggingface"
+        model: Model name
+        callbacks: Callbacks of this request only (e.g. a token streamer)
+        **params: Client parameters (part of the registry key)
+    """
+    llm = get_llm_registry().get(backend, model, **params)
+    return llm.with_config(callbacks=callbacks) if callbacks else llm
+
+
+def ollama_generate(prompt: str, model: str, **options) -> str:
+    """
+    Non-streaming /api/generate call over the shared Ollama session.
+
+    Args:
+        prompt: Full prompt
+        model: Ollama model tag
+        **options: Extra request fields (e.g. keep_alive="30m", options={"temperature": 0.2})
+
+    Raises:
+        requests.HTTPError: Ollama answered with an error status
+    """
+    registry = get_llm_registry()
+    stats = registry.stats_for("ollama")
+    stats.started()
+    t0 = time.perf_counter()
+    error = True
+    try:
+        response = registry.session("ollama").post(
+            f"{config.OLLAMA_BASE_URL}/api/generate",
+            json={"model": model, "prompt": prompt, "stream": False, **options},
+            timeout=(config.LLM_HTTP_CONNECT_TIMEOUT_SECONDS, config.LLM_HTTP_TIMEOUT_SECONDS),
+        )
+        response.raise_for_status()
+        payload = response.json()
+        error = False
+    finally:
+        seconds = time.perf_counter() - t0
+        stats.finished(seconds, error)
+
+    load_duration = payload.get("load_duration")
+    _notify("ollama", model, seconds, load_duration / 1e9 if load_duration is not None else None)
+    return payload["response"]
+
+
+def llm_client_stats() -> Dict[str, object]:
+    """Shared clients and per-backend request/latency stats."""
+    return get_llm_registry().stats()
@@ -0,0 +1,633 @@
+"""
+Local Vector Store Module
+
+In-process, disk-persisted vector store for air-gapped and on-prem
+deployments where MongoDB Atlas Vector Search is unavailable. It exposes the
+subset of the LangChain vector store API used by rag_engine
+(add_documents / similarity_search with a Mongo-style pre_filter) and
+searches with an IVF (inverted file) index built with NumPy.
+
+Vectors are partitioned by user_id, so the mandatory user filter costs
+nothing; the optional source filter is exact (brute force) for small
+sources and an IVF candidate mask for large ones.
+"""
+import os
+import re
+import sys
+import json
+import glob
+import uuid
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document as LCDocument
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.vector_quantization import QuantizedMatrix, rescore
+from src.embedding_cache import text_hash
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, k)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+def _parse_filter(pre_filter: Optional[dict]) -> Dict[str, str]:
+    """Reduce a Mongo-style {"field": {"$eq": v}} filter to {field: v}."""
+    parsed = {}
+    for field, condition in (pre_filter or {}).items():
+        if isinstance(condition, dict):
+            if "$eq" not in condition:
+                raise ValueError(f"Unsupported filter on '{field}': {condition}")
+            condition = condition["$eq"]
+        parsed[field] = str(condition)
+    return parsed
+
+
+# =========================================================
+# IVF INDEX
+# =========================================================
+class IVFIndex:
+    """
+    Inverted-file ANN index over unit vectors (cosine / inner product).
+
+    A spherical k-means coarse quantizer splits the vectors into nlist
+    cells; a query scans only the nprobe closest cells.
+    """
+
+    def __init__(self, nlist: int = None, nprobe: int = None):
+        self.nlist = nlist
+        self.nprobe = nprobe or config.LOCAL_VECTOR_NPROBE
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self._lists: Optional[List[np.ndarray]] = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray, iterations: int = 10, seed: int = 0):
+        """
+        Fit the coarse quantizer on (a sample of) the vectors.
+
+        Args:
+            vectors: Unit vectors, shape (n, d)
+            iterations: k-means iterations
+            seed: Random seed
+        """
+        n = len(vectors)
+        nlist = self.nlist or max(1, int(4 * np.sqrt(n)))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n, max(nlist * 32, 10000))
+        rows = rng.choice(n, sample_size, replace=False) if sample_size < n else np.arange(n)
+        sample = np.ascontiguousarray(vectors[rows], dtype=np.float32)
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+            centroids = _normalize_rows(sums)
+
+        self.nlist = nlist
+        self.centroids = centroids
+        self.assignments = self._nearest(vectors, centroids)
+        self._lists = None
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray, batch: int = 16384) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), batch):
+            block = np.asarray(vectors[start:start + batch], dtype=np.float32)
+            labels[start:start + batch] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    def add(self, vectors: np.ndarray):
+        """Assign newly appended vectors to their cells."""
+        if not self.is_trained or not len(vectors):
+            return
+        self.assignments = np.concatenate([self.assignments, self._nearest(vectors, self.centroids)])
+        self._lists = None
+
+    def _inverted_lists(self) -> List[np.ndarray]:
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.searchsorted(self.assignments[order], np.arange(self.nlist + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.nlist)]
+        return self._lists
+
+    def candidates(self, query: np.ndarray, nprobe: int = None) -> np.ndarray:
+        """Row ids stored in the nprobe cells closest to the query."""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        cells = _top_k(self.centroids @ query, nprobe)
+        lists = self._inverted_lists()
+        return np.concatenate([lists[c] for c in cells])
+
+    def save(self, path: str):
+        np.savez(path, centroids=self.centroids, assignments=self.assignments)
+
+    def load(self, path: str):
+        data = np.load(path)
+        self.centroids = data["centroids"]
+        self.assignments = data["assignments"].astype(np.int32)
+        self.nlist = len(self.centroids)
+        self._lists = None
+
+
+# =========================================================
+# PARTITION (ONE USER)
+# =========================================================
+class _Partition:
+    """
+    Vectors, records and IVF index of one user, persisted as shards.
+
+    With quantization enabled the full-precision shards stay memory-mapped
+    on disk and only the compact codes are held in RAM; they are used for
+    candidate scoring and the IVF, and the best candidates are rescored
+    from the mapped float32 rows.
+
+    The IVF is (re)trained in a background thread; searches keep using the
+    previous index (or exact search) until the new one is swapped in under
+    the store lock.
+    """
+
+    def __init__(self, directory: str, quantization: str = None, lock=None):
+        self.directory = directory
+        self._lock = lock or threading.RLock()  # The owning store's lock
+        os.makedirs(directory, exist_ok=True)
+
+        self.quantization = quantization or config.LOCAL_VECTOR_QUANTIZATION
+        self._shards: List[np.ndarray] = []
+        self._shard_starts: List[int] = []
+        self._compact_parts: List[QuantizedMatrix] = []
+        self._compact: Optional[QuantizedMatrix] = None
+        self._matrix: Optional[np.ndarray] = None
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[dict] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self._source_rows: Dict[str, List[int]] = {}
+        self._id_rows: Dict[str, int] = {}
+        self.index = IVFIndex()
+        self._indexed_size = 0
+        self._rebuilding = False
+        self._load()
+
+    # ---------------- persistence ----------------
+    def _shard_paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, "shard-*.npy")))
+
+    def _load(self):
+        for vec_path in self._shard_paths():
+            rec_path = vec_path[:-4] + ".jsonl"
+            if not os.path.exists(rec_path):
+                continue
+            with open(rec_path, "r", encoding="utf-8") as fh:
+                records = [json.loads(line) for line in fh if line.strip()]
+            vectors = np.load(vec_path, mmap_mode="r")
+            if len(vectors) != len(records):
+                print(f"⚠ Skipping inconsistent shard: {vec_path}")
+                continue
+            self._append(vectors, records, self._load_compact(vec_path[:-4], vectors))
+
+        deleted_path = os.path.join(self.directory, "deleted.json")
+        if os.path.exists(deleted_path):
+            with open(deleted_path, "r", encoding="utf-8") as fh:
+                for entry in json.load(fh):
+                    # Row numbers; older files stored document ids
+                    row = entry if isinstance(entry, int) else self._id_rows.get(entry)
+                    if row is not None and row < self.size:
+                        self.alive[row] = False
+
+        ivf_path = os.path.join(self.directory, "ivf.npz")
+        if os.path.exists(ivf_path) and self.size:
+            self.index.load(ivf_path)
+            indexed = len(self.index.assignments)
+            if indexed <= self.size:
+                self.index.add(self.search_matrix[indexed:])
+                self._indexed_size = indexed
+            else:
+                self.index = IVFIndex()
+
+    @property
+    def quantized(self) -> bool:
+        return self.quantization != "none"
+
+    def _load_compact(self, base: str, vectors: np.ndarray) -> Optional[QuantizedMatrix]:
+        if not self.quantized:
+            return None
+        path = f"{base}.{self.quantization}.npz"
+        if os.path.exists(path):
+            compact = QuantizedMatrix.load(path, self.quantization)
+            if len(compact) == len(vectors):
+                return compact
+        compact = QuantizedMatrix.from_float(vectors, self.quantization)
+        compact.save(path)
+        return compact
+
+    def _append(self, vectors: np.ndarray, records: List[dict], compact: Optional[QuantizedMatrix] = None):
+        start = len(self.ids)
+        self._shards.append(vectors)
+        self._shard_starts.append(start)
+        self._matrix = None
+        if self.quantized:
+            self._compact_parts.append(compact)
+            self._compact = None
+        for offset, record in enumerate(records):
+            row = start + offset
+            self.ids.append(record["id"])
+            self.texts.append(record["text"])
+            metadata = record.get("metadata", {})
+            self.metadatas.append(metadata)
+            self._id_rows[record["id"]] = row
+            source = metadata.get("source")
+            if source is not None:
+                self._source_rows.setdefault(str(source), []).append(row)
+        self.alive = np.concatenate([self.alive, np.ones(len(records), dtype=bool)])
+
+    def add(self, vectors: np.ndarray, records: List[dict]):
+        """Append vectors + records as a new shard on disk."""
+        shard_no = len(self._shard_paths())
+        base = os.path.join(self.directory, f"shard-{shard_no:06d}")
+        np.save(base + ".npy", vectors)
+        with open(base + ".jsonl", "w", encoding="utf-8") as fh:
+            for record in records:
+                fh.write(json.dumps(record, default=str) + "\n")
+
+        mapped = np.load(base + ".npy", mmap_mode="r")
+        self._append(mapped, records, self._load_compact(base, vectors))
+        if self.index.is_trained:
+            self.index.add(vectors)
+
+    def delete_rows(self, rows: Iterable[int]):
+        for row in rows:
+            self.alive[row] = False
+        # Row numbers, not ids: an id can be re-added after deletion
+        deleted = [int(r) for r in np.flatnonzero(~self.alive)]
+        with open(os.path.join(self.directory, "deleted.json"), "w", encoding="utf-8") as fh:
+            json.dump(deleted, fh)
+
+    # ---------------- search ----------------
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            if not self._shards:
+                self._matrix = np.zeros((0, 0), dtype=np.float32)
+            elif len(self._shards) == 1:
+                self._matrix = self._shards[0]
+            else:
+                self._matrix = np.concatenate(self._shards)
+        return self._matrix
+
+    @property
+    def search_matrix(self):
+        """Matrix used for candidate scoring and the IVF (compact when quantized)."""
+        if not self.quantized:
+            return self.matrix
+        if self._compact is None:
+            self._compact = QuantizedMatrix.concatenate(self._compact_parts)
+        return self._compact
+
+    def _full_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Full-precision rows gathered from the memory-mapped shards."""
+        starts = np.asarray(self._shard_starts)
+        shard_ids = np.searchsorted(starts, rows, side="right") - 1
+        out = np.empty((len(rows), self._shards[0].shape[1]), dtype=np.float32)
+        for shard_id in np.unique(shard_ids):
+            mask = shard_ids == shard_id
+            out[mask] = self._shards[shard_id][rows[mask] - starts[shard_id]]
+        return out
+
+    def maybe_rebuild_index(self):
+        """Train the IVF index in the background once the partition is large enough, retrain on doubling."""
+        if self._rebuilding or self.size < config.LOCAL_VECTOR_IVF_MIN_SIZE:
+            return
+        if self.index.is_trained and self.size < 2 * max(self._indexed_size, 1):
+            return
+        self._rebuilding = True
+        threading.Thread(
+            target=self._rebuild_index,
+            args=(self.search_matrix, self.size),
+            name="ivf-rebuild",
+            daemon=True,
+        ).start()
+
+    def _rebuild_index(self, vectors, size: int):
+        try:
+            index = IVFIndex()
+            index.train(vectors)  # k-means runs without the store lock
+            with self._lock:
+                index.add(self.search_matrix[size:])  # rows appended while training
+                self.index = index
+                self._indexed_size = size
+                index.save(os.path.join(self.directory, "ivf.npz"))
+            print(f"✔ IVF index rebuilt: {os.path.basename(self.directory)} ({size} vectors, {index.nlist} cells)")
+        except Exception as e:
+            print(f"⚠ IVF rebuild failed for {self.directory}: {e}")
+        finally:
+            self._rebuilding = False
+
+    def search(self, query: np.ndarray, k: int, source: Optional[str] = None) -> List[Tuple[int, float]]:
+        if not self.size:
+            return []
+
+        rows = None
+        if source is not None:
+            rows = np.asarray(self._source_rows.get(source, []), dtype=np.int64)
+            if not len(rows):
+                return []
+
+        use_ivf = self.index.is_trained and (
+            rows is None or len(rows) > config.LOCAL_VECTOR_BRUTE_FORCE_LIMIT
+        )
+
+        if use_ivf:
+            candidates = self.index.candidates(query)
+            if rows is not None:
+                candidates = candidates[np.isin(candidates, rows, assume_unique=True)]
+            candidates = candidates[self.alive[candidates]]
+            if len(candidates) < k:
+                use_ivf = False
+
+        if not use_ivf:
+            candidates = np.arange(self.size) if rows is None else rows
+            candidates = candidates[self.alive[candidates]]
+
+        if not len(candidates):
+            return []
+
+        if self.quantized:
+            approx = self.search_matrix.dot(query, candidates)
+            return rescore(
+                candidates, approx, query, self._full_rows, k,
+                config.LOCAL_VECTOR_RESCORE_FACTOR,
+            )
+
+        scores = np.asarray(self.matrix[candidates], dtype=np.float32) @ query
+        best = _top_k(scores, k)
+        return [(int(candidates[i]), float(scores[i])) for i in best]
+
+
+# =========================================================
+# VECTOR STORE
+# =========================================================
+class LocalVectorStore:
+    """
+    Drop-in local replacement for MongoDBAtlasVectorSearch in rag_engine.
+
+    Documents are partitioned by metadata 'user_id'; similarity search
+    requires a user_id pre-filter (like every rag_engine query) and accepts
+    an optional 'source' filter.
+    """
+
+    def __init__(self, embedding, directory: str = None):
+        """
+        Args:
+            embedding: LangChain embeddings (embed_documents / embed_query)
+            directory: Root directory (default: config.LOCAL_VECTOR_DIRECTORY)
+        """
+        self.embedding = embedding
+        self.directory = directory or config.LOCAL_VECTOR_DIRECTORY
+        os.makedirs(self.directory, exist_ok=True)
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.RLock()
+
+    def _partition(self, user_id: str) -> _Partition:
+        safe_id = re.sub(r"[^a-zA-Z0-9._-]", "_", str(user_id)).strip("_")[:120] or "default"
+        return self._open_partition(safe_id)
+
+    def _open_partition(self, name: str) -> _Partition:
+        # Keyed by directory name: user ids sanitizing to the same name share one partition
+        with self._lock:
+            partition = self._partitions.get(name)
+            if partition is None:
+                partition = _Partition(os.path.join(self.directory, name), lock=self._lock)
+                self._partitions[name] = partition
+            return partition
+
+    # ---------------------------------------------------------
+    # WRITE PATH
+    # ---------------------------------------------------------
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Sequence[dict],
+        ids: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        """
+        Store precomputed embeddings.
+
+        Args:
+            texts: Chunk texts
+            embeddings: One vector per text
+            metadatas: One metadata dict per text (must contain 'user_id')
+            ids: Optional document ids
+
+        Returns:
+            Stored document ids
+        """
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+
+        groups: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            user_id = metadata.get("user_id")
+            if user_id is None:
+                raise ValueError("LocalVectorStore requires 'user_id' in document metadata")
+            groups.setdefault(str(user_id), []).append(i)
+
+        with self._lock:
+            for user_id, positions in groups.items():
+                partition = self._partition(user_id)
+                records = [
+                    {"id": ids[i], "text": texts[i], "metadata": dict(metadatas[i])}
+                    for i in positions
+                ]
+                partition.add(vectors[positions], records)
+                partition.maybe_rebuild_index()
+        return ids
+
+    def add_documents(self, documents: Sequence[LCDocument], embeddings=None, ids=None) -> List[str]:
+        """Embed (unless embeddings are given) and store LangChain documents."""
+        documents = list(documents)
+        if not documents:
+            return []
+        texts = [d.page_content for d in documents]
+        if embeddings is None:
+            embeddings = self.embedding.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, [dict(d.metadata) for d in documents], ids)
+
+    def delete(self, ids: Optional[Sequence[str]] = None, pre_filter: Optional[dict] = None) -> int:
+        """
+        Delete documents by id and/or filter (without user_id every partition is scanned).
+
+        Args:
+            ids: Document ids to delete (within the filtered user, if given)
+            pre_filter: e.g. {"user_id": {"$eq": u}, "source": {"$eq": s}}
+
+        Returns:
+            Number of deleted documents
+        """
+        conditions = _parse_filter(pre_filter)
+        user_id = conditions.pop("user_id", None)
+        if user_id is None and ids is None and not conditions:
+            raise ValueError("LocalVectorStore.delete requires ids or a filter")
+
+        wanted = set(ids) if ids is not None else None
+        deleted = 0
+        with self._lock:
+            if user_id is not None:
+                partitions = [self._partition(user_id)]
+            else:
+                partitions = self._all_partitions()
+
+            for partition in partitions:
+                if wanted is not None:
+                    candidates = [partition._id_rows[i] for i in wanted if i in partition._id_rows]
+                else:
+                    candidates = np.flatnonzero(partition.alive)
+                rows = [
+                    row for row in candidates
+                    if partition.alive[row]
+                    and all(str(partition.metadatas[row].get(f)) == v for f, v in conditions.items())
+                ]
+                if rows:
+                    partition.delete_rows(rows)
+                    deleted += len(rows)
+        return deleted
+
+    def distinct(self, field: str, pre_filter: Optional[dict] = None) -> List[str]:
+        """
+        Distinct values of a metadata field among live documents matching a filter.
+
+        Args:
+            field: Metadata field (e.g. "source")
+            pre_filter: e.g. {"user_id": {"$eq": u}, "folder_id": {"$eq": f}}
+        """
+        conditions = _parse_filter(pre_filter)
+        user_id = conditions.pop("user_id", None)
+        values = set()
+        with self._lock:
+            partitions = [self._partition(user_id)] if user_id is not None else self._all_partitions()
+            for partition in partitions:
+                for row in np.flatnonzero(partition.alive):
+                    metadata = partition.metadatas[row]
+                    if field in metadata and all(str(metadata.get(f)) == v for f, v in conditions.items()):
+                        values.add(str(metadata[field]))
+        return sorted(values)
+
+    def _all_partitions(self) -> List[_Partition]:
+        for name in os.listdir(self.directory):
+            if os.path.isdir(os.path.join(self.directory, name)):
+                self._open_partition(name)
+        return list(self._partitions.values())
+
+    def compact_duplicates(self, keep_ids: Optional[Set[str]] = None) -> int:
+        """
+        Delete repeated chunks (same user, source and normalized text).
+
+        Args:
+            keep_ids: Ids to prefer as the surviving copy (e.g. manifest ids)
+
+        Returns:
+            Number of deleted duplicates
+        """
+        keep_ids = keep_ids or set()
+        deleted = 0
+        with self._lock:
+            for partition in self._all_partitions():
+                groups: Dict[tuple, List[int]] = {}
+                for row in np.flatnonzero(partition.alive):
+                    metadata = partition.metadatas[row]
+                    text = partition.texts[row] or f"pointer:{metadata.get('chunk_hash')}"
+                    key = (str(metadata.get("source")), text_hash(text))
+                    groups.setdefault(key, []).append(int(row))
+
+                doomed = []
+                for rows in groups.values():
+                    if len(rows) > 1:
+                        keep = next((r for r in rows if partition.ids[r] in keep_ids), rows[0])
+                        doomed.extend(r for r in rows if r != keep)
+                if doomed:
+                    partition.delete_rows(doomed)
+                    deleted += len(doomed)
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        """Partition count, live/deleted rows and bytes on disk."""
+        with self._lock:
+            partitions = self._all_partitions()
+            alive = sum(int(p.alive.sum()) for p in partitions)
+            rows = sum(p.size for p in partitions)
+        size_bytes = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(self.directory)
+            for name in files
+        )
+        return {"partitions": len(partitions), "alive": alive, "deleted": rows - alive, "bytes": size_bytes}
+
+    def persist(self):
+        """Shards are written on add; kept for API compatibility."""
+
+    # ---------------------------------------------------------
+    # READ PATH
+    # ---------------------------------------------------------
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: Sequence[float],
+        k: int = 4,
+        pre_filter: Optional[dict] = None,
+    ) -> List[Tuple[LCDocument, float]]:
+        conditions = _parse_filter(pre_filter)
+        user_id = conditions.pop("user_id", None)
+        if user_id is None:
+            raise ValueError("LocalVectorStore search requires a user_id pre_filter")
+        source = conditions.pop("source", None)
+        if conditions:
+            raise ValueError(f"Unsupported pre_filter fields: {sorted(conditions)}")
+
+        query = _normalize_rows(embedding)[0]
+        with self._lock:
+            partition = self._partition(user_id)
+            hits = partition.search(query, k, source=source)
+            return [
+                (
+                    LCDocument(page_content=partition.texts[row], metadata=dict(partition.metadatas[row])),
+                    score,
+                )
+                for row, score in hits
+            ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, pre_filter: Optional[dict] = None):
+        return self.similarity_search_by_vector_with_score(
+            self.embedding.embed_query(query), k=k, pre_filter=pre_filter
+        )
+
+    def similarity_search(self, query: str, k: int = 4, pre_filter: Optional[dict] = None) -> List[LCDocument]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, pre_filter=pre_filter)]
@@ -0,0 +1,335 @@
+"""
+Ollama Residency Module
+
+Keeps the configured Ollama models loaded so requests do not pay the
+model load after an idle period. A background worker (never a request)
+starts `ollama serve` when needed, pulls missing models, preloads every
+configured model with its keep_alive and then probes /api/ps on an
+interval. Models used often within the pin window are pinned (kept
+loaded indefinitely) until their traffic drops again.
+
+Requests only read the cached probe state, and every completed Ollama
+generation is reported through the LLM client registry, so cold starts
+(Ollama's load_duration above OLLAMA_COLD_START_SECONDS) are counted per
+model.
+"""
+import os
+import sys
+import time
+import subprocess
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional, Union
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.llm_clients import add_generation_listener, get_llm_registry
+
+
+# Probes failing this soon after `ollama serve` was launched do not count as "down"
+SERVE_STARTUP_GRACE_SECONDS = 30
+LOAD_TIMEOUT_SECONDS = 600  # Preloading a large model from disk
+PULL_TIMEOUT_SECONDS = 3600  # Downloading a model (multi-GB)
+
+
+def normalize_model(model: str) -> str:
+    """Ollama tag as /api/ps reports it ("llama3" -> "llama3:latest")."""
+    return model if ":" in model else f"{model}:latest"
+
+
+def keep_alive_value(value: str) -> Union[int, str]:
+    """Ollama keep_alive: plain numbers are seconds (-1 = forever), else a duration ("30m")."""
+    value = str(value).strip()
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _parse_keep_alive_map(spec: str) -> Dict[str, Union[int, str]]:
+    """"llama3=1h,mistral=10m" -> {model: keep_alive}."""
+    mapping = {}
+    for item in spec.split(","):
+        model, sep, value = item.partition("=")
+        if sep and model.strip() and value.strip():
+            mapping[normalize_model(model.strip())] = keep_alive_value(value)
+    return mapping
+
+
+class _ModelState:
+    __slots__ = ("keep_alive", "uses", "cold_starts", "warm_requests", "last_load_seconds",
+                 "resident", "expires_at", "pinned", "preloaded_at")
+
+    def __init__(self, keep_alive: Union[int, str]):
+        self.keep_alive = keep_alive
+        self.uses = deque()
+        self.cold_starts = 0
+        self.warm_requests = 0
+        self.last_load_seconds: Optional[float] = None
+        self.resident: Optional[bool] = None  # None = not probed yet
+        self.expires_at: Optional[str] = None
+        self.pinned = False
+        self.preloaded_at: Optional[float] = None
+
+
+class OllamaResidencyManager:
+    """Preloads, pins and probes Ollama models in a background thread."""
+
+    def __init__(self, models: Iterable[str] = None, probe_interval: float = None):
+        """
+        Args:
+            models: Models to keep warm (default: config.OLLAMA_PRELOAD_MODELS)
+            probe_interval: Seconds between /api/ps probes (default: config.OLLAMA_PROBE_INTERVAL_SECONDS)
+        """
+        models = config.OLLAMA_PRELOAD_MODELS if models is None else models
+        self.models = list(dict.fromkeys(normalize_model(m) for m in models))
+        self.probe_interval = probe_interval or config.OLLAMA_PROBE_INTERVAL_SECONDS
+        self.default_keep_alive = keep_alive_value(config.OLLAMA_KEEP_ALIVE)
+        self.pinned_keep_alive = keep_alive_value(config.OLLAMA_PINNED_KEEP_ALIVE)
+        self._keep_alive_overrides = _parse_keep_alive_map(config.OLLAMA_MODEL_KEEP_ALIVE)
+
+        self._states: Dict[str, _ModelState] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.reachable: Optional[bool] = None  # None = not probed yet
+        self.last_probe: Optional[float] = None
+        self._serve_started_at: Optional[float] = None
+        self._serve_failed = False  # `ollama serve` could not be launched; not retried
+
+        for model in self.models:
+            self._state(model)
+        add_generation_listener(self.record_generation)
+
+    def _state(self, model: str) -> _ModelState:
+        model = normalize_model(model)
+        state = self._states.get(model)
+        if state is None:
+            with self._lock:
+                state = self._states.get(model)
+                if state is None:
+                    state = self._states[model] = _ModelState(self.keep_alive(model))
+        return state
+
+    def keep_alive(self, model: str) -> Union[int, str]:
+        """Configured keep_alive of a model; send it with every request to that model."""
+        return self._keep_alive_overrides.get(normalize_model(model), self.default_keep_alive)
+
+    # ---------------------------------------------------------
+    # REQUEST PATH (non-blocking)
+    # ---------------------------------------------------------
+    def is_resident(self, model: str) -> Optional[bool]:
+        """Whether the model was loaded at the last probe (None = unknown); never blocks."""
+        state = self._states.get(normalize_model(model))
+        return state.resident if state else None
+
+    def unreachable(self) -> bool:
+        """Server known to be down (probed, and not just launched)."""
+        if self.reachable is not False:
+            return False
+        started = self._serve_started_at
+        return started is None or time.monotonic() - started > SERVE_STARTUP_GRACE_SECONDS
+
+    def record_generation(self, backend: str, model: str, seconds: float, load_seconds: Optional[float]):
+        """Generation listener: counts uses and cold starts of Ollama models."""
+        if backend != "ollama":
+            return
+        state = self._state(model)
+        now = time.monotonic()
+        with self._lock:
+            state.uses.append(now)
+            if load_seconds is not None and load_seconds >= config.OLLAMA_COLD_START_SECONDS:
+                state.cold_starts += 1
+                state.last_load_seconds = load_seconds
+                state.resident = True
+                print(f"⚠ Ollama cold start: {model} took {load_seconds:.1f}s to load")
+            else:
+                state.warm_requests += 1
+
+    # ---------------------------------------------------------
+    # OLLAMA API
+    # ---------------------------------------------------------
+    def _session(self):
+        return get_llm_registry().session("ollama")
+
+    def _get(self, path: str) -> dict:
+        response = self._session().get(
+            f"{config.OLLAMA_BASE_URL}{path}", timeout=config.LLM_HTTP_CONNECT_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _load(self, model: str, keep_alive: Union[int, str]) -> float:
+        """Load a model (no-op if loaded) and set its keep_alive; returns seconds taken."""
+        t0 = time.perf_counter()
+        response = self._session().post(
+            f"{config.OLLAMA_BASE_URL}/api/generate",
+            json={"model": model, "keep_alive": keep_alive},
+            timeout=(config.LLM_HTTP_CONNECT_TIMEOUT_SECONDS, LOAD_TIMEOUT_SECONDS),
+        )
+        response.raise_for_status()
+        return time.perf_counter() - t0
+
+    def _ensure_server(self) -> bool:
+        try:
+            self._get("/api/version")
+            return True
+        except Exception:
+            pass
+        if config.OLLAMA_AUTOSTART and self._serve_started_at is None and not self._serve_failed:
+            print("⧗ Starting Ollama server...")
+            try:
+                subprocess.Popen(["ollama", "serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                self._serve_started_at = time.monotonic()
+            except Exception as e:
+                # e.g. no `ollama` binary: keep probing for an external server, but do not relaunch
+                self._serve_failed = True
+                print(f"❌ Could not start Ollama (not retried): {e}")
+        return False
+
+    def _ensure_pulled(self):
+        if not config.OLLAMA_AUTO_PULL:
+            return
+        available = {normalize_model(m.get("name", "")) for m in self._get("/api/tags").get("models", [])}
+        for model in self.models:
+            if model in available:
+                continue
+            print(f"⬇ Pulling Ollama model: {model}")
+            try:
+                self._session().post(
+                    f"{config.OLLAMA_BASE_URL}/api/pull",
+                    json={"model": model, "stream": False},
+                    timeout=(config.LLM_HTTP_CONNECT_TIMEOUT_SECONDS, PULL_TIMEOUT_SECONDS),
+                ).raise_for_status()
+            except Exception as e:
+                print(f"⚠ Pulling {model} failed: {e}")
+
+    def preload(self):
+        """Load every configured model with its keep_alive."""
+        for model in self.models:
+            try:
+                seconds = self._load(model, self.keep_alive(model))
+                self._state(model).preloaded_at = time.time()
+                print(f"✔ Ollama model warm: {model} ({seconds:.1f}s, keep_alive={self.keep_alive(model)})")
+            except Exception as e:
+                print(f"⚠ Preloading {model} failed: {e}")
+
+    def probe(self) -> bool:
+        """Refresh residency from /api/ps; returns whether the server answered."""
+        try:
+            running = {normalize_model(m.get("name", "")): m for m in self._get("/api/ps").get("models", [])}
+        except Exception:
+            self.reachable = False
+            return False
+
+        self.reachable = True
+        self.last_probe = time.time()
+        for model in set(running) | set(self._states):
+            state = self._state(model)
+            entry = running.get(model)
+            state.resident = entry is not None
+            state.expires_at = entry.get("expires_at") if entry else None
+        return True
+
+    def _update_pins(self):
+        """Pin models used often in the window; hand unpinned ones their normal keep_alive back."""
+        cutoff = time.monotonic() - config.OLLAMA_PIN_WINDOW_SECONDS
+        for model, state in list(self._states.items()):
+            with self._lock:
+                while state.uses and state.uses[0] < cutoff:
+                    state.uses.popleft()
+                should_pin = len(state.uses) >= config.OLLAMA_PIN_MIN_REQUESTS > 0
+                changed = should_pin != state.pinned
+                state.pinned = should_pin
+            try:
+                if should_pin:
+                    # Re-sent every tick: requests reset keep_alive to the model's default
+                    self._load(model, self.pinned_keep_alive)
+                elif changed:
+                    self._load(model, state.keep_alive)
+            except Exception as e:
+                print(f"⚠ Updating keep_alive of {model} failed: {e}")
+                continue
+            if changed:
+                print(f"{'✔ Pinned' if should_pin else '⏭ Unpinned'} Ollama model {model}")
+
+    # ---------------------------------------------------------
+    # WORKER
+    # ---------------------------------------------------------
+    def _run(self):
+        while not self._stop.is_set() and not self._ensure_server():
+            self.probe()
+            # Poll fast while a launched server starts up, at the probe interval otherwise
+            self._stop.wait(self.probe_interval if self._serve_failed else min(self.probe_interval, 5))
+        if self._stop.is_set():
+            return
+
+        try:
+            self._ensure_pulled()
+        except Exception as e:
+            print(f"⚠ Ollama model check failed: {e}")
+        self.preload()
+
+        while not self._stop.is_set():
+            if self.probe():
+                self._update_pins()
+            self._stop.wait(self.probe_interval)
+
+    def start(self) -> bool:
+        """Start the background worker once; returns False if it was already running."""
+        if self._thread is not None:
+            return False
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(target=self._run, name="ollama-residency", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            models = {
+                model: {
+                    "resident": state.resident,
+                    "expires_at": state.expires_at,
+                    "keep_alive": self.pinned_keep_alive if state.pinned else state.keep_alive,
+                    "pinned": state.pinned,
+                    "recent_requests": len(state.uses),
+                    "cold_starts": state.cold_starts,
+                    "warm_requests": state.warm_requests,
+                    "last_load_seconds": round(state.last_load_seconds, 3) if state.last_load_seconds else None,
+                    "preloaded_at": state.preloaded_at,
+                }
+                for model, state in self._states.items()
+            }
+        return {
+            "reachable": self.reachable,
+            "last_probe": self.last_probe,
+            "probe_interval_seconds": self.probe_interval,
+            "cold_starts": sum(m["cold_starts"] for m in models.values()),
+            "models": models,
+        }
+
+
+_manager: Optional[OllamaResidencyManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_ollama_residency() -> OllamaResidencyManager:
+    """Shared OllamaResidencyManager instance."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = OllamaResidencyManager()
+    return _manager
+
+
+def start_ollama_residency() -> OllamaResidencyManager:
+    """Start serving/pulling/preloading/probing in the background (idempotent)."""
+    manager = get_ollama_residency()
+    manager.start()
+    return manager
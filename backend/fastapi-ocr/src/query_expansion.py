@@ -0,0 +1,439 @@
+"""
+Query Expansion Module
+
+Multi-query expansion without an LLM round trip. Modes (per request):
+- "llm":       paraphrases from the chat LLM (the caller's prompt)
+- "prf":       pseudo-relevance feedback: the query plus the top terms of
+               its first-pass hits
+- "neighbors": query terms swapped for their nearest neighbours in a
+               precomputed term vocabulary (embedding space)
+- "aliases":   entity names swapped for their aliases from an alias table
+- "local":     aliases + prf + neighbors, interleaved
+- "none":      the question only
+
+Expansion latency is recorded per mode, so LLM and LLM-free expansion can
+be compared on live traffic (stats()).
+
+Usage:
+    python -m src.query_expansion build-vocabulary
+    python -m src.query_expansion add-alias "Ramesh Kumar" "Ramu" "R. Kumar"
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+from collections import Counter
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.embedding_backend import encode_texts
+from src.embedding_batcher import Histogram
+from src.lexical_index import LexicalIndex, tokenize
+
+
+EXPANSION_MODES = ("none", "llm", "prf", "neighbors", "aliases", "local")
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_DIGIT_RE = re.compile(r"\d")
+
+
+def resolve_mode(mode: Optional[str], use_multi_query: bool = True) -> str:
+    """
+    Expansion mode of a request.
+
+    Args:
+        mode: Requested mode (None: config.QUERY_EXPANSION_MODE if multi-query is on)
+        use_multi_query: Legacy multi-query flag
+
+    Raises:
+        ValueError: Unknown mode
+    """
+    if not mode:
+        mode = config.QUERY_EXPANSION_MODE if use_multi_query else "none"
+    mode = mode.lower()
+    if mode not in EXPANSION_MODES:
+        raise ValueError(f"Unknown expansion mode '{mode}' (expected one of {EXPANSION_MODES})")
+    return mode
+
+
+def _replace_term(query: str, term: str, replacement: str) -> str:
+    return re.sub(rf"(?<!\w){re.escape(term)}(?!\w)", replacement, query, flags=re.I)
+
+
+# =========================================================
+# PSEUDO-RELEVANCE FEEDBACK
+# =========================================================
+def prf_terms(
+    query: str,
+    docs: Sequence,
+    n_terms: int = None,
+    n_docs: int = None,
+    idf: Callable[[str], float] = None,
+) -> List[str]:
+    """
+    Top terms of first-pass hits that the query does not contain.
+
+    Terms are weighted by their share of each hit, the hit's rank and
+    (when given) their corpus IDF.
+
+    Args:
+        query: Original query
+        docs: First-pass documents, best first
+        n_terms: Terms to return (default: config.PRF_TERMS)
+        n_docs: Hits to read (default: config.PRF_FEEDBACK_DOCS)
+        idf: term -> IDF weight
+    """
+    n_terms = n_terms or config.PRF_TERMS
+    n_docs = n_docs or config.PRF_FEEDBACK_DOCS
+    query_terms = set(tokenize(query))
+
+    scores: Counter = Counter()
+    for rank, doc in enumerate(list(docs)[:n_docs]):
+        terms = Counter(t for t in tokenize(getattr(doc, "page_content", "") or "") if len(t) > 2)
+        length = sum(terms.values())
+        for term, tf in terms.items():
+            if term not in query_terms:
+                scores[term] += tf / length / (rank + 1)
+
+    if idf is not None:
+        for term in scores:
+            scores[term] *= idf(term)
+    return [term for term, _ in scores.most_common(n_terms)]
+
+
+# =========================================================
+# TERM VOCABULARY (EMBEDDING NEIGHBOURS)
+# =========================================================
+class TermVocabulary:
+    """Corpus terms with document frequencies and unit-norm embeddings."""
+
+    def __init__(self, terms: Sequence[str], vectors: np.ndarray, df: Sequence[int], n_docs: int, model_name: str):
+        self.terms = list(terms)
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.df = dict(zip(self.terms, (int(d) for d in df)))
+        self.n_docs = int(n_docs)
+        self.model_name = model_name
+        self._rows = {term: i for i, term in enumerate(self.terms)}
+
+    @classmethod
+    def build(cls, term_df: Dict[str, int], n_docs: int, model_name: str = None, max_terms: int = None) -> "TermVocabulary":
+        """
+        Embed the most frequent terms of a corpus.
+
+        Args:
+            term_df: term -> documents containing it
+            n_docs: Documents in the corpus
+            model_name: Embedding model (default: config.HUGGINGFACE_EMBEDDING_MODEL)
+            max_terms: Terms kept (default: config.QUERY_VOCAB_MAX_TERMS)
+        """
+        model_name = model_name or config.HUGGINGFACE_EMBEDDING_MODEL
+        max_terms = max_terms or config.QUERY_VOCAB_MAX_TERMS
+        # Identifiers have no meaningful neighbours; they stay exact
+        ranked = sorted(
+            ((t, d) for t, d in term_df.items() if len(t) > 2 and not _DIGIT_RE.search(t)),
+            key=lambda item: -item[1],
+        )[:max_terms]
+        terms = [t for t, _ in ranked]
+        vectors = encode_texts(terms, model_name, normalize=True) if terms else np.zeros((0, 0), np.float32)
+        return cls(terms, vectors, [d for _, d in ranked], n_docs, model_name)
+
+    @classmethod
+    def from_lexical_indexes(cls, directory: str = None, min_df: int = 2, **kwargs) -> "TermVocabulary":
+        """Vocabulary of every user's lexical index (document frequencies summed)."""
+        directory = directory or config.LEXICAL_INDEX_DIRECTORY
+        term_df: Counter = Counter()
+        n_docs = 0
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            if not name.endswith(".sqlite3"):
+                continue
+            size, df = LexicalIndex(name[:-len(".sqlite3")], directory).document_frequencies(min_df=min_df)
+            n_docs += size
+            term_df.update(df)
+        return cls.build(term_df, n_docs, **kwargs)
+
+    def save(self, path: str = None):
+        path = path or config.QUERY_VOCAB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp.npz"
+        np.savez(
+            tmp,
+            terms=np.array(self.terms, dtype=str),
+            vectors=self.vectors,
+            df=np.array([self.df[t] for t in self.terms], dtype=np.int64),
+            meta=np.array([json.dumps({"n_docs": self.n_docs, "model_name": self.model_name})]),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = None) -> Optional["TermVocabulary"]:
+        """Saved vocabulary, or None if there is none."""
+        path = path or config.QUERY_VOCAB_PATH
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"][0]))
+            return cls(data["terms"].tolist(), data["vectors"], data["df"].tolist(), meta["n_docs"], meta["model_name"])
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def idf(self, term: str) -> float:
+        df = self.df.get(term, 0)
+        return math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def neighbors(self, terms: Sequence[str], n: int = None, min_similarity: float = None) -> Dict[str, List[str]]:
+        """
+        Nearest vocabulary terms of each term (one embedding call for unknown terms).
+
+        Args:
+            terms: Query terms
+            n: Neighbours per term (default: config.QUERY_NEIGHBORS)
+            min_similarity: Cosine cut-off (default: config.QUERY_NEIGHBOR_MIN_SIMILARITY)
+        """
+        n = n or config.QUERY_NEIGHBORS
+        min_similarity = config.QUERY_NEIGHBOR_MIN_SIMILARITY if min_similarity is None else min_similarity
+        terms = [t for t in dict.fromkeys(terms) if len(t) > 2 and not _DIGIT_RE.search(t)]
+        if not terms or not self.terms:
+            return {}
+
+        unknown = [t for t in terms if t not in self._rows]
+        encoded = dict(zip(unknown, encode_texts(unknown, self.model_name, normalize=True))) if unknown else {}
+        queries = np.stack([self.vectors[self._rows[t]] if t in self._rows else encoded[t] for t in terms])
+
+        similarities = queries @ self.vectors.T
+        found = {}
+        for i, term in enumerate(terms):
+            order = np.argsort(-similarities[i])[:n + 1]
+            close = [
+                self.terms[j] for j in order
+                if self.terms[j] != term and similarities[i, j] >= min_similarity
+            ][:n]
+            if close:
+                found[term] = close
+        return found
+
+
+# =========================================================
+# ENTITY ALIASES
+# =========================================================
+class AliasTable:
+    """JSON-backed canonical name -> aliases; every name expands to the others."""
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: JSON file (default: config.ENTITY_ALIASES_PATH)
+        """
+        self.path = path or config.ENTITY_ALIASES_PATH
+        self._lock = threading.Lock()
+        self.table: Dict[str, List[str]] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.table = json.load(f)
+        self._index()
+
+    def _index(self):
+        groups: Dict[str, List[str]] = {}
+        for canonical, aliases in self.table.items():
+            names = list(dict.fromkeys([canonical, *aliases]))
+            for name in names:
+                groups[name.lower()] = names
+        self._groups = groups
+        # Longest names first so "Ramesh Kumar" wins over "Kumar"
+        self._pattern = re.compile(
+            "|".join(rf"(?<!\w){re.escape(name)}(?!\w)" for name in sorted(groups, key=len, reverse=True)),
+            re.I,
+        ) if groups else None
+
+    def add(self, canonical: str, aliases: Sequence[str]):
+        """Add aliases of a name and save the table."""
+        with self._lock:
+            self.table[canonical] = list(dict.fromkeys([*self.table.get(canonical, []), *aliases]))
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.table, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+            self._index()
+
+    def variants(self, query: str, limit: int = None) -> List[str]:
+        """The query with each known name replaced by its other names."""
+        limit = limit or config.QUERY_EXPANSION_MAX_QUERIES
+        if self._pattern is None:
+            return []
+        variants = []
+        for match in self._pattern.finditer(query):
+            for name in self._groups[match.group(0).lower()]:
+                if name.lower() != match.group(0).lower():
+                    variants.append(query[:match.start()] + name + query[match.end():])
+                if len(variants) >= limit:
+                    return variants
+        return variants
+
+
+# =========================================================
+# EXPANDER
+# =========================================================
+class QueryExpander:
+    """Expands a query in the requested mode and records per-mode latency."""
+
+    def __init__(self, vocabulary: Optional[TermVocabulary] = None, aliases: Optional[AliasTable] = None):
+        """
+        Args:
+            vocabulary: Term vocabulary (default: loaded from config.QUERY_VOCAB_PATH if present)
+            aliases: Alias table (default: config.ENTITY_ALIASES_PATH)
+        """
+        self.vocabulary = vocabulary if vocabulary is not None else TermVocabulary.load()
+        self.aliases = aliases or AliasTable()
+        self.latency_ms = {mode: Histogram(LATENCY_BUCKETS_MS) for mode in EXPANSION_MODES}
+
+    def _neighbor_variants(self, query: str, limit: int) -> List[str]:
+        if self.vocabulary is None:
+            return []
+        variants = []
+        for term, close in self.vocabulary.neighbors(tokenize(query)).items():
+            variants.append(_replace_term(query, term, close[0]))
+            if len(variants) >= limit:
+                break
+        return variants
+
+    def _prf_query(self, query: str, first_pass_docs: Sequence) -> List[str]:
+        idf = self.vocabulary.idf if self.vocabulary is not None else None
+        terms = prf_terms(query, first_pass_docs or [], idf=idf)
+        return [f"{query} {' '.join(terms)}"] if terms else []
+
+    def expand(
+        self,
+        query: str,
+        mode: str,
+        first_pass_docs: Sequence = None,
+        llm_expand: Callable[[str], List[str]] = None,
+    ) -> List[str]:
+        """
+        Query variants, the original query first.
+
+        Args:
+            query: User query
+            mode: One of EXPANSION_MODES
+            first_pass_docs: Hits of the original query ("prf" / "local")
+            llm_expand: query -> LLM paraphrases ("llm")
+        """
+        limit = config.QUERY_EXPANSION_MAX_QUERIES
+        t0 = time.perf_counter()
+
+        if mode == "llm":
+            expansions = llm_expand(query) if llm_expand else []
+        else:
+            sources = []
+            if mode in ("aliases", "local"):
+                sources.append(self.aliases.variants(query, limit))
+            if mode in ("prf", "local"):
+                sources.append(self._prf_query(query, first_pass_docs))
+            if mode in ("neighbors", "local"):
+                sources.append(self._neighbor_variants(query, limit))
+            # Interleaved, so "local" keeps a variant of every kind within the limit
+            expansions = [q for group in zip_longest(*sources) for q in group if q]
+
+        self.latency_ms[mode].observe((time.perf_counter() - t0) * 1000.0)
+        variants = [q for q in dict.fromkeys(expansions) if q and q != query]
+        return [query] + variants[:limit]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "vocabulary_terms": len(self.vocabulary) if self.vocabulary is not None else 0,
+            "aliases": len(self.aliases.table),
+            "latency_ms": {mode: h.snapshot() for mode, h in self.latency_ms.items() if h.count},
+        }
+
+
+def retrieve_expanded(
+    query: str,
+    retrieve: Callable[[str], List],
+    mode: str,
+    llm_expand: Callable[[str], List[str]] = None,
+    expander: QueryExpander = None,
+) -> Tuple[List[str], List[List]]:
+    """
+    Retrieve for a query and its expansions, in parallel.
+
+    LLM-free modes retrieve the original query first and reuse its hits as
+    feedback, so only the variants cost extra searches.
+
+    Args:
+        query: User query
+        retrieve: query -> documents
+        mode: One of EXPANSION_MODES
+        llm_expand: query -> LLM paraphrases ("llm")
+        expander: Expander (default: the shared one)
+
+    Returns:
+        (queries, one result list per query)
+    """
+    if mode == "none":
+        return [query], [retrieve(query)]
+
+    expander = expander or get_query_expander()
+    if mode == "llm":
+        queries = expander.expand(query, mode, llm_expand=llm_expand)
+        with ThreadPoolExecutor() as executor:
+            return queries, list(executor.map(retrieve, queries))
+
+    first = retrieve(query)
+    queries = expander.expand(query, mode, first_pass_docs=first)
+    if len(queries) == 1:
+        return queries, [first]
+    with ThreadPoolExecutor() as executor:
+        return queries, [first] + list(executor.map(retrieve, queries[1:]))
+
+
+_expander: Optional[QueryExpander] = None
+_expander_lock = threading.Lock()
+
+
+def get_query_expander() -> QueryExpander:
+    """Shared QueryExpander instance."""
+    global _expander
+    if _expander is None:
+        with _expander_lock:
+            if _expander is None:
+                _expander = QueryExpander()
+    return _expander
+
+
+def rebuild_vocabulary(directory: str = None) -> int:
+    """Rebuild the term vocabulary from the lexical indexes and swap it in."""
+    vocabulary = TermVocabulary.from_lexical_indexes(directory)
+    vocabulary.save()
+    get_query_expander().vocabulary = vocabulary
+    print(f"✔ Query vocabulary: {len(vocabulary):,} terms from {vocabulary.n_docs:,} chunks")
+    return len(vocabulary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build-vocabulary", help="embed the lexical index vocabulary")
+    build.add_argument("--directory", default=None, help="lexical index directory")
+    alias = commands.add_parser("add-alias", help="add aliases of an entity name")
+    alias.add_argument("canonical")
+    alias.add_argument("aliases", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build-vocabulary":
+        rebuild_vocabulary(args.directory)
+    else:
+        AliasTable().add(args.canonical, args.aliases)
+        print(f"✔ {args.canonical}: {', '.join(args.aliases)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,13 @@ import sys
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnableParallel, RunnablePassthrough, RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
-from langchain_huggingface.llms import HuggingFaceEndpoint
-from langchain_huggingface import ChatHuggingFace
 
 # Add parent directory to path for config import
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from src.context_packer import pack_context
+from src.llm_clients import get_llm
+from src.query_expansion import resolve_mode, retrieve_expanded
 
 
 class RAGChain:
@@ -24,6 +25,7 @@ class RAGChain:
         answer_tone: str = "neutral",
         answer_style: str = "auto",
         use_multi_query: bool = False,
+        expansion_mode: str = None,
     ):
         """
         Initialize RAG chain with configuration.
@@ -34,29 +36,30 @@ class RAGChain:
             answer_tone: Desired tone (e.g. 'neutral', 'teacher', 'friendly')
             answer_style: Answer style (e.g. 'auto', 'concise', 'detailed')
             use_multi_query: Whether to use multi-query expansion for retrieval
+            expansion_mode: Expansion mode ("llm", "prf", "neighbors", "aliases", "local", "none");
+                defaults to config.QUERY_EXPANSION_MODE when use_multi_query is set
         """
         self.retriever = retriever
         self.answer_language = answer_language
         self.answer_tone = answer_tone
         self.answer_style = answer_style
         self.use_multi_query = use_multi_query
+        self.expansion_mode = resolve_mode(expansion_mode, use_multi_query)
 
         self.llm = self._initialize_llm()
         self.chain = self._build_chain()
     
     def _initialize_llm(self):
-        """Initialize the HuggingFace LLM."""
+        """Shared HuggingFace LLM client (src/llm_clients.py)."""
         if not config.HUGGINGFACE_API_TOKEN:
             raise ValueError("HUGGINGFACE_API_TOKEN not found in environment variables")
-        
-        llm_endpoint = HuggingFaceEndpoint(
-            repo_id=config.HUGGINGFACE_LLM_MODEL,
-            huggingfacehub_api_token=config.HUGGINGFACE_API_TOKEN,
+
+        return get_llm(
+            "huggingface",
+            config.HUGGINGFACE_LLM_MODEL,
             temperature=config.LLM_TEMPERATURE,
             max_new_tokens=config.LLM_MAX_NEW_TOKENS,
         )
-        
-        return ChatHuggingFace(llm=llm_endpoint)
     
     def _build_chain(self):
         """Build the RAG chain (LLM + prompt). Retrieval is handled explicitly per query."""
@@ -88,7 +91,7 @@ class RAGChain:
 
     @staticmethod
     def _format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
+        return pack_context(docs, model=config.HUGGINGFACE_LLM_MODEL)
 
     def _expand_queries(self, question: str):
         """Generate multiple related queries for better retrieval coverage."""
@@ -131,24 +134,23 @@ class RAGChain:
 
     def _get_relevant_docs(self, question: str):
         """Retrieve relevant documents, optionally using multi-query expansion."""
-        if not self.use_multi_query:
+        if self.expansion_mode == "none":
             return self._call_retriever(question)
 
-        # Multi-query expansion
-        queries = self._expand_queries(question)
-        all_docs = []
-        seen_contents = set()
-
-        for q in queries:
+        def retrieve(q):
             try:
                 docs = self._call_retriever(q)
             except Exception:
-                continue
-
+                return []
             # Ensure we always iterate over a list
-            if not isinstance(docs, list):
-                docs = [docs]
+            return docs if isinstance(docs, list) else [docs]
+
+        # Multi-query expansion
+        _, results = retrieve_expanded(question, retrieve, self.expansion_mode, llm_expand=self._expand_queries)
+        all_docs = []
+        seen_contents = set()
 
+        for docs in results:
             for doc in docs:
                 content = getattr(doc, "page_content", "")
                 if content and content not in seen_contents:
@@ -0,0 +1,149 @@
+"""
+Shard Migration Module
+
+One-time tool that splits the legacy global Chroma collection into the
+per-context shards of src/vector_shards.py. Stored embeddings are copied
+as they are (no re-embedding), chunk manifest records move with their
+chunks, and every migrated context is recorded in the shard catalog.
+Upserts make the migration safe to re-run after an interruption.
+
+Usage:
+    python -m src.shard_migration --dry-run
+    python -m src.shard_migration --drop-global
+"""
+import os
+import sys
+import time
+import argparse
+from typing import Dict, Optional
+
+import chromadb
+from chromadb.config import Settings
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.chunk_manifest import get_chunk_manifest
+from src.vector_shards import get_shard_catalog, global_collection_name
+from src.vector_store import safe_context_id
+
+
+def _row_context(metadata: Optional[dict], default_context: str) -> str:
+    metadata = metadata or {}
+    # Folder documents carry no video_id; they were written under the db-name context
+    return safe_context_id(str(metadata.get("context_id") or metadata.get("video_id") or default_context))
+
+
+def migrate_global_collection(
+    batch_size: int = 1000,
+    default_context: str = None,
+    drop_global: bool = False,
+    dry_run: bool = False,
+    client=None,
+) -> Dict[str, object]:
+    """
+    Copy every row of the global collection into its context's shard.
+
+    Args:
+        batch_size: Rows read and upserted per call
+        default_context: Context of rows without video_id/context_id (default: MONGO_DB_NAME)
+        drop_global: Delete the global collection after a successful copy
+        dry_run: Only count rows per target shard
+        client: Chroma client (default: PersistentClient on CHROMA_PERSIST_DIRECTORY)
+
+    Returns:
+        Rows per context, shards written and elapsed seconds
+    """
+    client = client or chromadb.PersistentClient(
+        path=config.CHROMA_PERSIST_DIRECTORY,
+        settings=Settings(anonymized_telemetry=False),
+    )
+    default_context = default_context or os.getenv("MONGO_DB_NAME", "authDB")
+    source_name = global_collection_name()
+    catalog = get_shard_catalog()
+
+    try:
+        source = client.get_collection(name=source_name)
+    except Exception:
+        print(f"⏭ No {source_name} collection, nothing to migrate")
+        return {"rows": 0, "contexts": {}, "shards": 0, "elapsed_seconds": 0.0}
+
+    t0 = time.perf_counter()
+    total = source.count()
+    counts: Dict[str, int] = {}
+    routes = {}
+    shards = {}
+
+    for offset in range(0, total, batch_size):
+        batch = source.get(
+            limit=batch_size,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"],
+        )
+
+        grouped: Dict[str, dict] = {}
+        for i, row_id in enumerate(batch["ids"]):
+            metadata = dict(batch["metadatas"][i] or {})
+            context_id = _row_context(metadata, default_context)
+            metadata["context_id"] = context_id
+            counts[context_id] = counts.get(context_id, 0) + 1
+
+            route = routes.get(context_id)
+            if route is None:
+                route = routes[context_id] = catalog.route(context_id)
+            if route.collection_name == source_name:
+                continue  # "none" strategy: the row is already where it belongs
+
+            group = grouped.setdefault(route.collection_name, {"ids": [], "embeddings": [], "documents": [], "metadatas": []})
+            group["ids"].append(row_id)
+            group["embeddings"].append(batch["embeddings"][i])
+            group["documents"].append(batch["documents"][i])
+            group["metadatas"].append(metadata)
+
+        if not dry_run:
+            for collection_name, group in grouped.items():
+                if collection_name not in shards:
+                    shards[collection_name] = client.get_or_create_collection(name=collection_name)
+                shards[collection_name].upsert(**group)
+
+        print(f"⧗ Migrated {min(offset + batch_size, total):,}/{total:,} rows")
+
+    if not dry_run:
+        manifest = get_chunk_manifest()
+        for context_id, route in routes.items():
+            if route.collection_name == source_name:
+                continue
+            manifest.move_source(f"chroma:{source_name}", f"chroma:{route.collection_name}", context_id)
+            catalog.register(context_id, route)
+
+        if drop_global and shards:
+            client.delete_collection(name=source_name)
+            print(f"✔ Dropped {source_name}")
+
+    elapsed = time.perf_counter() - t0
+    print(f"✔ {total:,} rows of {len(counts)} contexts → {len(shards)} shards in {elapsed:.1f}s")
+    return {
+        "rows": total,
+        "contexts": counts,
+        "shards": len({r.collection_name for r in routes.values()}),
+        "elapsed_seconds": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--default-context", default=None, help="context of rows without video_id")
+    parser.add_argument("--drop-global", action="store_true", help="delete the global collection afterwards")
+    parser.add_argument("--dry-run", action="store_true", help="only count rows per context")
+    args = parser.parse_args()
+
+    migrate_global_collection(
+        batch_size=args.batch_size,
+        default_context=args.default_context,
+        drop_global=args.drop_global,
+        dry_run=args.dry_run,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Summary Cache Module
+
+Content-addressed cache of LLM chunk summaries for map-reduce
+summarization. Entries are keyed by (model + prompt version, SHA-256 of
+the whitespace-normalized chunk), so re-summarizing an edited document
+only sends its changed chunks to the LLM.
+"""
+import os
+import sys
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.embedding_cache import text_hash
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    model      TEXT NOT NULL,
+    text_hash  TEXT NOT NULL,
+    summary    TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+) WITHOUT ROWID;
+"""
+
+_LOOKUP_CHUNK = 500
+
+
+class SummaryCache:
+    """SQLite-backed (model, chunk hash) -> summary."""
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: SQLite file (default: config.SUMMARY_CACHE_PATH)
+        """
+        self.path = path or config.SUMMARY_CACHE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> Dict[str, str]:
+        """
+        Cached summaries of chunks.
+
+        Returns:
+            Dict of chunk text -> summary for the hits
+        """
+        by_hash = {text_hash(t): t for t in texts}
+        hashes = list(by_hash)
+        found: Dict[str, str] = {}
+        with self._connect() as conn:
+            for start in range(0, len(hashes), _LOOKUP_CHUNK):
+                chunk = hashes[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                for key, summary in conn.execute(
+                    f"SELECT text_hash, summary FROM summaries WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                ):
+                    found[by_hash[key]] = summary
+        self.hits += len(found)
+        self.misses += len(by_hash) - len(found)
+        return found
+
+    def put(self, model: str, text: str, summary: str):
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)",
+                (model, text_hash(text), summary, time.time()),
+            )
+
+    def stats(self) -> Dict[str, object]:
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[SummaryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> Optional[SummaryCache]:
+    """Shared SummaryCache instance, or None when config.SUMMARY_CACHE is off."""
+    global _cache
+    if not config.SUMMARY_CACHE:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SummaryCache()
+    return _cache
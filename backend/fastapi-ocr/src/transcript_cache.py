@@ -0,0 +1,119 @@
+"""
+Transcript Cache Module
+
+Persistent cache of fetched YouTube transcripts, keyed by (video id,
+language preference, translation target). Entries hold the segment list
+with timestamps and expire after a configurable TTL. Two shared backends:
+- "disk":  one JSON file per key (shared by workers on the same host)
+- "mongo": one document per key with a TTL index (shared across hosts)
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+def transcript_cache_key(video_id: str, variant: str) -> str:
+    """Cache key of a video in a language variant (see transcript_variant)."""
+    return f"{video_id}|{variant}"
+
+
+class DiskTranscriptCache:
+    """JSON file per key; writes are atomic so concurrent workers never read partial files."""
+
+    def __init__(self, directory: str = None, ttl_seconds: float = None):
+        self.directory = directory or config.TRANSCRIPT_CACHE_DIRECTORY
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.TRANSCRIPT_CACHE_TTL_HOURS * 3600
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("key") != key:
+            return None
+        if time.time() - entry.get("fetched_at", 0) > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry["segments"]
+
+    def set(self, key: str, segments: List[dict]):
+        entry = {"key": key, "fetched_at": time.time(), "segments": segments}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(entry, fh, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class MongoTranscriptCache:
+    """Mongo collection with a TTL index on fetched_at."""
+
+    def __init__(self, collection=None, ttl_seconds: float = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.TRANSCRIPT_CACHE_TTL_HOURS * 3600
+        if collection is None:
+            from pymongo import MongoClient
+            client = MongoClient(os.getenv("MONGO_URL"))
+            collection = client[os.getenv("MONGO_DB_NAME")][config.TRANSCRIPT_CACHE_COLLECTION]
+        self.collection = collection
+
+        try:
+            self.collection.create_index("fetched_at", expireAfterSeconds=int(self.ttl_seconds))
+        except Exception as e:
+            # An existing index with another TTL; get() still enforces ours
+            print(f"⚠ Transcript cache TTL index not updated: {e}")
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        entry = self.collection.find_one({"_id": key})
+        if not entry:
+            return None
+        # The TTL monitor only runs every 60s
+        if datetime.utcnow() - entry["fetched_at"] > timedelta(seconds=self.ttl_seconds):
+            return None
+        return entry["segments"]
+
+    def set(self, key: str, segments: List[dict]):
+        self.collection.replace_one(
+            {"_id": key},
+            {"_id": key, "fetched_at": datetime.utcnow(), "segments": segments},
+            upsert=True,
+        )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_transcript_cache():
+    """Shared cache for config.TRANSCRIPT_CACHE_BACKEND ("disk", "mongo" or "none")."""
+    global _cache
+    backend = config.TRANSCRIPT_CACHE_BACKEND
+    if backend == "none":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = MongoTranscriptCache() if backend == "mongo" else DiskTranscriptCache()
+    return _cache
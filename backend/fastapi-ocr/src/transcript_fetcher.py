@@ -1,42 +1,205 @@
 """
 YouTube Transcript Fetcher Module
 """
-from typing import Optional, List
+import os
+import sys
+import json
+from typing import Dict, Optional, List
 from youtube_transcript_api import (
     YouTubeTranscriptApi,
     TranscriptsDisabled,
     NoTranscriptFound,
 )
 from src.utils import extract_video_id, validate_video_id
+from src.transcript_cache import get_transcript_cache, transcript_cache_key
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+def transcript_variant(
+    language_codes: Optional[List[str]] = None,
+    target_language: Optional[str] = None,
+) -> str:
+    """
+    Stable key for a language preference / translation target combination.
+
+    Args:
+        language_codes: Preferred language codes (default: ["en"])
+        target_language: Optional translation target
+
+    Returns:
+        e.g. "en" or "hi,en>fr"
+    """
+    key = ",".join(language_codes or ["en"])
+    return f"{key}>{target_language}" if target_language else key
+
+
+def segments_to_text(segments: List[dict]) -> str:
+    """Combine transcript segments into a single string."""
+    return " ".join(s["text"].strip() for s in segments if s.get("text", "").strip())
+
+
+# =========================================================
+# PROVIDERS
+# =========================================================
+class YouTubeTranscriptProvider:
+    """Live transcripts via youtube-transcript-api."""
 
-class TranscriptFetcher:
-    """Handles fetching and processing YouTube video transcripts."""
-    
     def __init__(self):
         # Use an instance of the client; older releases expose list/fetch on instances.
         self.api = YouTubeTranscriptApi()
 
-    def fetch_transcript(
+    def fetch_segments(
         self,
-        url_or_id: str,
-        language_codes: Optional[List[str]] = None,
+        video_id: str,
+        language_codes: List[str],
         target_language: Optional[str] = None,
-    ) -> Optional[str]:
+    ) -> List[dict]:
         """
-        Fetch transcript from YouTube video.
+        Fetch the transcript segments of a video.
 
         This follows the usage pattern from the official youtube-transcript-api
         documentation: first retrieve the available transcripts via .list(),
         then pick/translate the best match.
 
+        Returns:
+            List of {"text", "start", "duration"} segments
+        """
+        # Retrieve the available transcripts
+        transcript_list = self.api.list(video_id)
+
+        transcript = None
+
+        # 1) Try to directly filter for preferred languages
+        try:
+            transcript = transcript_list.find_transcript(language_codes)
+        except NoTranscriptFound:
+            transcript = None
+
+        # 2) If none found, try manually created transcripts
+        if transcript is None:
+            try:
+                transcript = transcript_list.find_manually_created_transcript(
+                    language_codes
+                )
+            except NoTranscriptFound:
+                transcript = None
+
+        # 3) If still none, try automatically generated ones
+        if transcript is None:
+            try:
+                transcript = transcript_list.find_generated_transcript(
+                    language_codes
+                )
+            except NoTranscriptFound:
+                transcript = None
+
+        # 4) As a very last resort, just take the first available transcript
+        if transcript is None:
+            try:
+                transcript = next(iter(transcript_list))
+            except StopIteration:
+                transcript = None
+
+        if transcript is None:
+            raise ValueError(f"No transcript found for video: {video_id}")
+
+        # Optionally translate the transcript to the target language
+        if (
+            target_language
+            and getattr(transcript, "is_translatable", False)
+            and target_language != getattr(transcript, "language_code", None)
+        ):
+            try:
+                transcript = transcript.translate(target_language)
+            except Exception:
+                # If translation fails, fall back to the original transcript
+                pass
+
+        # Fetch the actual transcript data. Depending on youtube-transcript-api
+        # version the snippets can be dicts or FetchedTranscriptSnippet
+        # objects, so handle both.
+        segments = []
+        for item in transcript.fetch():
+            if isinstance(item, dict):
+                text, start, duration = item.get("text", ""), item.get("start", 0.0), item.get("duration", 0.0)
+            else:
+                text = getattr(item, "text", "")
+                start, duration = getattr(item, "start", 0.0), getattr(item, "duration", 0.0)
+            if text:
+                segments.append({"text": text, "start": float(start), "duration": float(duration)})
+        return segments
+
+
+class FakeTranscriptProvider:
+    """
+    Offline provider for tests and local development.
+
+    Transcripts come from a dict or from <directory>/<video_id>.json files,
+    each holding a list of {"text", "start", "duration"} segments.
+    """
+
+    def __init__(self, transcripts: Optional[Dict[str, List[dict]]] = None, directory: str = None):
+        self.transcripts = dict(transcripts or {})
+        self.directory = directory or config.FAKE_TRANSCRIPT_DIRECTORY
+        self.calls = 0
+
+    def fetch_segments(
+        self,
+        video_id: str,
+        language_codes: List[str],
+        target_language: Optional[str] = None,
+    ) -> List[dict]:
+        self.calls += 1
+        if video_id in self.transcripts:
+            return list(self.transcripts[video_id])
+
+        path = os.path.join(self.directory, f"{video_id}.json")
+        if not os.path.exists(path):
+            raise ValueError(f"No transcript found for video: {video_id}")
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+
+
+def _default_provider():
+    if config.TRANSCRIPT_PROVIDER == "fake":
+        return FakeTranscriptProvider()
+    return YouTubeTranscriptProvider()
+
+
+# =========================================================
+# FETCHER
+# =========================================================
+class TranscriptFetcher:
+    """Handles fetching and processing YouTube video transcripts."""
+
+    def __init__(self, provider=None, cache="default"):
+        """
+        Args:
+            provider: Transcript provider (default: per config.TRANSCRIPT_PROVIDER)
+            cache: Transcript cache, None to disable (default: shared cache per config)
+        """
+        self.provider = provider or _default_provider()
+        self.cache = get_transcript_cache() if cache == "default" else cache
+        self.api = getattr(self.provider, "api", None) or YouTubeTranscriptApi()
+
+    def fetch_segments(
+        self,
+        url_or_id: str,
+        language_codes: Optional[List[str]] = None,
+        target_language: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        Fetch transcript segments (with timestamps), reading through the cache.
+
         Args:
             url_or_id: YouTube URL or video ID
             language_codes: Preferred language codes ordered by preference
             target_language: Optional language code to translate the transcript to
 
         Returns:
-            Transcript text as a single string, or None if failed
+            List of {"text", "start", "duration"} segments
         """
         # If no language preference provided, default to English preference
         if language_codes is None:
@@ -50,84 +213,52 @@ class TranscriptFetcher:
         
         if not validate_video_id(video_id):
             raise ValueError(f"Invalid video ID format: {video_id}")
-        
-        try:
-            # Retrieve the available transcripts
-            transcript_list = self.api.list(video_id)
-
-            transcript = None
 
-            # 1) Try to directly filter for preferred languages
+        key = transcript_cache_key(video_id, transcript_variant(language_codes, target_language))
+        if self.cache is not None:
             try:
-                transcript = transcript_list.find_transcript(language_codes)
-            except NoTranscriptFound:
-                transcript = None
+                segments = self.cache.get(key)
+                if segments is not None:
+                    return segments
+            except Exception as e:
+                print(f"⚠ Transcript cache read failed: {e}")
 
-            # 2) If none found, try manually created transcripts
-            if transcript is None:
-                try:
-                    transcript = transcript_list.find_manually_created_transcript(
-                        language_codes
-                    )
-                except NoTranscriptFound:
-                    transcript = None
-
-            # 3) If still none, try automatically generated ones
-            if transcript is None:
-                try:
-                    transcript = transcript_list.find_generated_transcript(
-                        language_codes
-                    )
-                except NoTranscriptFound:
-                    transcript = None
-
-            # 4) As a very last resort, just take the first available transcript
-            if transcript is None:
-                try:
-                    transcript = next(iter(transcript_list))
-                except StopIteration:
-                    transcript = None
-
-            if transcript is None:
-                raise NoTranscriptFound(video_id)
-
-            # Optionally translate the transcript to the target language
-            if (
-                target_language
-                and getattr(transcript, "is_translatable", False)
-                and target_language != getattr(transcript, "language_code", None)
-            ):
-                try:
-                    transcript = transcript.translate(target_language)
-                except Exception:
-                    # If translation fails, fall back to the original transcript
-                    pass
-
-            # Fetch the actual transcript data
-            transcript_data = transcript.fetch()
-            
-            # Combine all transcript snippets into a single string. Depending on
-            # youtube-transcript-api version the snippets can be dicts or
-            # FetchedTranscriptSnippet objects, so handle both.
-            transcript_parts = []
-            for item in transcript_data:
-                if isinstance(item, dict):
-                    text = item.get('text', '')
-                else:
-                    text = getattr(item, 'text', '')
-                if text:
-                    transcript_parts.append(text.strip())
-            
-            transcript_text = " ".join(transcript_parts)
-
-            return transcript_text
-            
+        try:
+            segments = self.provider.fetch_segments(video_id, language_codes, target_language)
         except TranscriptsDisabled:
             raise ValueError(f"Transcripts are disabled for video: {video_id}")
         except NoTranscriptFound:
             raise ValueError(f"No transcript found for video: {video_id}")
+        except ValueError:
+            raise
         except Exception as e:
             raise Exception(f"Error fetching transcript: {str(e)}")
+
+        if self.cache is not None and segments:
+            try:
+                self.cache.set(key, segments)
+            except Exception as e:
+                print(f"⚠ Transcript cache write failed: {e}")
+        return segments
+
+    def fetch_transcript(
+        self,
+        url_or_id: str,
+        language_codes: Optional[List[str]] = None,
+        target_language: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Fetch transcript from YouTube video.
+
+        Args:
+            url_or_id: YouTube URL or video ID
+            language_codes: Preferred language codes ordered by preference
+            target_language: Optional language code to translate the transcript to
+
+        Returns:
+            Transcript text as a single string, or None if failed
+        """
+        return segments_to_text(self.fetch_segments(url_or_id, language_codes, target_language))
     
     def get_available_transcripts(self, url_or_id: str) -> List[dict]:
         """
@@ -0,0 +1,160 @@
+"""
+Vector Quantization Module
+
+Compact in-memory formats for embedding matrices:
+- "int8":    symmetric scalar quantization with one float32 scale per vector
+- "float16": half precision (unit vectors need no scale)
+
+Search scans the compact codes and the best candidates are rescored
+against the full-precision vectors, which stay on disk (memory-mapped).
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+QUANTIZATION_MODES = ("none", "float16", "int8")
+
+_BLOCK = 65536
+
+
+class QuantizedMatrix:
+    """Row-major matrix of quantized vectors that dequantizes on access."""
+
+    def __init__(self, codes: np.ndarray, scales: Optional[np.ndarray], mode: str):
+        if mode not in ("float16", "int8"):
+            raise ValueError(f"Unsupported quantization mode: {mode}")
+        self.codes = codes
+        self.scales = scales
+        self.mode = mode
+
+    # ---------------------------------------------------------
+    # CONSTRUCTION
+    # ---------------------------------------------------------
+    @classmethod
+    def from_float(cls, vectors: np.ndarray, mode: str) -> "QuantizedMatrix":
+        """
+        Quantize float vectors.
+
+        Args:
+            vectors: Float matrix, shape (n, d)
+            mode: "int8" or "float16"
+
+        Returns:
+            QuantizedMatrix
+        """
+        codes_blocks, scale_blocks = [], []
+        for start in range(0, len(vectors), _BLOCK):
+            block = np.asarray(vectors[start:start + _BLOCK], dtype=np.float32)
+            if mode == "float16":
+                codes_blocks.append(block.astype(np.float16))
+                continue
+
+            scale = np.abs(block).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            codes_blocks.append(np.clip(np.rint(block / scale[:, None]), -127, 127).astype(np.int8))
+            scale_blocks.append(scale.astype(np.float32))
+
+        dim = vectors.shape[1] if len(vectors) else 0
+        dtype = np.float16 if mode == "float16" else np.int8
+        codes = np.concatenate(codes_blocks) if codes_blocks else np.zeros((0, dim), dtype=dtype)
+        scales = None
+        if mode == "int8":
+            scales = np.concatenate(scale_blocks) if scale_blocks else np.zeros(0, dtype=np.float32)
+        return cls(codes, scales, mode)
+
+    @classmethod
+    def concatenate(cls, parts: Sequence["QuantizedMatrix"]) -> "QuantizedMatrix":
+        mode = parts[0].mode
+        codes = np.concatenate([p.codes for p in parts])
+        scales = np.concatenate([p.scales for p in parts]) if mode == "int8" else None
+        return cls(codes, scales, mode)
+
+    def save(self, path: str):
+        if self.mode == "int8":
+            np.savez(path, codes=self.codes, scales=self.scales)
+        else:
+            np.savez(path, codes=self.codes)
+
+    @classmethod
+    def load(cls, path: str, mode: str) -> "QuantizedMatrix":
+        data = np.load(path)
+        return cls(data["codes"], data["scales"] if mode == "int8" else None, mode)
+
+    # ---------------------------------------------------------
+    # ACCESS
+    # ---------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __getitem__(self, rows) -> np.ndarray:
+        """Dequantized float32 rows."""
+        block = self.codes[rows].astype(np.float32)
+        if self.mode == "int8":
+            block *= self.scales[rows][..., None]
+        return block
+
+    def dot(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Approximate inner products with a query.
+
+        Args:
+            query: Float query vector, shape (d,)
+            rows: Optional row ids to score (default: all rows)
+
+        Returns:
+            Approximate scores, one per row
+        """
+        query = np.asarray(query, dtype=np.float32)
+        n = len(self.codes) if rows is None else len(rows)
+        out = np.empty(n, dtype=np.float32)
+
+        for start in range(0, n, _BLOCK):
+            sel = slice(start, start + _BLOCK) if rows is None else rows[start:start + _BLOCK]
+            scores = self.codes[sel].astype(np.float32) @ query
+            if self.mode == "int8":
+                scores *= self.scales[sel]
+            out[start:start + len(scores)] = scores
+        return out
+
+
+def rescore(
+    candidates: np.ndarray,
+    approx_scores: np.ndarray,
+    query: np.ndarray,
+    fetch_full,
+    k: int,
+    rescore_factor: int,
+) -> List[tuple]:
+    """
+    Re-rank the best approximate candidates with full-precision vectors.
+
+    Args:
+        candidates: Row ids that were scored approximately
+        approx_scores: Their approximate scores
+        query: Float query vector
+        fetch_full: Callable(row_ids) -> float32 matrix of those rows
+        k: Number of results
+        rescore_factor: How many approximate hits per result to rescore
+
+    Returns:
+        List of (row_id, exact_score), best first
+    """
+    shortlist_size = min(len(candidates), max(k, k * rescore_factor))
+    if shortlist_size < len(candidates):
+        part = np.argpartition(-approx_scores, shortlist_size - 1)[:shortlist_size]
+    else:
+        part = np.arange(len(candidates))
+
+    shortlist = candidates[part]
+    exact = np.asarray(fetch_full(shortlist), dtype=np.float32) @ query
+    order = np.argsort(-exact)[:k]
+    return [(int(shortlist[i]), float(exact[i])) for i in order]
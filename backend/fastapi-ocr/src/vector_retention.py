@@ -0,0 +1,398 @@
+"""
+Vector Retention Module
+
+Keeps the vector stores from growing without bound:
+- per-context TTLs: Chroma contexts expire after their last write, RAG
+  sources (Atlas / local store) after their last re-index
+- deletion of a user's chunks by video_id / source / folder_id across every store
+- duplicate compaction by chunk hash (same context/source and text)
+- an index-size report
+
+run_maintenance() applies TTLs and compaction; start_retention_worker()
+runs it every RETENTION_INTERVAL_HOURS in a background thread.
+"""
+import os
+import sys
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import chromadb
+from chromadb.config import Settings
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.chunk_manifest import get_chunk_manifest
+from src.chunk_offsets import get_source_text_store
+from src.embedding_cache import text_hash
+from src.lexical_index import get_lexical_index
+from src.vector_shards import get_shard_catalog
+from src.vector_store import safe_context_id
+from src.vector_store_pool import get_vector_store_pool
+
+
+DELETABLE_FIELDS = ("video_id", "source", "folder_id")
+
+
+def _chunk_key(text: Optional[str], metadata: dict) -> str:
+    """Duplicate key of a chunk: its text, or for offset-based chunks the text hash they carry."""
+    if not text and metadata.get("chunk_hash"):
+        return f"pointer:{metadata['chunk_hash']}"
+    return text_hash(text or "")
+
+
+class RetentionPolicies:
+    """SQLite-backed context_id -> TTL (context ids are Chroma contexts or RAG user ids)."""
+
+    def __init__(self, path: str = None):
+        """
+        Args:
+            path: SQLite file (default: config.RETENTION_DB_PATH)
+        """
+        self.path = path or config.RETENTION_DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS policies (context_id TEXT PRIMARY KEY, ttl_seconds REAL NOT NULL) WITHOUT ROWID"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def set_ttl(self, context_id: str, ttl_seconds: Optional[float]):
+        """Set a context's TTL; None restores the default."""
+        with self._write_lock, self._connect() as conn:
+            if ttl_seconds is None:
+                conn.execute("DELETE FROM policies WHERE context_id = ?", (context_id,))
+            else:
+                conn.execute("INSERT OR REPLACE INTO policies VALUES (?, ?)", (context_id, float(ttl_seconds)))
+
+    def all(self) -> Dict[str, float]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT context_id, ttl_seconds FROM policies"))
+
+    @staticmethod
+    def default_ttl() -> Optional[float]:
+        days = config.RETENTION_DEFAULT_TTL_DAYS
+        return days * 86400 if days > 0 else None
+
+
+class VectorRetention:
+    """Retention, deletion, compaction and size reporting over the Chroma shards and the RAG store."""
+
+    def __init__(self, rag_backend: str = None, rag_collection=None, rag_store=None, rag_texts=None,
+                 client=None, policies=None):
+        """
+        Args:
+            rag_backend: rag_engine VECTOR_BACKEND ("atlas" or "local"); None skips the RAG store
+            rag_collection: Mongo collection behind MongoDBAtlasVectorSearch ("atlas")
+            rag_store: LocalVectorStore ("local")
+            rag_texts: Mongo collection of the source texts behind "atlas" pointer chunks
+            client: Chroma client (default: PersistentClient on CHROMA_PERSIST_DIRECTORY)
+            policies: RetentionPolicies (default: config.RETENTION_DB_PATH)
+        """
+        self.rag_backend = rag_backend
+        self.rag_collection = rag_collection
+        self.rag_store = rag_store
+        self.rag_texts = rag_texts
+        self._client = client
+        self.policies = policies or RetentionPolicies()
+        self._run_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = chromadb.PersistentClient(
+                path=config.CHROMA_PERSIST_DIRECTORY,
+                settings=Settings(anonymized_telemetry=False),
+            )
+        return self._client
+
+    def _collections(self) -> List:
+        prefix = f"{config.CHROMA_COLLECTION_NAME}_"
+        names = [getattr(c, "name", c) for c in self.client.list_collections()]
+        return [self.client.get_collection(name=n) for n in names if n.startswith(prefix)]
+
+    def _ttl_for(self, context_id: str, policies: Dict[str, float]) -> Optional[float]:
+        ttl = policies.get(context_id)
+        return ttl if ttl is not None else self.policies.default_ttl()
+
+    # ---------------------------------------------------------
+    # DELETION
+    # ---------------------------------------------------------
+    def delete_context(self, context_id: str):
+        """Drop a Chroma context (its shard collection, or its rows in a bucket)."""
+        pool = get_vector_store_pool()
+        pool.get(context_id).delete_vector_store()
+        pool.invalidate(context_id)
+
+    def _delete_rag_source(self, user_id: str, source: str) -> int:
+        manifest = get_chunk_manifest()
+        manifest.forget_source(f"{self.rag_backend}:{user_id}", source)
+        get_source_text_store().delete_prefix(f"rag/{user_id}/{source}@")
+        if self.rag_texts is not None:
+            self.rag_texts.delete_many({"user_id": user_id, "source": source})
+        try:
+            get_lexical_index(user_id).delete_source(source)
+        except Exception as e:
+            print(f"⚠ Lexical cleanup failed for {user_id}/{source}: {e}")
+        return self._delete_rag({"user_id": user_id, "source": source})
+
+    def _delete_rag(self, conditions: Dict[str, str]) -> int:
+        if self.rag_backend == "local" and self.rag_store is not None:
+            return self.rag_store.delete(pre_filter={f: {"$eq": v} for f, v in conditions.items()})
+        if self.rag_collection is not None:
+            return self.rag_collection.delete_many(conditions).deleted_count
+        return 0
+
+    def _rag_sources(self, conditions: Dict[str, str]) -> List[str]:
+        """Sources with RAG chunks matching the conditions."""
+        if self.rag_backend == "local" and self.rag_store is not None:
+            return self.rag_store.distinct("source", pre_filter={f: {"$eq": v} for f, v in conditions.items()})
+        if self.rag_collection is not None:
+            return [str(s) for s in self.rag_collection.distinct("source", conditions) if s is not None]
+        return []
+
+    def _chroma_has(self, where: dict) -> bool:
+        return any(c.get(where=where, limit=1, include=[])["ids"] for c in self._collections())
+
+    def delete_by(self, field: str, value: str, user_id: str) -> Dict[str, int]:
+        """
+        Delete one user's chunks whose metadata field equals a value.
+
+        Only chunks owned by the user are removed; shared transcript chunks
+        (no user_id) are left to their TTL or delete_context. RAG sources
+        touched by the deletion are also dropped from the chunk manifest,
+        the source text store and the user's lexical index.
+
+        Args:
+            field: "video_id", "source" or "folder_id"
+            value: Field value
+            user_id: Owner of the chunks to delete
+
+        Returns:
+            Deleted chunks per store
+        """
+        if field not in DELETABLE_FIELDS:
+            raise ValueError(f"Cannot delete by '{field}' (expected one of {DELETABLE_FIELDS})")
+        if not user_id:
+            raise ValueError("user_id is required")
+
+        user_id = str(user_id)
+        value = safe_context_id(value) if field == "video_id" else value
+        chroma_deleted = 0
+        where = {"$and": [{field: value}, {"user_id": user_id}]}
+        for collection in self._collections():
+            ids = collection.get(where=where, include=[])["ids"]
+            if ids:
+                collection.delete(ids=ids)
+                chroma_deleted += len(ids)
+
+        if field == "video_id" and chroma_deleted and not self._chroma_has({"video_id": value}):
+            manifest = get_chunk_manifest()
+            for entry in manifest.sources("chroma:"):
+                if entry["source"] == value:
+                    manifest.forget_source(entry["namespace"], value)
+            get_shard_catalog().forget(value)
+            get_source_text_store().delete_prefix(f"transcript/{value}@")
+            get_vector_store_pool().invalidate(value)
+
+        rag_deleted = 0
+        if self.rag_backend:
+            conditions = {field: value, "user_id": user_id}
+            sources = [value] if field == "source" else self._rag_sources(conditions)
+            for source in sources:
+                rag_deleted += self._delete_rag_source(user_id, source)
+            # Chunks not tracked by the manifest (indexed before it existed)
+            rag_deleted += self._delete_rag(conditions)
+
+        print(f"✔ Deleted {field}={value} of {user_id}: {chroma_deleted} Chroma / {rag_deleted} RAG chunks")
+        return {"chroma": chroma_deleted, "rag": rag_deleted}
+
+    # ---------------------------------------------------------
+    # TTL
+    # ---------------------------------------------------------
+    def expire(self, now: float = None) -> Dict[str, int]:
+        """Delete Chroma contexts and RAG sources older than their TTL."""
+        now = now or time.time()
+        policies = self.policies.all()
+
+        contexts = 0
+        for entry in get_shard_catalog().contexts():
+            ttl = self._ttl_for(entry["context_id"], policies)
+            if ttl and entry["updated_at"] < now - ttl:
+                self.delete_context(entry["context_id"])
+                contexts += 1
+
+        sources = 0
+        if self.rag_backend:
+            for entry in get_chunk_manifest().sources(f"{self.rag_backend}:"):
+                user_id = entry["namespace"].split(":", 1)[1]
+                ttl = self._ttl_for(user_id, policies)
+                if ttl and entry["updated_at"] < now - ttl:
+                    self._delete_rag_source(user_id, entry["source"])
+                    sources += 1
+
+        return {"contexts": contexts, "sources": sources}
+
+    # ---------------------------------------------------------
+    # COMPACTION
+    # ---------------------------------------------------------
+    def _compact_collection(self, collection, batch_size: int = 1000) -> int:
+        manifest = get_chunk_manifest()
+        namespace = f"chroma:{collection.name}"
+        keep_ids: Dict[str, set] = {}
+        groups: Dict[tuple, List[str]] = {}
+
+        total = collection.count()
+        for offset in range(0, total, batch_size):
+            batch = collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+            for row_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                metadata = metadata or {}
+                context_id = str(metadata.get("context_id") or metadata.get("video_id") or "")
+                groups.setdefault((context_id, _chunk_key(text, metadata)), []).append(row_id)
+
+        doomed = []
+        for (context_id, _), ids in groups.items():
+            if len(ids) < 2:
+                continue
+            if context_id not in keep_ids:
+                keep_ids[context_id] = manifest.chunk_ids(namespace, context_id)
+            keep = next((i for i in ids if i in keep_ids[context_id]), ids[0])
+            doomed.extend(i for i in ids if i != keep)
+
+        for start in range(0, len(doomed), batch_size):
+            collection.delete(ids=doomed[start:start + batch_size])
+        return len(doomed)
+
+    def _compact_atlas(self) -> int:
+        keep_ids: Dict[tuple, set] = {}
+        manifest = get_chunk_manifest()
+        pipeline = [
+            {"$group": {
+                "_id": {"user_id": "$user_id", "source": "$source", "text": "$text", "hash": "$chunk_hash"},
+                "ids": {"$push": "$_id"},
+                "n": {"$sum": 1},
+            }},
+            {"$match": {"n": {"$gt": 1}}},
+        ]
+
+        doomed = []
+        for group in self.rag_collection.aggregate(pipeline, allowDiskUse=True):
+            key = (str(group["_id"].get("user_id")), str(group["_id"].get("source")))
+            if key not in keep_ids:
+                keep_ids[key] = manifest.chunk_ids(f"{self.rag_backend}:{key[0]}", key[1])
+            keep = next((i for i in group["ids"] if str(i) in keep_ids[key]), group["ids"][0])
+            doomed.extend(i for i in group["ids"] if i != keep)
+
+        deleted = 0
+        for start in range(0, len(doomed), 1000):
+            deleted += self.rag_collection.delete_many({"_id": {"$in": doomed[start:start + 1000]}}).deleted_count
+        return deleted
+
+    def compact(self) -> Dict[str, int]:
+        """Delete duplicate chunks, keeping the copy the chunk manifest tracks."""
+        chroma = sum(self._compact_collection(c) for c in self._collections())
+
+        rag = 0
+        if self.rag_backend == "local" and self.rag_store is not None:
+            manifest = get_chunk_manifest()
+            keep = set()
+            for entry in manifest.sources("local:"):
+                keep |= manifest.chunk_ids(entry["namespace"], entry["source"])
+            rag = self.rag_store.compact_duplicates(keep)
+        elif self.rag_collection is not None:
+            rag = self._compact_atlas()
+
+        return {"chroma": chroma, "rag": rag}
+
+    # ---------------------------------------------------------
+    # REPORT / MAINTENANCE
+    # ---------------------------------------------------------
+    def report(self) -> Dict[str, object]:
+        """Chunk counts and on-disk size of every vector store."""
+        collections = sorted(
+            ({"name": c.name, "chunks": c.count()} for c in self._collections()),
+            key=lambda c: -c["chunks"],
+        )
+        chroma_bytes = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(config.CHROMA_PERSIST_DIRECTORY)
+            for name in files
+        )
+        report = {
+            "chroma": {
+                "collections": len(collections),
+                "chunks": sum(c["chunks"] for c in collections),
+                "bytes": chroma_bytes,
+                "largest": collections[:20],
+                "contexts": len(get_shard_catalog().contexts()),
+            },
+            "source_text_bytes": get_source_text_store().size_bytes(),
+            "policies": self.policies.all(),
+            "default_ttl_days": config.RETENTION_DEFAULT_TTL_DAYS,
+        }
+
+        if self.rag_backend == "local" and self.rag_store is not None:
+            report["rag"] = {"backend": "local", **self.rag_store.stats()}
+        elif self.rag_collection is not None:
+            rag = {"backend": self.rag_backend, "chunks": self.rag_collection.estimated_document_count()}
+            try:
+                stats = self.rag_collection.database.command("collStats", self.rag_collection.name)
+                rag.update(bytes=stats.get("storageSize"), index_bytes=stats.get("totalIndexSize"))
+            except Exception as e:
+                print(f"⚠ collStats unavailable: {e}")
+            report["rag"] = rag
+
+        if self.rag_backend:
+            report["rag"]["sources"] = len(get_chunk_manifest().sources(f"{self.rag_backend}:"))
+        return report
+
+    def run_maintenance(self) -> Dict[str, object]:
+        """Apply TTLs, then compact duplicates (one run at a time)."""
+        with self._run_lock:
+            t0 = time.perf_counter()
+            expired = self.expire()
+            compacted = self.compact()
+            elapsed = round(time.perf_counter() - t0, 2)
+        print(f"✔ Vector maintenance: expired {expired}, compacted {compacted} in {elapsed}s")
+        return {"expired": expired, "compacted": compacted, "elapsed_seconds": elapsed}
+
+
+def start_retention_worker(retention: VectorRetention, interval_hours: float = None) -> Optional[threading.Thread]:
+    """
+    Run retention.run_maintenance() periodically in a daemon thread.
+
+    Args:
+        retention: VectorRetention to run
+        interval_hours: Period (default: config.RETENTION_INTERVAL_HOURS; <= 0 disables)
+
+    Returns:
+        The worker thread, or None when disabled
+    """
+    interval_hours = interval_hours if interval_hours is not None else config.RETENTION_INTERVAL_HOURS
+    if interval_hours <= 0:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval_hours * 3600)
+            try:
+                retention.run_maintenance()
+            except Exception as e:
+                print(f"❌ Vector maintenance failed: {e}")
+
+    worker = threading.Thread(target=loop, name="vector-retention", daemon=True)
+    worker.start()
+    return worker
@@ -0,0 +1,161 @@
+"""
+Vector Shards Module
+
+Routes every context (video, document, user or folder namespace) to its
+own Chroma collection so a query only searches the tenant's data. Routing
+strategies (config.VECTOR_SHARDING):
+- "context": one collection per context
+- "bucket":  contexts hashed into VECTOR_SHARD_BUCKETS shared collections,
+             searched with a context_id metadata filter
+- "none":    the legacy single global collection
+
+The shard catalog records where each context was first written, so
+changing the strategy never strands existing data.
+"""
+import os
+import sys
+import re
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    context_id        TEXT PRIMARY KEY,
+    collection_name   TEXT NOT NULL,
+    filter_by_context INTEGER NOT NULL,
+    created_at        REAL NOT NULL,
+    updated_at        REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS shards_collection ON shards (collection_name);
+"""
+
+
+class ShardRoute(NamedTuple):
+    collection_name: str
+    # Shared bucket: queries must filter on metadata context_id
+    filter_by_context: bool
+
+
+def global_collection_name() -> str:
+    """The legacy single collection every context used to share."""
+    return f"{config.CHROMA_COLLECTION_NAME}_global"
+
+
+def context_collection_name(context_id: str) -> str:
+    """Chroma-safe dedicated collection name (3-63 chars, alphanumeric ends)."""
+    slug = re.sub(r"[^a-zA-Z0-9_-]", "_", context_id)[:30].strip("_-")
+    digest = hashlib.sha1(context_id.encode("utf-8")).hexdigest()[:8]
+    return f"{config.CHROMA_COLLECTION_NAME}_ctx_{slug}_{digest}" if slug else f"{config.CHROMA_COLLECTION_NAME}_ctx_{digest}"
+
+
+def bucket_collection_name(context_id: str, buckets: int = None) -> str:
+    buckets = buckets or config.VECTOR_SHARD_BUCKETS
+    return f"{config.CHROMA_COLLECTION_NAME}_shard_{zlib.crc32(context_id.encode('utf-8')) % buckets:03d}"
+
+
+class ShardCatalog:
+    """SQLite-backed context_id -> collection mapping."""
+
+    def __init__(self, path: str = None, strategy: str = None):
+        """
+        Args:
+            path: SQLite file (default: config.SHARD_CATALOG_PATH)
+            strategy: "context", "bucket" or "none" (default: config.VECTOR_SHARDING)
+        """
+        self.path = path or config.SHARD_CATALOG_PATH
+        self.strategy = strategy or config.VECTOR_SHARDING
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(shards)")}
+            if "updated_at" not in columns:
+                conn.execute("ALTER TABLE shards ADD COLUMN updated_at REAL")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, context_id: str) -> Optional[ShardRoute]:
+        """Recorded shard of a context, or None if it was never written."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT collection_name, filter_by_context FROM shards WHERE context_id = ?",
+                (context_id,),
+            ).fetchone()
+        return ShardRoute(row[0], bool(row[1])) if row else None
+
+    def route(self, context_id: str) -> ShardRoute:
+        """Shard a context lives in (recorded) or would be written to (strategy)."""
+        recorded = self.lookup(context_id)
+        if recorded is not None:
+            return recorded
+        if self.strategy == "context":
+            return ShardRoute(context_collection_name(context_id), False)
+        if self.strategy == "bucket":
+            return ShardRoute(bucket_collection_name(context_id), True)
+        return ShardRoute(global_collection_name(), False)
+
+    def register(self, context_id: str, route: ShardRoute):
+        """Record a write to a context; the shard is fixed by its first write."""
+        now = time.time()
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO shards VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(context_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (context_id, route.collection_name, int(route.filter_by_context), now, now),
+            )
+
+    def forget(self, context_id: str):
+        with self._write_lock, self._connect() as conn:
+            conn.execute("DELETE FROM shards WHERE context_id = ?", (context_id,))
+
+    def contexts(self, collection_name: str = None) -> List[Dict[str, object]]:
+        """Catalog entries, optionally of one collection."""
+        query = "SELECT context_id, collection_name, filter_by_context, created_at, updated_at FROM shards"
+        params = ()
+        if collection_name:
+            query += " WHERE collection_name = ?"
+            params = (collection_name,)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {
+                "context_id": r[0],
+                "collection_name": r[1],
+                "filter_by_context": bool(r[2]),
+                "created_at": r[3],
+                "updated_at": r[4] or r[3],
+            }
+            for r in rows
+        ]
+
+
+_catalog: Optional[ShardCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_shard_catalog() -> ShardCatalog:
+    """Shared ShardCatalog instance."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = ShardCatalog()
+    return _catalog
@@ -1,29 +1,141 @@
 import os
 import sys
 import re
+import uuid
+import hashlib
+import threading
 from typing import List, Optional
 
 import chromadb
 from chromadb.config import Settings
 
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document as LCDocument
 
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core import VectorStoreIndex, StorageContext
+from llama_index.core.vector_stores import MetadataFilters, ExactMatchFilter, FilterCondition
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
 from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.llms.ollama import Ollama
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from src.embedding_backend import SentenceEncoderEmbeddings, encode_texts
+from src.chunk_manifest import get_chunk_manifest
+from src.vector_shards import get_shard_catalog, global_collection_name
+from src.collection_registry import CollectionBinding, get_collection_registry, shadow_delete, shadow_upsert
+from src.chunk_offsets import (
+    HydratingRetriever,
+    get_source_text_store,
+    hydrate_documents,
+    is_pointer,
+    offset_documents,
+    storage_text,
+    versioned_record_id,
+)
+
+
+def safe_context_id(video_id: str) -> str:
+    """Clean ID for metadata safety."""
+    return re.sub(r"[^a-zA-Z0-9._-]", "_", video_id).strip("_")[:120]
+
+
+def transcript_version(transcript_text: str, variant: str = "en") -> str:
+    """Version of a transcript: language variant + content hash."""
+    return f"{variant}:{hashlib.sha1(transcript_text.encode('utf-8')).hexdigest()[:16]}"
+
+
+def transcript_record_id(safe_video_id: str, transcript_text: str) -> str:
+    """Source-text record of one transcript version (offset-based chunks)."""
+    return versioned_record_id(f"transcript/{safe_video_id}", transcript_text)
+
+
+def build_transcript_documents(text_splitter, safe_video_id: str, transcript_text: str) -> List[LCDocument]:
+    """
+    Split a transcript into chunks carrying the video metadata.
+
+    With config.OFFSET_CHUNKS the chunks also point into the transcript,
+    which is saved once in the source text store.
+    """
+    metadata = {
+        'video_id': safe_video_id,
+        'context_id': safe_video_id,
+        'source': 'youtube_transcript'
+    }
+    if config.OFFSET_CHUNKS:
+        record_id = transcript_record_id(safe_video_id, transcript_text)
+        get_source_text_store().put(record_id, transcript_text)
+        documents = offset_documents(text_splitter, transcript_text, metadata, record_id)
+    else:
+        documents = text_splitter.create_documents([transcript_text])
+
+    for i, doc in enumerate(documents):
+        doc.metadata = {**metadata, **doc.metadata, 'chunk_index': i}
+    return documents
+
+
+_llama_embeddings = {}
+_llama_embeddings_lock = threading.Lock()
+
+
+def get_llama_embeddings(model_name: str = None) -> HuggingFaceEmbedding:
+    """Shared LlamaIndex embedding model (loaded on first LlamaIndex use only)."""
+    model_name = model_name or config.HUGGINGFACE_EMBEDDING_MODEL
+    if model_name not in _llama_embeddings:
+        with _llama_embeddings_lock:
+            if model_name not in _llama_embeddings:
+                _llama_embeddings[model_name] = HuggingFaceEmbedding(model_name=model_name)
+    return _llama_embeddings[model_name]
+
+
+def is_video_indexed(client, collection_name: str, safe_video_id: str, variant: str = None,
+                     physical_name: str = None) -> bool:
+    """
+    Whether a video is already in a collection (no fetch/embedding needed).
+
+    Args:
+        client: Chroma client
+        collection_name: Collection holding the video
+        safe_video_id: safe_context_id() of the video
+        variant: Require this language variant (see transcript_variant)
+        physical_name: Chroma collection serving collection_name (see src/collection_registry.py)
+    """
+    info = get_chunk_manifest().source_info(f"chroma:{collection_name}", safe_video_id)
+    if info is not None:
+        return variant is None or (info["version"] or "").startswith(f"{variant}:")
+
+    # Videos ingested before the manifest existed; a missing collection means not indexed
+    try:
+        found = client.get_collection(name=physical_name or collection_name).get(
+            where={"video_id": safe_video_id}, limit=1, include=[]
+        )
+        return bool(found["ids"])
+    except Exception:
+        return False
+
+
+class HydrateNodes(BaseNodePostprocessor):
+    """LlamaIndex counterpart of HydratingRetriever: fills in pointer nodes' text."""
+
+    def _postprocess_nodes(self, nodes, query_bundle=None):
+        docs = [
+            LCDocument(page_content=n.node.get_content(), metadata={**n.node.metadata, "_row": i})
+            for i, n in enumerate(nodes)
+        ]
+        kept = []
+        for doc in hydrate_documents(docs):
+            node = nodes[doc.metadata["_row"]]
+            node.node.set_content(doc.page_content)
+            kept.append(node)
+        return kept
 
 
 class VectorStoreManager:
     """
-    Global Chroma Vector Store Manager
-    SINGLE DB for entire application
+    Chroma Vector Store Manager for one context
+    (routed to its shard collection, see src/vector_shards.py)
     """
 
     def __init__(self, video_id: str):
@@ -31,23 +143,21 @@ class VectorStoreManager:
         self.video_id = video_id
 
         # Clean ID for metadata safety
-        self.safe_video_id = re.sub(r"[^a-zA-Z0-9._-]", "_", video_id).strip("_")[:120]
+        self.safe_video_id = safe_context_id(video_id)
 
-        # 🔥 ONE GLOBAL COLLECTION FOR ALL DATA
-        self.collection_name = f"{config.CHROMA_COLLECTION_NAME}_global"
+        # Shard collection of this context
+        self.shard = get_shard_catalog().route(self.safe_video_id)
+        self.collection_name = self.shard.collection_name
 
         self.persist_directory = config.CHROMA_PERSIST_DIRECTORY
 
-        # LangChain embeddings
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=config.HUGGINGFACE_EMBEDDING_MODEL,
-            encode_kwargs={"normalize_embeddings": True}
-            # huggingfacehub_api_token=os.getenv("HUGGINGFACE_INFERENCE_API_TOKEN")
-        )
+        # Physical collection and pinned embedding model of the shard
+        self.binding = self._resolve_binding()
 
-        # LlamaIndex embeddings
-        self.llama_embeddings = HuggingFaceEmbedding(
-            model_name=config.HUGGINGFACE_EMBEDDING_MODEL
+        # LangChain embeddings
+        self.embeddings = SentenceEncoderEmbeddings(
+            self.binding.model,
+            normalize=True
         )
 
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -61,68 +171,288 @@ class VectorStoreManager:
         )
 
         self.vector_store: Optional[Chroma] = None
-        self.llama_index: Optional[VectorStoreIndex] = None
+
+        # Set while reads are served from the legacy global collection (see load_vector_store)
+        self.legacy_binding: Optional[CollectionBinding] = None
+
+        # LlamaIndex view, built on first use and dropped on writes
+        self._llama_index: Optional[VectorStoreIndex] = None
+        self._llama_lock = threading.Lock()
+
+        # Pooled managers are shared across requests (see src/vector_store_pool.py);
+        # guards binding / vector_store / legacy_binding swaps
+        self._state_lock = threading.RLock()
 
     # ---------------------------------------------------------
     # CREATE VECTOR STORE (for new transcript ingestion)
     # ---------------------------------------------------------
-    def create_vector_store(self, transcript_text: str) -> Chroma:
-        documents = self.text_splitter.create_documents([transcript_text])
-
-        for i, doc in enumerate(documents):
-            doc.metadata = {
-                'video_id': self.safe_video_id,
-                'chunk_index': i,
-                'source': 'youtube_transcript'
-            }
-
-        # ⚠ GLOBAL DB → DO NOT DELETE COLLECTION
-        self.vector_store = self.get_or_create_store()
-        self.vector_store.add_documents(documents)
-        self.vector_store.persist()
-
-        self._load_llama_index()
-        return self.vector_store
+    def create_vector_store(self, transcript_text: str, variant: str = "en") -> Chroma:
+        """
+        Index a transcript; a no-op when this exact version is already indexed.
+
+        Args:
+            transcript_text: Full transcript
+            variant: Language variant of the transcript (see transcript_variant)
+        """
+        self._ensure_shard()
+        version = transcript_version(transcript_text, variant)
+        if self.indexed_version() == version:
+            print(f"⏭ Video {self.safe_video_id} already indexed ({version})")
+            return self.get_or_create_store()
+
+        documents = build_transcript_documents(self.text_splitter, self.safe_video_id, transcript_text)
+
+        # ⚠ SHARED SHARDS → DO NOT DELETE COLLECTION
+        store = self.get_or_create_store()
+
+        # Diff against this video's manifest: only new chunks are embedded
+        manifest = get_chunk_manifest()
+        namespace = self.manifest_namespace
+        with manifest.source_lock(namespace, self.safe_video_id):
+            diff = manifest.diff(namespace, self.safe_video_id, documents)
+            if diff.removed_ids:
+                store.delete(ids=diff.removed_ids)
+                shadow_delete(self.client, self.binding, ids=diff.removed_ids)
+            if diff.new_documents:
+                self._write_documents(diff.new_documents, diff.new_ids)
+            manifest.commit(diff, version=version)
+        get_shard_catalog().register(self.safe_video_id, self.shard)
+        print(f"✔ Indexed video {self.safe_video_id} ({diff.summary()} chunks)")
+
+        if not diff.is_noop:
+            self.invalidate_llama_index()
+        return store
+
+    # ---------------------------------------------------------
+    # EMBEDDING MODEL BINDING (re-embedding migrations)
+    # ---------------------------------------------------------
+    def _resolve_binding(self) -> CollectionBinding:
+        return get_collection_registry().resolve(
+            self.persist_directory, self.collection_name, config.HUGGINGFACE_EMBEDDING_MODEL
+        )
+
+    def refresh_binding(self) -> bool:
+        """
+        Pick up migration state changes from the registry.
+
+        Returns:
+            True when the primary collection/model switched and the cached store was dropped
+        """
+        binding = self._resolve_binding()
+        with self._state_lock:
+            if binding == self.binding:
+                return False
+            switched = (binding.physical, binding.model) != (self.binding.physical, self.binding.model)
+            self.binding = binding
+            if switched:
+                self.embeddings = SentenceEncoderEmbeddings(binding.model, normalize=True)
+                self.vector_store = None
+                self.invalidate_llama_index()
+            return switched
+
+    # ---------------------------------------------------------
+    # INGESTION STATE (idempotent transcript ingestion)
+    # ---------------------------------------------------------
+    @property
+    def manifest_namespace(self) -> str:
+        return f"chroma:{self.collection_name}"
+
+    def indexed_version(self) -> Optional[str]:
+        """Transcript version recorded in the chunk manifest, if any."""
+        info = get_chunk_manifest().source_info(self.manifest_namespace, self.safe_video_id)
+        return info["version"] if info else None
+
+    def is_indexed(self, variant: str = None) -> bool:
+        """
+        Whether this video is already in the collection (no fetch/embedding needed).
+
+        Args:
+            variant: Require this language variant (see transcript_variant)
+        """
+        return is_video_indexed(self.client, self.collection_name, self.safe_video_id, variant, self.binding.physical)
 
     # ---------------------------------------------------------
     # LOAD STORE
     # ---------------------------------------------------------
     def load_vector_store(self) -> Optional[Chroma]:
+        with self._state_lock:
+            # Contexts not written since sharding was enabled may still live in the global collection
+            if config.VECTOR_SHARDING != "none" and get_shard_catalog().lookup(self.safe_video_id) is None:
+                return self._load_legacy_store()
+
+            try:
+                self.vector_store = Chroma(
+                    collection_name=self.binding.physical,
+                    embedding_function=self.embeddings,
+                    persist_directory=self.persist_directory,
+                    client=self.client
+                )
+                return self.vector_store
+            except:
+                return None
+
+    def _legacy_filter(self) -> dict:
+        # Global rows carry video_id (transcripts), context_id or user_id (documents)
+        return {"$or": [{key: self.safe_video_id} for key in ("context_id", "video_id", "user_id")]}
+
+    def _load_legacy_store(self) -> Optional[Chroma]:
+        """
+        Read-only view of this context's rows in the pre-sharding global collection.
+
+        Serves data that src/shard_migration.py has not moved yet; the first
+        write to the context moves it into its own shard (see _ensure_shard).
+        Called with _state_lock held.
+        """
+        binding = get_collection_registry().resolve(
+            self.persist_directory, global_collection_name(), config.HUGGINGFACE_EMBEDDING_MODEL
+        )
         try:
-            self.vector_store = Chroma(
-                collection_name=self.collection_name,
-                embedding_function=self.embeddings,
-                persist_directory=self.persist_directory,
-                client=self.client
+            found = self.client.get_collection(name=binding.physical).get(
+                where=self._legacy_filter(), limit=1, include=[]
             )
-            self._load_llama_index()
-            return self.vector_store
-        except:
+        except Exception:
+            return None
+        if not found["ids"]:
             return None
 
-    # ---------------------------------------------------------
-    # GET OR CREATE GLOBAL STORE
-    # ---------------------------------------------------------
-    def get_or_create_store(self):
-        if self.vector_store:
-            return self.vector_store
-
+        self.legacy_binding = binding
         self.vector_store = Chroma(
-            collection_name=self.collection_name,
-            embedding_function=self.embeddings,
+            collection_name=binding.physical,
+            embedding_function=SentenceEncoderEmbeddings(binding.model, normalize=True),
             persist_directory=self.persist_directory,
             client=self.client
         )
+        self.invalidate_llama_index()
         return self.vector_store
 
+    def _ensure_shard(self):
+        """Before the first write since sharding was enabled, move the context's legacy rows."""
+        catalog = get_shard_catalog()
+        if config.VECTOR_SHARDING == "none" or catalog.lookup(self.safe_video_id) is not None:
+            return
+        with self._state_lock:
+            if catalog.lookup(self.safe_video_id) is None:
+                self._migrate_legacy_rows()
+                catalog.register(self.safe_video_id, self.shard)
+
+    def _migrate_legacy_rows(self) -> int:
+        """
+        Move this context's rows from the global collection into its shard.
+
+        Rows are re-embedded through _write_documents (shard model, offset
+        chunks, shadow dual-writes) and their manifest records move along.
+
+        Returns:
+            Number of rows moved
+        """
+        legacy = get_collection_registry().resolve(
+            self.persist_directory, global_collection_name(), config.HUGGINGFACE_EMBEDDING_MODEL
+        )
+        if legacy.physical == self.binding.physical:
+            return 0
+        try:
+            rows = self.client.get_collection(name=legacy.physical).get(
+                where=self._legacy_filter(), include=["documents", "metadatas"]
+            )
+        except Exception:
+            return 0
+        if not rows["ids"]:
+            return 0
+
+        documents = [
+            LCDocument(
+                page_content=text or "",
+                metadata={**(metadata or {}), "context_id": self.safe_video_id, "_row": row_id},
+            )
+            for row_id, text, metadata in zip(rows["ids"], rows["documents"], rows["metadatas"])
+        ]
+        # Pointer chunks are embedded from their text; stale ones are dropped
+        documents = hydrate_documents(documents)
+        ids = [doc.metadata.pop("_row") for doc in documents]
+        if documents:
+            self._write_documents(documents, ids)
+
+        get_chunk_manifest().move_source(
+            f"chroma:{global_collection_name()}", self.manifest_namespace, self.safe_video_id
+        )
+        self.client.get_collection(name=legacy.physical).delete(ids=rows["ids"])
+        shadow_delete(self.client, legacy, ids=rows["ids"])
+        self.invalidate_llama_index()
+        print(f"✔ Moved {len(ids)} legacy rows of {self.safe_video_id} to {self.collection_name}")
+        return len(ids)
+
+    # ---------------------------------------------------------
+    # GET OR CREATE SHARD STORE
+    # ---------------------------------------------------------
+    def get_or_create_store(self):
+        with self._state_lock:
+            if self.legacy_binding is not None:
+                # Writes always go to the context's shard
+                self.legacy_binding = None
+                self.vector_store = None
+                self.invalidate_llama_index()
+
+            if self.vector_store:
+                return self.vector_store
+
+            self.vector_store = Chroma(
+                collection_name=self.binding.physical,
+                embedding_function=self.embeddings,
+                persist_directory=self.persist_directory,
+                client=self.client
+            )
+            return self.vector_store
+
     # ---------------------------------------------------------
     # ADD DOCUMENTS LATER
     # ---------------------------------------------------------
     def add_documents(self, documents: List[LCDocument]):
+        for doc in documents:
+            doc.metadata.setdefault("context_id", self.safe_video_id)
+
+        self._ensure_shard()
+        self._write_documents(documents)
+        get_shard_catalog().register(self.safe_video_id, self.shard)
+        self.invalidate_llama_index()
+
+    def _write_documents(self, documents: List[LCDocument], ids: Optional[List[str]] = None):
+        """
+        Add documents; pointer chunks are embedded from their text but stored without it.
+
+        During an embedding migration the rows are mirrored into the shadow collection.
+        """
+        self.refresh_binding()
         store = self.get_or_create_store()
-        store.add_documents(documents)
-        store.persist()
-        self._load_llama_index()
+        binding = self.binding
+        pointers = config.OFFSET_CHUNKS and any(is_pointer(doc.metadata) for doc in documents)
+        if not pointers and binding.shadow is None:
+            store.add_documents(documents, ids=ids)
+            store.persist()
+            return
+
+        ids = ids or [uuid.uuid4().hex for _ in documents]
+        if pointers:
+            vectors = encode_texts(
+                [doc.page_content for doc in documents],
+                binding.model,
+                normalize=True,
+            )
+            self.client.get_or_create_collection(name=binding.physical).upsert(
+                ids=list(ids),
+                embeddings=vectors.tolist(),
+                documents=[storage_text(doc) for doc in documents],
+                metadatas=[doc.metadata for doc in documents],
+            )
+        else:
+            store.add_documents(documents, ids=ids)
+            store.persist()
+
+        shadow_upsert(
+            self.client, binding, ids,
+            texts=[doc.page_content for doc in documents],
+            metadatas=[doc.metadata for doc in documents],
+            documents=[storage_text(doc) for doc in documents],
+        )
 
     # ---------------------------------------------------------
     # LANGCHAIN RETRIEVER
@@ -134,14 +464,20 @@ class VectorStoreManager:
         if k is None:
             k = config.RETRIEVAL_K
 
-        return self.vector_store.as_retriever(search_kwargs={"k": k})
+        search_kwargs = {"k": k}
+        if self.legacy_binding is not None:
+            search_kwargs["filter"] = self._legacy_filter()
+        elif self.shard.filter_by_context:
+            search_kwargs["filter"] = {"context_id": self.safe_video_id}
+        # Offset-based chunks come back as pointers; only the top-k get text
+        return HydratingRetriever(base=self.vector_store.as_retriever(search_kwargs=search_kwargs))
 
     # ---------------------------------------------------------
     # LLAMAINDEX QUERY ENGINE
     # ---------------------------------------------------------
     def get_llama_query_engine(self):
-        if self.llama_index is None:
-            raise ValueError("LlamaIndex not initialized")
+        if self.vector_store is None:
+            raise ValueError("Vector store not initialized.")
 
         llm = Ollama(
             model="llama3",
@@ -150,34 +486,76 @@ class VectorStoreManager:
             max_new_tokens=2048,
         )
 
-        return self.llama_index.as_query_engine(llm=llm, similarity_top_k=3)
+        filters = None
+        if self.legacy_binding is not None:
+            filters = MetadataFilters(
+                filters=[ExactMatchFilter(key=key, value=self.safe_video_id) for key in ("context_id", "video_id", "user_id")],
+                condition=FilterCondition.OR,
+            )
+        elif self.shard.filter_by_context:
+            filters = MetadataFilters(filters=[ExactMatchFilter(key="context_id", value=self.safe_video_id)])
+
+        return self.llama_index.as_query_engine(
+            llm=llm,
+            similarity_top_k=3,
+            filters=filters,
+            node_postprocessors=[HydrateNodes()],
+        )
 
     # ---------------------------------------------------------
-    # LOAD LLAMAINDEX FROM CHROMA
+    # LAZY LLAMAINDEX VIEW OVER CHROMA
     # ---------------------------------------------------------
-    def _load_llama_index(self):
+    @property
+    def llama_index(self) -> VectorStoreIndex:
+        """LlamaIndex over the collection; built on first access only."""
+        index = self._llama_index
+        if index is None:
+            with self._llama_lock:
+                if self._llama_index is None:
+                    self._llama_index = self._build_llama_index()
+                index = self._llama_index
+        return index
+
+    def invalidate_llama_index(self):
+        """Drop the LlamaIndex view; the next access rebuilds it."""
+        self._llama_index = None
+
+    def _build_llama_index(self) -> VectorStoreIndex:
+        binding = self.legacy_binding or self.binding
         chroma_collection = self.client.get_or_create_collection(
-            name=self.collection_name
+            name=binding.physical
         )
 
         vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
 
         storage_context = StorageContext.from_defaults(vector_store=vector_store)
 
-        self.llama_index = VectorStoreIndex.from_vector_store(
+        return VectorStoreIndex.from_vector_store(
             vector_store=vector_store,
             storage_context=storage_context,
-            embed_model=self.llama_embeddings,
+            embed_model=get_llama_embeddings(binding.model),
         )
 
     # ---------------------------------------------------------
-    # DELETE EVERYTHING (optional admin use)
+    # DELETE THIS CONTEXT (optional admin use)
     # ---------------------------------------------------------
     def delete_vector_store(self):
         try:
-            self.client.delete_collection(name=self.collection_name)
-            self.vector_store = None
-            self.llama_index = None
+            self.refresh_binding()
+            if self.shard.filter_by_context:
+                collection = self.client.get_or_create_collection(name=self.binding.physical)
+                collection.delete(where={"context_id": self.safe_video_id})
+                shadow_delete(self.client, self.binding, where={"context_id": self.safe_video_id})
+            else:
+                for name in filter(None, (self.binding.physical, self.binding.shadow)):
+                    self.client.delete_collection(name=name)
+                get_collection_registry().forget(self.persist_directory, self.collection_name)
+            get_chunk_manifest().forget_source(self.manifest_namespace, self.safe_video_id)
+            get_shard_catalog().forget(self.safe_video_id)
+            get_source_text_store().delete_prefix(f"transcript/{self.safe_video_id}@")
+            with self._state_lock:
+                self.vector_store = None
+                self.invalidate_llama_index()
         except:
             pass
 
@@ -0,0 +1,187 @@
+"""
+Vector Store Pool Module
+
+Bounded, thread-safe LRU pool of warm VectorStoreManager instances (and
+their retrievers) keyed by context id, so chat turns and report sections
+reuse one manager instead of rebuilding clients, embeddings and indexes
+per call. Also caches each user's active chat context for a short TTL.
+"""
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from src.vector_store import VectorStoreManager
+
+
+class _PoolEntry:
+    __slots__ = ("lock", "manager", "retrievers", "retriever_store")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.manager: Optional[VectorStoreManager] = None
+        self.retrievers: Dict[int, object] = {}
+        # Store the cached retrievers search (replaced on writes after a legacy read)
+        self.retriever_store = None
+
+
+class VectorStorePool:
+    """LRU pool of VectorStoreManager instances keyed by context id."""
+
+    def __init__(self, max_size: int = None, factory: Callable[[str], VectorStoreManager] = None):
+        """
+        Args:
+            max_size: Managers kept warm (default: config.VECTOR_STORE_POOL_SIZE)
+            factory: Builds a manager for a context id (default: VectorStoreManager)
+        """
+        self.max_size = max_size or config.VECTOR_STORE_POOL_SIZE
+        self.factory = factory or VectorStoreManager
+        self._entries: "OrderedDict[str, _PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry(self, context_id: str) -> _PoolEntry:
+        with self._lock:
+            entry = self._entries.get(context_id)
+            if entry is not None:
+                self._entries.move_to_end(context_id)
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+            entry = self._entries[context_id] = _PoolEntry()
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return entry
+
+    def _manager(self, entry: _PoolEntry, context_id: str) -> VectorStoreManager:
+        if entry.manager is None:
+            with entry.lock:
+                if entry.manager is None:
+                    entry.manager = self.factory(context_id)
+        return entry.manager
+
+    def _loaded(self, entry: _PoolEntry, context_id: str) -> Optional[VectorStoreManager]:
+        manager = self._manager(entry, context_id)
+        if manager.refresh_binding():
+            # Embedding migration switched the collection: cached retrievers embed with the old model
+            entry.retrievers.clear()
+        if manager.vector_store is None:
+            with entry.lock:
+                if manager.vector_store is None and not manager.load_vector_store():
+                    return None
+        return manager
+
+    def get(self, context_id: str) -> VectorStoreManager:
+        """Warm manager for a context (built on first use, outside the pool lock)."""
+        return self._manager(self._entry(context_id), context_id)
+
+    def load(self, context_id: str) -> Optional[VectorStoreManager]:
+        """Manager with its vector store loaded, or None if loading failed."""
+        return self._loaded(self._entry(context_id), context_id)
+
+    def get_retriever(self, context_id: str, k: int = None):
+        """Cached LangChain retriever of a context, or None if the store cannot load."""
+        entry = self._entry(context_id)
+        manager = self._loaded(entry, context_id)
+        if manager is None:
+            return None
+
+        k = k or config.RETRIEVAL_K
+        if entry.retriever_store is not manager.vector_store:
+            entry.retrievers.clear()
+            entry.retriever_store = manager.vector_store
+        retriever = entry.retrievers.get(k)
+        if retriever is None:
+            retriever = entry.retrievers[k] = manager.get_retriever(k)
+        return retriever
+
+    def invalidate(self, context_id: str):
+        with self._lock:
+            self._entries.pop(context_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class ActiveContextCache:
+    """user_id -> active context id, cached for a short TTL."""
+
+    def __init__(self, ttl_seconds: float = None, max_size: int = 10000):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.ACTIVE_CONTEXT_TTL_SECONDS
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Bumped by invalidate(): a load that started before it must not be cached
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, user_id: str, loader: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        Cached active context of a user, computed with loader() on a miss.
+
+        Args:
+            user_id: User id
+            loader: Looks the active context up (e.g. latest OCR record)
+
+        Returns:
+            Context id, or None if the user has none
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached is not None and now - cached[1] < self.ttl_seconds:
+                return cached[0]
+            generation = self._generations.get(user_id, 0)
+
+        context_id = loader()
+        with self._lock:
+            if self._generations.get(user_id, 0) == generation:
+                self._entries[user_id] = (context_id, now)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return context_id
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+
+_pool: Optional[VectorStorePool] = None
+_active_contexts: Optional[ActiveContextCache] = None
+_singleton_lock = threading.Lock()
+
+
+def get_vector_store_pool() -> VectorStorePool:
+    """Process-wide VectorStorePool."""
+    global _pool
+    if _pool is None:
+        with _singleton_lock:
+            if _pool is None:
+                _pool = VectorStorePool()
+    return _pool
+
+
+def get_active_context_cache() -> ActiveContextCache:
+    """Process-wide ActiveContextCache."""
+    global _active_contexts
+    if _active_contexts is None:
+        with _singleton_lock:
+            if _active_contexts is None:
+                _active_contexts = ActiveContextCache()
+    return _active_contexts